@@ -2,14 +2,17 @@
 Universal RAG System - Flask Application
 """
 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
 from pathlib import Path
+import json
 import logging
 import os
 
+from config import Config
 from core import DatabaseManager, LLMService
 from core.classifier import DocumentClassifier
 from core.chat_manager import ChatManager
+from core.answer_cache import AnswerCache
 
 # Setup logging
 logging.basicConfig(
@@ -31,10 +34,15 @@ DB_DIR = DATA_DIR / os.environ.get('CHROMA_DB_DIR', 'chroma_db_v2')
 SORTED_DIR = DATA_DIR / "sorted"
 
 # Initialize services
-db_manager = DatabaseManager(DB_DIR)
+db_manager = DatabaseManager(
+    DB_DIR,
+    query_cache_size=Config.QUERY_CACHE_SIZE,
+    persist_query_cache=Config.QUERY_CACHE_PERSIST
+)
 llm_service = LLMService(model='llama3.2')
 classifier = DocumentClassifier()
 chat_manager = ChatManager(DATA_DIR)
+answer_cache = AnswerCache(max_entries=Config.ANSWER_CACHE_SIZE, ttl_seconds=Config.ANSWER_CACHE_TTL)
 
 logger.info(f"✅ Database initialized with {db_manager.get_count()} documents")
 
@@ -88,6 +96,31 @@ def update_title(chat_id):
 
 
 
+def save_chat_exchange(chat_id, query, response):
+    """Append a user query and the assistant response to a chat session"""
+    messages = chat_manager.get_messages(chat_id)
+    messages.append({
+        "sender": "user", 
+        "text": query, 
+        "timestamp": __import__('datetime').datetime.now().isoformat()
+    })
+    messages.append({
+        "sender": "assistant", 
+        "text": response['answer'], 
+        "cited_files": response['cited_files'],
+        "confidence_score": response['confidence_score'],
+        "source_snippets": response['source_snippets'],
+        "timestamp": __import__('datetime').datetime.now().isoformat()
+    })
+    chat_manager.save_messages(chat_id, messages)
+    
+    # Auto-update title if it's the first message and title is currently generic
+    if len(messages) <= 2:
+         # Simple heuristic: first few words of query
+         new_title = (query[:30] + '...') if len(query) > 30 else query
+         chat_manager.update_title(chat_id, new_title)
+
+
 @app.route('/chat', methods=['POST'])
 def chat():
     """Handle chat queries"""
@@ -105,50 +138,42 @@ def chat():
         if not query:
             return jsonify({'error': 'Empty query'}), 400
         
-        # Increase search window to capture relevant chunks that might have lower vector score
-        # Get documents
-        # V6: Increase to 25 for Re-ranking (CrossEncoder will filter to Top 5)
-        chunks = db_manager.query(query, n_results=25)
+        # Serve repeated questions from the answer cache; the corpus generation in the
+        # key makes any ingest or delete invalidate older answers
+        generation = db_manager.get_generation()
+        response = answer_cache.get(query, generation)
         
-        if not chunks:
-            response = {
-                'answer': 'No relevant documents found.',
-                'cited_files': [],
-                'confidence_score': 0,
-                'source_snippets': []
-            }
+        if response is not None:
+            response['cached'] = True
+            logger.info(f"Answer cache hit for: '{query}'")
         else:
-            answer, cited_files, confidence_score, source_snippets = llm_service.generate_response(query, chunks)
-            response = {
-                'answer': answer,
-                'cited_files': cited_files,
-                'confidence_score': confidence_score,
-                'source_snippets': source_snippets
-            }
+            # Hybrid (BM25 + vector) retrieval surfaces exact-term matches directly,
+            # so a smaller pool is enough for the CrossEncoder to pick the Top 5
+            chunks = db_manager.query(query, n_results=Config.RERANK_POOL_SIZE, mode=Config.RETRIEVAL_MODE)
+            
+            if not chunks:
+                response = {
+                    'answer': 'No relevant documents found.',
+                    'cited_files': [],
+                    'confidence_score': 0,
+                    'source_snippets': []
+                }
+            else:
+                answer, cited_files, confidence_score, source_snippets = llm_service.generate_response(query, chunks)
+                response = {
+                    'answer': answer,
+                    'cited_files': cited_files,
+                    'confidence_score': confidence_score,
+                    'source_snippets': source_snippets
+                }
+                # Only grounded answers are cached (not "no info" or Ollama errors)
+                if cited_files:
+                    answer_cache.put(query, generation, response)
+            response['cached'] = False
             
         # Save to chat history if chat_id provided
         if chat_id:
-            messages = chat_manager.get_messages(chat_id)
-            messages.append({
-                "sender": "user", 
-                "text": query, 
-                "timestamp": __import__('datetime').datetime.now().isoformat()
-            })
-            messages.append({
-                "sender": "assistant", 
-                "text": response['answer'], 
-                "cited_files": response['cited_files'],
-                "confidence_score": response['confidence_score'],
-                "source_snippets": response['source_snippets'],
-                "timestamp": __import__('datetime').datetime.now().isoformat()
-            })
-            chat_manager.save_messages(chat_id, messages)
-            
-            # Auto-update title if it's the first message and title is currently generic
-            if len(messages) <= 2:
-                 # Simple heuristic: first few words of query
-                 new_title = (query[:30] + '...') if len(query) > 30 else query
-                 chat_manager.update_title(chat_id, new_title)
+            save_chat_exchange(chat_id, query, response)
         
         return jsonify(response)
         
@@ -157,6 +182,79 @@ def chat():
         return jsonify({'error': str(e)}), 500
 
 
+def sse_event(event, payload):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Handle chat queries, streaming the answer as Server-Sent Events
+
+    Events: "metadata" (source_snippets, cited_files, confidence_score) as soon
+    as re-ranking finishes, "token" per generated piece of text, then "done"
+    with the final response (same fields as /chat). History is saved on "done".
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'error': 'Invalid request'}), 400
+    
+    query = str(data.get('query', '')).strip()
+    chat_id = data.get('chat_id')
+    
+    if not query:
+        return jsonify({'error': 'Empty query'}), 400
+    
+    def generate():
+        try:
+            generation = db_manager.get_generation()
+            response = answer_cache.get(query, generation)
+            
+            if response is not None:
+                logger.info(f"Answer cache hit for: '{query}'")
+                response['cached'] = True
+                yield sse_event('metadata', {
+                    'source_snippets': response['source_snippets'],
+                    'cited_files': response['cited_files'],
+                    'confidence_score': response['confidence_score']
+                })
+                yield sse_event('token', {'text': response['answer']})
+            else:
+                chunks = db_manager.query(query, n_results=Config.RERANK_POOL_SIZE, mode=Config.RETRIEVAL_MODE)
+                
+                if not chunks:
+                    response = {
+                        'answer': 'No relevant documents found.',
+                        'cited_files': [],
+                        'confidence_score': 0,
+                        'source_snippets': []
+                    }
+                else:
+                    for event, payload in llm_service.stream_response(query, chunks):
+                        if event == 'done':
+                            response = payload
+                        else:
+                            yield sse_event(event, payload)
+                    if response['cited_files']:
+                        answer_cache.put(query, generation, response)
+                response['cached'] = False
+            
+            if chat_id:
+                save_chat_exchange(chat_id, query, response)
+            
+            yield sse_event('done', response)
+            
+        except Exception as e:
+            logger.error(f"Error in /chat/stream: {e}", exc_info=True)
+            yield sse_event('error', {'error': str(e)})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.route('/classify', methods=['POST'])
 def classify():
     """Classify given text/filename into Domain/Category with confidence.
@@ -187,11 +285,17 @@ def classify():
 def download_file(filename):
     """Download cited file"""
     try:
-        # Search for file in sorted directory
-        for root, dirs, files in os.walk(SORTED_DIR):
+        # Look the file up in the catalog (newest ingest first)
+        sorted_root = SORTED_DIR.resolve()
+        for entry in db_manager.catalog.find_by_filename(filename):
+            filepath = Path(entry['filepath']).resolve()
+            if sorted_root in filepath.parents and filepath.is_file():
+                return send_file(str(filepath), as_attachment=True)
+        
+        # Not catalogued (e.g. stored by an older script): search the sorted tree
+        for root, _, files in os.walk(SORTED_DIR):
             if filename in files:
-                filepath = os.path.join(root, filename)
-                return send_file(filepath, as_attachment=True)
+                return send_file(os.path.join(root, filename), as_attachment=True)
         
         return jsonify({'error': 'File not found'}), 404
         
@@ -243,18 +347,18 @@ def status():
     try:
         doc_count = db_manager.get_count()
         
-        # Count files in sorted directory
-        sorted_files = 0
-        categories = []
-        for category_dir in SORTED_DIR.iterdir():
-            if category_dir.is_dir():
-                categories.append(category_dir.name)
-                sorted_files += len(list(category_dir.glob('*')))
+        # File and domain counts come from the catalog
+        catalog_summary = db_manager.catalog.summary()
         
         return jsonify({
             'database_count': doc_count,
-            'sorted_files': sorted_files,
-            'categories': categories,
+            'sorted_files': catalog_summary['files'],
+            'categories': list(catalog_summary['domains']),
+            'cache': {
+                **db_manager.get_cache_stats(),
+                'answer': answer_cache.stats(),
+                'rerank': llm_service.rerank_cache.stats() if llm_service.rerank_cache else None
+            },
             'ollama_available': llm_service.check_availability()
         })
         
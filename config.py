@@ -9,14 +9,103 @@ class Config:
     DATA_DIR = BASE_DIR / "data"
     INCOMING_DIR = DATA_DIR / "incoming"
     SORTED_DIR = DATA_DIR / "sorted"
+    # Files whose content is already ingested are moved here out of incoming
+    DUPLICATES_DIR = DATA_DIR / "duplicates"
     DB_DIR = DATA_DIR / __import__("os").environ.get("CHROMA_DB_DIR", "chroma_db_v2")
     
     # LLM Settings
     LLM_MODEL = "llama3.2"
     
     # Processing Settings
-    CHUNK_SIZE = 500
+    # Chunks are measured in embedding-model tokens and cut at sentence/paragraph
+    # boundaries. all-MiniLM-L6-v2 reads 256 tokens and the ms-marco re-ranker 512
+    # for query + chunk, so no chunk is truncated by either.
+    CHUNK_MAX_TOKENS = int(__import__("os").environ.get("CHUNK_MAX_TOKENS", "240"))
+    CHUNK_OVERLAP_TOKENS = int(__import__("os").environ.get("CHUNK_OVERLAP_TOKENS", "32"))
+    # tokenizer.json used to count tokens (Chroma's copy of the embedding model's);
+    # counts are estimated when it isn't there
+    CHUNK_TOKENIZER = __import__("os").environ.get(
+        "CHUNK_TOKENIZER", str(Path.home() / ".cache" / "chroma" / "onnx_models" / "all-MiniLM-L6-v2" / "onnx" / "tokenizer.json"))
+    # Chunking policy per extension or file type, overriding core.chunking.DEFAULT_POLICY_MAP,
+    # e.g. "code=prose,.txt=log". Policies: prose, code, slides, table, markdown, log
+    CHUNK_POLICIES = __import__("os").environ.get("CHUNK_POLICIES", "")
+    # Token budget per policy, e.g. "table=160,log=200" (defaults are set on each policy)
+    CHUNK_POLICY_TOKENS = __import__("os").environ.get("CHUNK_POLICY_TOKENS", "")
+    # Log chunks group entries from windows of this many seconds
+    LOG_CHUNK_WINDOW_SECONDS = int(__import__("os").environ.get("LOG_CHUNK_WINDOW_SECONDS", "300"))
     TOP_K_RETRIEVAL = 4
+    # PDF text extraction: "pymupdf" (fast) or "pdfminer". PDFs with at least
+    # PDF_PARALLEL_MIN_PAGES pages are split into page ranges across PDF_MAX_WORKERS
+    # processes (0 = one per CPU); inside Celery prefork children these are subprocesses.
+    PDF_ENGINE = __import__("os").environ.get("PDF_ENGINE", "pymupdf")
+    PDF_PARALLEL_MIN_PAGES = int(__import__("os").environ.get("PDF_PARALLEL_MIN_PAGES", "64"))
+    PDF_MAX_WORKERS = int(__import__("os").environ.get("PDF_MAX_WORKERS", "0"))
+    # Scanned PDF pages (no text layer) are rasterized at OCR_DPI and OCR'd
+    PDF_OCR_ENABLED = __import__("os").environ.get("PDF_OCR_ENABLED", "1") == "1"
+    OCR_DPI = int(__import__("os").environ.get("OCR_DPI", "300"))
+    # OCR engine: OCR_MAX_WORKERS processes (0 = one per CPU) x OCR_THREADS_PER_WORKER
+    # Tesseract threads, OCR_BATCH_SIZE images per Tesseract call
+    OCR_MAX_WORKERS = int(__import__("os").environ.get("OCR_MAX_WORKERS", "0"))
+    OCR_THREADS_PER_WORKER = int(__import__("os").environ.get("OCR_THREADS_PER_WORKER", "1"))
+    OCR_BATCH_SIZE = int(__import__("os").environ.get("OCR_BATCH_SIZE", "8"))
+    OCR_LANG = __import__("os").environ.get("OCR_LANG", "eng")
+    # Also OCR pictures embedded in PDFs (text pages) and PowerPoint slides
+    OCR_EMBEDDED_IMAGES = __import__("os").environ.get("OCR_EMBEDDED_IMAGES", "0") == "1"
+    # zstd-compressed extraction cache keyed by content hash; kept outside DB_DIR so
+    # it survives rebuilds
+    EXTRACTION_CACHE_ENABLED = __import__("os").environ.get("EXTRACTION_CACHE_ENABLED", "1") == "1"
+    EXTRACTION_CACHE_DIR = DATA_DIR / "extraction_cache"
+    EXTRACTION_CACHE_MAX_MB = int(__import__("os").environ.get("EXTRACTION_CACHE_MAX_MB", "2048"))
+    # Logs with at least LOG_MINING_MIN_LINES lines are collapsed into their line templates
+    # (with counts, time ranges, examples and byte ranges) before chunking
+    LOG_TEMPLATE_MINING = __import__("os").environ.get("LOG_TEMPLATE_MINING", "1") == "1"
+    LOG_MINING_MIN_LINES = int(__import__("os").environ.get("LOG_MINING_MIN_LINES", "1000"))
+    LOG_TEMPLATE_SIMILARITY = float(__import__("os").environ.get("LOG_TEMPLATE_SIMILARITY", "0.5"))
+    # Persistent chunk embeddings (memmap + index) used by ingest and rebuilds; None disables
+    EMBEDDING_STORE_DIR = DATA_DIR / "embedding_store" if __import__("os").environ.get("EMBEDDING_STORE_ENABLED", "1") == "1" else None
+    
+    # Retrieval Settings
+    # "vector", "lexical" (BM25) or "hybrid" (both fused by reciprocal rank fusion)
+    RETRIEVAL_MODE = __import__("os").environ.get("RETRIEVAL_MODE", "hybrid")
+    # Candidates handed to the CrossEncoder re-ranker per query
+    RERANK_POOL_SIZE = int(__import__("os").environ.get("RERANK_POOL_SIZE", "15"))
+    # Re-ranker: "onnx" (int8-quantized ONNX Runtime, exported once into RERANKER_CACHE_DIR)
+    # or "torch" (sentence-transformers); falls back to torch if the ONNX model can't be built.
+    # RERANKER_THREADS=0 leaves the thread count to the runtime.
+    RERANKER_MODEL = __import__("os").environ.get("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANKER_BACKEND = __import__("os").environ.get("RERANKER_BACKEND", "onnx")
+    RERANKER_BATCH_SIZE = int(__import__("os").environ.get("RERANKER_BATCH_SIZE", "32"))
+    RERANKER_THREADS = int(__import__("os").environ.get("RERANKER_THREADS", "0"))
+    RERANKER_MAX_LENGTH = 512
+    RERANKER_CACHE_DIR = DATA_DIR / "models" / "rerankers"
+    # Concurrent chat requests share re-ranker forward passes: pairs arriving within
+    # RERANK_BATCH_MAX_WAIT_MS are scored together, up to RERANK_BATCH_MAX_PAIRS per pass
+    RERANK_BATCHING_ENABLED = __import__("os").environ.get("RERANK_BATCHING_ENABLED", "1") == "1"
+    RERANK_BATCH_MAX_PAIRS = int(__import__("os").environ.get("RERANK_BATCH_MAX_PAIRS", "64"))
+    RERANK_BATCH_MAX_WAIT_MS = int(__import__("os").environ.get("RERANK_BATCH_MAX_WAIT_MS", "5"))
+    # Cascade: a cheap similarity + keyword-coverage score keeps the best RERANK_PREFILTER_KEEP
+    # candidates; the cross-encoder scores them best-first (top_k, then RERANK_CASCADE_STEP at a time)
+    # and stops once a step scores RERANK_CASCADE_MARGIN (logits) or more below the k-th best
+    RERANK_CASCADE_ENABLED = __import__("os").environ.get("RERANK_CASCADE_ENABLED", "1") == "1"
+    RERANK_PREFILTER_KEEP = int(__import__("os").environ.get("RERANK_PREFILTER_KEEP", "12"))
+    RERANK_CASCADE_STEP = int(__import__("os").environ.get("RERANK_CASCADE_STEP", "4"))
+    RERANK_CASCADE_MARGIN = float(__import__("os").environ.get("RERANK_CASCADE_MARGIN", "1.0"))
+    # Cross-encoder scores cached per (normalized query, chunk id, model); 0 disables
+    RERANK_CACHE_SIZE = int(__import__("os").environ.get("RERANK_CACHE_SIZE", "20000"))
+    # Prompt packing: chunks go into what num_ctx leaves after the instructions, num_predict and
+    # PROMPT_RESERVE_TOKENS; chunks over PROMPT_CHUNK_MAX_TOKENS (or the space left) are cut to their
+    # most query-relevant sentences. PROMPT_CONTEXT_TOKENS > 0 caps the context for faster prefill.
+    # PROMPT_TOKENIZER is a tokenizer.json matching the Ollama model; without it tokens are estimated.
+    PROMPT_TOKENIZER = __import__("os").environ.get("PROMPT_TOKENIZER", "")
+    PROMPT_RESERVE_TOKENS = int(__import__("os").environ.get("PROMPT_RESERVE_TOKENS", "64"))
+    PROMPT_CONTEXT_TOKENS = int(__import__("os").environ.get("PROMPT_CONTEXT_TOKENS", "0"))
+    PROMPT_CHUNK_MAX_TOKENS = int(__import__("os").environ.get("PROMPT_CHUNK_MAX_TOKENS", "400"))
+    # Query embedding LRU (optionally persisted next to the DB across restarts)
+    QUERY_CACHE_SIZE = int(__import__("os").environ.get("QUERY_CACHE_SIZE", "1024"))
+    QUERY_CACHE_PERSIST = __import__("os").environ.get("QUERY_CACHE_PERSIST", "1") == "1"
+    # Full /chat answer cache (invalidated automatically when the corpus changes)
+    ANSWER_CACHE_SIZE = int(__import__("os").environ.get("ANSWER_CACHE_SIZE", "256"))
+    ANSWER_CACHE_TTL = int(__import__("os").environ.get("ANSWER_CACHE_TTL", "3600"))
     
     # Flask Settings
     FLASK_HOST = "0.0.0.0"
@@ -26,3 +115,18 @@ class Config:
     # Celery Settings
     CELERY_BROKER_URL = __import__("os").environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0")
     CELERY_RESULT_BACKEND = __import__("os").environ.get("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+    # Files per batch task when the watcher finds a folder or a backlog of files
+    INGEST_BATCH_SIZE = int(__import__("os").environ.get("INGEST_BATCH_SIZE", "32"))
+    # Watcher: a new/modified file is queued once its size and mtime have not
+    # changed for this long. Set WATCHER_FORCE_POLLING=1 where inotify is unavailable.
+    WATCHER_SETTLE_SECONDS = float(__import__("os").environ.get("WATCHER_SETTLE_SECONDS", "1.0"))
+    WATCHER_FORCE_POLLING = __import__("os").environ.get("WATCHER_FORCE_POLLING", "0") == "1"
+    # Skip files whose content is already in the catalog (size + head/tail hash, then full hash)
+    DEDUP_ENABLED = __import__("os").environ.get("DEDUP_ENABLED", "1") == "1"
+    # Write-behind buffer: group chunk inserts from concurrent tasks in a worker process,
+    # flushing at N chunks or T ms. Durable mode writes at once and acks a task only after
+    # its write; it coalesces only tasks that run concurrently (threads/gevent pool).
+    WRITE_BUFFER_ENABLED = __import__("os").environ.get("WRITE_BUFFER_ENABLED", "0") == "1"
+    WRITE_BUFFER_MAX_CHUNKS = int(__import__("os").environ.get("WRITE_BUFFER_MAX_CHUNKS", "512"))
+    WRITE_BUFFER_MAX_WAIT_MS = int(__import__("os").environ.get("WRITE_BUFFER_MAX_WAIT_MS", "500"))
+    WRITE_BUFFER_DURABLE = __import__("os").environ.get("WRITE_BUFFER_DURABLE", "1") == "1"
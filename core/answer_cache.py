@@ -0,0 +1,63 @@
+"""Full-answer cache for /chat, invalidated by corpus generation"""
+from pathlib import Path
+from typing import Optional
+import sqlite3
+import threading
+import logging
+
+from utils import LRUCache, TextUtils
+
+logger = logging.getLogger(__name__)
+
+
+class CorpusGeneration:
+    """Monotonic counter bumped on every corpus change
+
+    Stored in SQLite so that bumps made by the worker/watcher processes are
+    seen by the Flask process.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS generation (id INTEGER PRIMARY KEY CHECK (id = 0), value INTEGER NOT NULL)")
+            self._conn.execute("INSERT OR IGNORE INTO generation (id, value) VALUES (0, 0)")
+
+    def get(self) -> int:
+        """Current generation"""
+        with self._lock:
+            return self._conn.execute("SELECT value FROM generation WHERE id = 0").fetchone()[0]
+
+    def bump(self) -> int:
+        """Atomically increment and return the new generation"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE generation SET value = value + 1 WHERE id = 0")
+            return self._conn.execute("SELECT value FROM generation WHERE id = 0").fetchone()[0]
+
+
+class AnswerCache:
+    """LRU + TTL cache of /chat responses keyed by (normalized query, corpus generation)"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: Optional[float] = 3600):
+        self._cache = LRUCache(max_size=max_entries, ttl_seconds=ttl_seconds)
+
+    @staticmethod
+    def _key(query: str, generation: int) -> tuple:
+        return (TextUtils.normalize_query(query), generation)
+
+    def get(self, query: str, generation: int) -> Optional[dict]:
+        """Cached response for this query at this corpus generation, if any"""
+        response = self._cache.get(self._key(query, generation))
+        return dict(response) if response is not None else None
+
+    def put(self, query: str, generation: int, response: dict) -> None:
+        """Store a response; entries from older generations age out via LRU"""
+        self._cache.put(self._key(query, generation), dict(response))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
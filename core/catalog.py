@@ -0,0 +1,131 @@
+"""Document catalog - SQLite sidecar index of ingested files"""
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import json
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentCatalog:
+    """One row per ingested file, indexed by path, hash and filename
+
+    Lets hot paths (delete by path, download lookup, status, dangling-file
+    sync) avoid scanning the Chroma collection or walking the sorted tree.
+    """
+
+    def __init__(self, catalog_path: Path):
+        self.catalog_path = Path(catalog_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.catalog_path), check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS files (
+                    filepath TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    file_hash TEXT NOT NULL,
+                    size_bytes INTEGER,
+                    mtime REAL,
+                    domain TEXT,
+                    category TEXT,
+                    chunk_ids TEXT NOT NULL DEFAULT '[]',
+                    ingested_at TEXT NOT NULL,
+                    quick_hash TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_files_hash ON files(file_hash);
+                CREATE INDEX IF NOT EXISTS idx_files_filename ON files(filename);
+            """)
+            # Catalogs created before quick fingerprints existed
+            columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(files)")}
+            if 'quick_hash' not in columns:
+                self._conn.execute("ALTER TABLE files ADD COLUMN quick_hash TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_fingerprint ON files(size_bytes, quick_hash)")
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        entry = dict(row)
+        entry['chunk_ids'] = json.loads(entry['chunk_ids'])
+        return entry
+
+    def record(self, filepath: str, file_hash: str, size_bytes: Optional[int], mtime: Optional[float],
+               domain: str, category: str, chunk_ids: List[str], quick_hash: Optional[str] = None) -> None:
+        """Insert or replace the entry for a file"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (filepath, filename, file_hash, size_bytes, mtime, domain, category, chunk_ids, ingested_at, quick_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(filepath), Path(filepath).name, file_hash, size_bytes, mtime, domain, category,
+                 json.dumps(list(chunk_ids)), datetime.now().isoformat(), quick_hash)
+            )
+
+    def get(self, filepath: str) -> Optional[Dict]:
+        """Entry for a path, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM files WHERE filepath = ?", (str(filepath),)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def has(self, filepath: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM files WHERE filepath = ?", (str(filepath),)).fetchone() is not None
+
+    def find_by_hash(self, file_hash: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM files WHERE file_hash = ?", (file_hash,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def find_by_fingerprint(self, size_bytes: int, quick_hash: str) -> List[Dict]:
+        """Entries that may hold the same content (rows without a quick hash match on size alone)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM files WHERE size_bytes = ? AND (quick_hash = ? OR quick_hash IS NULL)",
+                (size_bytes, quick_hash)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+    
+    def find_by_filename(self, filename: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM files WHERE filename = ? ORDER BY ingested_at DESC", (filename,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def remove(self, filepath: str) -> Optional[Dict]:
+        """Delete and return the entry for a path"""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT * FROM files WHERE filepath = ?", (str(filepath),)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM files WHERE filepath = ?", (str(filepath),))
+        return self._to_dict(row)
+
+    def remove_by_hash(self, file_hash: str) -> List[Dict]:
+        """Delete and return every entry with this content hash"""
+        with self._lock, self._conn:
+            rows = self._conn.execute("SELECT * FROM files WHERE file_hash = ?", (file_hash,)).fetchall()
+            self._conn.execute("DELETE FROM files WHERE file_hash = ?", (file_hash,))
+        return [self._to_dict(row) for row in rows]
+
+    def filepaths(self) -> Iterator[str]:
+        """All catalogued paths (snapshot)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT filepath FROM files").fetchall()
+        return (row['filepath'] for row in rows)
+
+    def summary(self) -> Dict:
+        """File count and per-domain counts"""
+        with self._lock:
+            rows = self._conn.execute("SELECT domain, COUNT(*) AS n FROM files GROUP BY domain ORDER BY domain").fetchall()
+        domains = {row['domain'] or 'Uncategorized': row['n'] for row in rows}
+        return {'files': sum(domains.values()), 'domains': domains}
+
+    def chunk_count(self) -> int:
+        """Number of chunk ids across all entries"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(json_array_length(chunk_ids)), 0) FROM files").fetchone()[0]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
@@ -0,0 +1,271 @@
+"""Chunking policies: how each kind of file is split into chunks"""
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Type
+import ast
+import copy
+import logging
+import re
+
+from extractors.log_extractor import LogExtractor, split_timestamp
+from utils import FileUtils, TextUtils
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkingPolicy:
+    """Splits extracted text into chunks of at most max_tokens
+
+    Subclasses keep a file type's natural units (functions, slides, row
+    groups, sections, time windows) whole, packing several small units into
+    one chunk and only splitting units that are over budget.
+    """
+
+    name = "prose"
+    max_tokens = 240
+    overlap_tokens = 32
+
+    def __init__(self, max_tokens: Optional[int] = None, overlap_tokens: Optional[int] = None,
+                 count_tokens: Optional[Callable[[str], int]] = None):
+        if max_tokens is not None:
+            self.max_tokens = max_tokens
+        if overlap_tokens is not None:
+            self.overlap_tokens = overlap_tokens
+        self.count_tokens = count_tokens or TextUtils.estimate_tokens
+
+    def with_max_tokens(self, max_tokens: int) -> "ChunkingPolicy":
+        """Copy of this policy (keeping its other settings) with a different budget"""
+        policy = copy.copy(self)
+        policy.max_tokens = max_tokens
+        return policy
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        return TextUtils.iter_chunks(text, self.max_tokens, self.overlap_tokens, self.count_tokens)
+
+    def pack(self, blocks: Iterable[str], prefix: str = "") -> Iterator[str]:
+        """Join whole blocks into chunks, starting each chunk with prefix (e.g. a table header)"""
+        budget = max(1, self.max_tokens - (self.count_tokens(prefix) if prefix else 0))
+        current, size = [], 0
+        for block in blocks:
+            block = block.strip("\n")
+            if not block.strip():
+                continue
+            tokens = self.count_tokens(block)
+            if current and size + tokens > budget:
+                yield self._join(prefix, current)
+                current, size = [], 0
+            if tokens > budget:
+                # Only a unit that can't fit on its own is cut (between lines, then words)
+                for piece in TextUtils.iter_chunks(block, budget, 0, self.count_tokens):
+                    yield self._join(prefix, [piece])
+                continue
+            current.append(block)
+            size += tokens
+        if current:
+            yield self._join(prefix, current)
+
+    @staticmethod
+    def _join(prefix: str, blocks: List[str]) -> str:
+        body = "\n".join(blocks)
+        return f"{prefix}\n{body}".strip() if prefix else body.strip()
+
+
+class ProsePolicy(ChunkingPolicy):
+    """Sentences and paragraphs (the default)"""
+    name = "prose"
+
+
+class CodePolicy(ChunkingPolicy):
+    """Functions and classes; Python is split with ast, other languages at top-level blocks"""
+
+    name = "code"
+    overlap_tokens = 0
+    # A top-level line after a blank line starts a new block (functions, classes, rules)
+    BLOCK_RE = re.compile(r"\n[ \t]*\n(?=\S)")
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        try:
+            tree = ast.parse(text)
+        except (SyntaxError, ValueError):
+            return self.pack(self.BLOCK_RE.split(text))
+        return self._iter_python(text.splitlines(), tree.body)
+
+    def _iter_python(self, lines: List[str], body: List[ast.stmt], prefix: str = "") -> Iterator[str]:
+        budget = self.max_tokens - (self.count_tokens(prefix) if prefix else 0)
+        blocks, start = [], 0
+        for node in body:
+            if prefix:
+                start = self._first_line(node)  # inside a class: leave out the lines already in the prefix
+            end = node.end_lineno
+            # Comments and blank lines before a definition stay with it
+            block = "\n".join(lines[start:end])
+            is_class = isinstance(node, ast.ClassDef)
+            if is_class and self.count_tokens(block) > budget and len(node.body) > 1:
+                # Oversized class: one chunk per group of methods, each starting with the class line
+                yield from self.pack(blocks, prefix)
+                blocks = []
+                header = "\n".join(lines[start:self._first_line(node.body[0])]).rstrip()
+                yield from self._iter_python(lines, node.body, prefix=f"{prefix}\n{header}".strip() if prefix else header)
+            else:
+                blocks.append(block)
+            start = end
+        if start < len(lines) and not prefix:
+            blocks.append("\n".join(lines[start:]))  # trailing comments
+        yield from self.pack(blocks, prefix)
+
+    @staticmethod
+    def _first_line(node: ast.stmt) -> int:
+        """0-based first line of a statement, including its decorators"""
+        return min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])]) - 1
+
+
+class SlidePolicy(ChunkingPolicy):
+    """Presentation slides ("=== Slide n ===" blocks from the PPTX extractor)"""
+
+    name = "slides"
+    overlap_tokens = 0
+    SLIDE_RE = re.compile(r"(?m)^(?==== Slide \d+)")
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        slides = []
+        for slide in self.SLIDE_RE.split(text):
+            if self.count_tokens(slide) <= self.max_tokens:
+                slides.append(slide)
+                continue
+            # A long slide is cut between lines, each piece starting with its heading
+            yield from self.pack(slides)
+            slides = []
+            heading, _, body = slide.strip().partition("\n")
+            yield from self.pack(body.split("\n"), prefix=heading)
+        yield from self.pack(slides)
+
+
+class TablePolicy(ChunkingPolicy):
+    """Spreadsheet rows in groups, each group starting with the sheet name and header row"""
+
+    name = "table"
+    max_tokens = 200
+    overlap_tokens = 0
+    SHEET_RE = re.compile(r"(?m)^(?==== Sheet: )")
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        for sheet in self.SHEET_RE.split(text):
+            lines = [line for line in sheet.split("\n") if line.strip()]
+            if not lines:
+                continue
+            # XLSX sheets start with their "=== Sheet: name ===" line; CSVs with the header
+            header_lines = 2 if lines[0].startswith("=== Sheet: ") else 1
+            header = "\n".join(lines[:header_lines])
+            if len(lines) <= header_lines:
+                yield header
+                continue
+            yield from self.pack(lines[header_lines:], prefix=header)
+
+
+class MarkdownPolicy(ChunkingPolicy):
+    """Markdown sections, split at headings"""
+
+    name = "markdown"
+    overlap_tokens = 0
+    HEADING_RE = re.compile(r"(?m)^(?=#{1,6}\s)")
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        sections = []
+        for section in self.HEADING_RE.split(text):
+            if self.count_tokens(section) <= self.max_tokens:
+                sections.append(section)
+                continue
+            # Oversized section: its paragraphs, each piece starting with the heading
+            yield from self.pack(sections)
+            sections = []
+            heading, _, body = section.strip().partition("\n")
+            if not heading.startswith("#"):
+                heading, body = "", section
+            budget = self.max_tokens - (self.count_tokens(heading) if heading else 0)
+            for piece in TextUtils.iter_chunks(body, budget, 0, self.count_tokens):
+                yield f"{heading}\n{piece}".strip()
+        yield from self.pack(sections)
+
+
+class LogPolicy(ChunkingPolicy):
+    """Log entries grouped into time windows (multi-line entries such as tracebacks stay whole)
+    
+    Logs already collapsed by LogExtractor are packed by template instead.
+    """
+
+    name = "log"
+    overlap_tokens = 0
+    window_seconds = 300
+
+    TEMPLATE_RE = re.compile(r"(?m)^(?==== Template \d+)")
+
+    def __init__(self, *args, window_seconds: Optional[int] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if window_seconds is not None:
+            self.window_seconds = window_seconds
+
+    @staticmethod
+    def parse_timestamp(line: str) -> Optional[datetime]:
+        return split_timestamp(line)[0]
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        if text.startswith(LogExtractor.SUMMARY_HEADER):
+            # Mined template summary: whole template blocks
+            yield from self.pack(self.TEMPLATE_RE.split(text))
+            return
+        window, window_start, window_tokens = [], None, 0
+        entry = []
+        for line in text.split("\n"):
+            timestamp = self.parse_timestamp(line)
+            if timestamp is None or not entry:
+                entry.append(line)  # continuation line (or a first line without a time)
+                window_start = window_start or timestamp
+                continue
+            
+            entry_text = "\n".join(entry)
+            window.append(entry_text)
+            window_tokens += self.count_tokens(entry_text)
+            entry = [line]
+            # A new window starts once the span is reached, unless the current one
+            # is still small (sparse logs would otherwise give one chunk per line)
+            if (window_start is not None and (timestamp - window_start).total_seconds() >= self.window_seconds
+                    and window_tokens >= self.max_tokens // 4):
+                yield from self.pack(window)
+                window, window_start, window_tokens = [], timestamp, 0
+            window_start = window_start or timestamp
+        window.append("\n".join(entry))
+        yield from self.pack(window)
+
+
+POLICIES: Dict[str, Type[ChunkingPolicy]] = {
+    policy.name: policy for policy in (ProsePolicy, CodePolicy, SlidePolicy, TablePolicy, MarkdownPolicy, LogPolicy)
+}
+
+# File extension or FileUtils.get_file_type -> policy name; anything else is prose
+DEFAULT_POLICY_MAP = {
+    'code': 'code',
+    '.sh': 'code',
+    '.pptx': 'slides', '.ppt': 'slides', '.odp': 'slides',
+    'spreadsheet': 'table',
+    '.md': 'markdown', '.markdown': 'markdown',
+    '.log': 'log',
+}
+
+
+def parse_setting(spec: str) -> Dict[str, str]:
+    """Parse "key=value,key=value" config strings"""
+    pairs = (item.split("=", 1) for item in spec.split(",") if "=" in item)
+    return {key.strip().lower(): value.strip() for key, value in pairs}
+
+
+def policy_name_for(filepath: Path, overrides: Optional[Dict[str, str]] = None) -> str:
+    """Policy for a file: its extension is looked up first, then its file type"""
+    mapping = {**DEFAULT_POLICY_MAP, **(overrides or {})}
+    for key in (Path(filepath).suffix.lower(), FileUtils.get_file_type(Path(filepath))):
+        name = mapping.get(key)
+        if name in POLICIES:
+            return name
+        if name:
+            logger.warning(f"Unknown chunking policy '{name}' for {key}; using prose")
+            break
+    return ProsePolicy.name
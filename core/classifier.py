@@ -1,7 +1,9 @@
 """Hierarchical document classification system - Domain → Category → FileType"""
 
 import logging
-from typing import Dict
+from typing import Dict, Optional
+
+from core.keyword_matcher import KeywordMatcher
 
 logger = logging.getLogger(__name__)
 
@@ -236,49 +238,51 @@ class DocumentClassifier:
         }
     }
     
-    def _guardrail_classify(self, text_lower: str, filename_lower: str, filename: str):
+    # Rules ordered by specificity and risk of misclassification
+    GUARDRAIL_RULES = [
+        # Government & Personal (High priority to catch IDs)
+        {"domain":"Government","category":"ID","kw":["aadhaar", "pan card", "passport", "driving license", "voter id", "uidai"]},
+        {"domain":"Government","category":"Tax","kw":["form 16", "itr-v", "income tax return", "computation of income"]},
+        {"domain":"Personal","category":"Identity","kw":["curriculum vitae", "resume", "biodata"]},
+        {"domain":"Personal","category":"Bills","kw":["electricity bill", "gas bill", "credit card statement"]},
+
+        # Technology
+        {"domain":"Technology","category":"UAV","kw":["uav","drone","quadcopter","aerial","hexacopter"]},
+        {"domain":"Technology","category":"API","kw":["openapi","swagger","graphql","grpc","raml","api gateway","rest api","api documentation","http method"]},
+        {"domain":"Technology","category":"DevOps","kw":["docker","kubernetes","k8s","jenkins","terraform","ansible","helm","github actions","gitlab ci","ci/cd"]},
+        
+        # Code (Frontend/Backend)
+        {"domain":"Code","category":"Frontend","kw":["react","jsx","tsx","nextjs","<html","<!doctype","tailwind","redux","vue","angular"]},
+        {"domain":"Code","category":"Backend","kw":["express","django","flask","fastapi","spring boot","server","middleware","controller"]},
+        
+        # Healthcare (Specific reports)
+        {"domain":"Healthcare","category":"LabReport","kw":["pathology report", "blood test", "lipid profile", "cbc", "urine analysis"]},
+        {"domain":"Healthcare","category":"Clinical","kw":["discharge summary", "opd paper", "prescription", "admission form"]},
+        
+        # School & College (Admin)
+        {"domain":"School","category":"Admin","kw":["leaving certificate", "bonafide", "transfer certificate", "result sheet", "report card"]},
+        {"domain":"College","category":"Admin","kw":["transcript", "degree certificate", "provisional certificate", "migration certificate"]},
+
+        # Company (Product vs Service)
+        {"domain":"Company","category":"Product","kw":["product requirements", "prd", "user story", "sprint backlog", "release notes"]},
+        {"domain":"Company","category":"Service","kw":["statement of work", "sow", "service level agreement", "sla", "client proposal"]},
+        
+        # General Finance & Legal
+        {"domain":"Finance","category":"Tax","kw":["gst", "tax invoice", "tax return"]},
+        {"domain":"Legal","category":"Contract","kw":["non-disclosure agreement", "nda", "consulting agreement", "employment agreement"]},
+    ]
+
+    def _guardrail_classify(self, text_lower: str, filename_lower: str, filename: str, keyword_counts: Optional[Dict[str, int]] = None):
         """Apply explicit guardrail rules to prevent obvious misclassifications.
         Returns a forced classification dict or None.
         """
         ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+        if keyword_counts is None:
+            keyword_counts = self._count_keywords(text_lower)
 
-        # Rules ordered by specificity and risk of misclassification
-        rules = [
-            # Government & Personal (High priority to catch IDs)
-            {"domain":"Government","category":"ID","kw":["aadhaar", "pan card", "passport", "driving license", "voter id", "uidai"]},
-            {"domain":"Government","category":"Tax","kw":["form 16", "itr-v", "income tax return", "computation of income"]},
-            {"domain":"Personal","category":"Identity","kw":["curriculum vitae", "resume", "biodata"]},
-            {"domain":"Personal","category":"Bills","kw":["electricity bill", "gas bill", "credit card statement"]},
-
-            # Technology
-            {"domain":"Technology","category":"UAV","kw":["uav","drone","quadcopter","aerial","hexacopter"]},
-            {"domain":"Technology","category":"API","kw":["openapi","swagger","graphql","grpc","raml","api gateway","rest api","api documentation","http method"]},
-            {"domain":"Technology","category":"DevOps","kw":["docker","kubernetes","k8s","jenkins","terraform","ansible","helm","github actions","gitlab ci","ci/cd"]},
-            
-            # Code (Frontend/Backend)
-            {"domain":"Code","category":"Frontend","kw":["react","jsx","tsx","nextjs","<html","<!doctype","tailwind","redux","vue","angular"]},
-            {"domain":"Code","category":"Backend","kw":["express","django","flask","fastapi","spring boot","server","middleware","controller"]},
-            
-            # Healthcare (Specific reports)
-            {"domain":"Healthcare","category":"LabReport","kw":["pathology report", "blood test", "lipid profile", "cbc", "urine analysis"]},
-            {"domain":"Healthcare","category":"Clinical","kw":["discharge summary", "opd paper", "prescription", "admission form"]},
-            
-            # School & College (Admin)
-            {"domain":"School","category":"Admin","kw":["leaving certificate", "bonafide", "transfer certificate", "result sheet", "report card"]},
-            {"domain":"College","category":"Admin","kw":["transcript", "degree certificate", "provisional certificate", "migration certificate"]},
-
-            # Company (Product vs Service)
-            {"domain":"Company","category":"Product","kw":["product requirements", "prd", "user story", "sprint backlog", "release notes"]},
-            {"domain":"Company","category":"Service","kw":["statement of work", "sow", "service level agreement", "sla", "client proposal"]},
-            
-            # General Finance & Legal
-            {"domain":"Finance","category":"Tax","kw":["gst", "tax invoice", "tax return"]},
-            {"domain":"Legal","category":"Contract","kw":["non-disclosure agreement", "nda", "consulting agreement", "employment agreement"]},
-        ]
-
-        for rule in rules:
+        for rule in self.GUARDRAIL_RULES:
             # Check both text and filename for the keyword
-            if any(k in text_lower or k in filename_lower for k in rule["kw"]):
+            if any(k in keyword_counts or k in filename_lower for k in rule["kw"]):
                 return {
                     "domain": rule["domain"],
                     "category": rule["category"],
@@ -396,6 +400,27 @@ class DocumentClassifier:
         }
     }
     
+    _keyword_matcher = None
+
+    @classmethod
+    def _get_keyword_matcher(cls) -> KeywordMatcher:
+        """Compile every keyword table into one automaton (once per process)"""
+        if cls._keyword_matcher is None:
+            keywords = set()
+            for tiers in cls.DOMAIN_KEYWORDS.values():
+                keywords.update(tiers["strong"], tiers["weak"])
+            for categories in cls.CATEGORY_KEYWORDS_BY_DOMAIN.values():
+                for category_keywords in categories.values():
+                    keywords.update(category_keywords)
+            for rule in cls.GUARDRAIL_RULES:
+                keywords.update(rule["kw"])
+            cls._keyword_matcher = KeywordMatcher(keywords)
+        return cls._keyword_matcher
+
+    def _count_keywords(self, text_lower: str) -> Dict[str, int]:
+        """Occurrence count (as str.count) of every known keyword present in the text"""
+        return self._get_keyword_matcher().count_all(text_lower)
+
     def classify_hierarchical(self, text: str, filename: str = "") -> Dict[str, str]:
         """Classify content into hierarchical structure: Domain > Category > FileType
         
@@ -411,8 +436,11 @@ class DocumentClassifier:
             text_lower = text.lower()
             filename_lower = filename.lower()
 
+            # One pass over the text counts every domain, category and guardrail keyword
+            keyword_counts = self._count_keywords(text_lower)
+
             # Apply guardrail rules (broad coverage for major types)
-            forced = self._guardrail_classify(text_lower, filename_lower, filename)
+            forced = self._guardrail_classify(text_lower, filename_lower, filename, keyword_counts)
             if forced:
                 return forced
             
@@ -427,10 +455,10 @@ class DocumentClassifier:
                 score = 0
                 # Count strong keywords (2x weight)
                 for keyword in keywords["strong"]:
-                    score += text_lower.count(keyword) * 2
+                    score += keyword_counts.get(keyword, 0) * 2
                 # Count weak keywords (1x weight)
                 for keyword in keywords["weak"]:
-                    score += text_lower.count(keyword) * 1
+                    score += keyword_counts.get(keyword, 0) * 1
                 # Filename bonus (5x weight)
                 for keyword in keywords["strong"]:
                     if keyword in filename_lower:
@@ -453,7 +481,7 @@ class DocumentClassifier:
                 if category == "Other":
                     continue
                 # Sum keyword matches in text
-                score = sum(text_lower.count(kw) for kw in keywords)
+                score = sum(keyword_counts.get(kw, 0) for kw in keywords)
                 # Filename bonus
                 score += sum(5 for kw in keywords if kw in filename_lower)
                 category_scores[category] = score
@@ -0,0 +1,116 @@
+"""Token-budgeted packing of re-ranked chunks into the LLM prompt"""
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import logging
+
+from core.lexical_index import tokenize
+from utils import TextUtils
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PackedContext:
+    """Chunks that made it into the prompt and the tokens they use"""
+    chunks: List[dict] = field(default_factory=list)
+    text: str = ""
+    tokens: int = 0
+    budget: int = 0
+    trimmed: int = 0
+    dropped: int = 0
+
+
+class ContextPacker:
+    """Greedily fills a token budget with the best chunks, best first
+
+    Each chunk is added whole if it fits (and is under ``max_chunk_tokens``);
+    otherwise it is cut down to its sentences that share the most terms with
+    the query, kept in their original order, so the relevant part survives
+    rather than the prefix (a chunk with no query term keeps its opening).
+    Pieces smaller than ``min_chunk_tokens`` aren't worth a source slot and
+    are dropped.
+    """
+
+    ELLIPSIS = " ... "
+
+    def __init__(self, max_chunks: int = 5, max_chunk_tokens: int = 400, min_chunk_tokens: int = 24,
+                 count_tokens: Optional[Callable[[str], int]] = None):
+        self.max_chunks = max_chunks
+        self.max_chunk_tokens = max_chunk_tokens
+        self.min_chunk_tokens = min_chunk_tokens
+        self.count_tokens = count_tokens or TextUtils.estimate_tokens
+
+    @staticmethod
+    def source_header(index: int, chunk: dict) -> str:
+        return f"[Source {index}: {chunk['filename']}]"
+
+    def pack(self, query: str, chunks: List[dict], budget: int) -> PackedContext:
+        """Context text for the prompt using at most budget tokens"""
+        packed = PackedContext(budget=max(0, budget))
+        parts = []
+        remaining = packed.budget
+        terms = set(tokenize(query))
+
+        for chunk in chunks:
+            if len(packed.chunks) >= self.max_chunks:
+                break
+            header = self.source_header(len(packed.chunks) + 1, chunk)
+            # Header line, blank line between sources
+            room = min(remaining - self.count_tokens(header) - 2, self.max_chunk_tokens)
+            text = chunk['text'].strip()
+            tokens = self.count_tokens(text)
+            if tokens > room:
+                text, tokens = self.trim(text, terms, room)
+                if tokens < self.min_chunk_tokens:
+                    continue
+                packed.trimmed += 1
+            part = f"{header}\n{text}\n"
+            parts.append(part)
+            packed.chunks.append(chunk)
+            remaining -= self.count_tokens(part) + 1
+
+        packed.dropped = len(chunks) - len(packed.chunks)
+        packed.text = "\n".join(parts)
+        packed.tokens = self.count_tokens(packed.text) if parts else 0
+        return packed
+
+    def trim(self, text: str, terms: set, budget: int) -> tuple:
+        """(text, tokens) of the sentences most relevant to terms that fit in budget"""
+        if budget <= 0:
+            return "", 0
+        sentences = TextUtils.split_sentences(text)
+        scored: List[Dict] = []
+        for i, sentence in enumerate(sentences):
+            words = set(tokenize(sentence))
+            scored.append({
+                'index': i,
+                'text': sentence,
+                'tokens': self.count_tokens(sentence),
+                # Distinct query terms first, then earlier sentences
+                'rank': (-len(terms & words), i),
+            })
+
+        # Sentences without any query term only fill in when none has one
+        if any(s['rank'][0] < 0 for s in scored):
+            scored = [s for s in scored if s['rank'][0] < 0]
+        chosen, size = [], 0
+        for sentence in sorted(scored, key=lambda s: s['rank']):
+            cost = sentence['tokens'] + (self.count_tokens(self.ELLIPSIS) if chosen else 0)
+            if size + cost > budget:
+                continue
+            chosen.append(sentence)
+            size += cost
+
+        if not chosen:
+            # A single sentence longer than the budget: keep its words up to the budget
+            first = next(TextUtils.iter_chunks(text, budget, 0, self.count_tokens), "")
+            return first, self.count_tokens(first)
+
+        chosen.sort(key=lambda s: s['index'])
+        pieces = [chosen[0]['text']]
+        for previous, sentence in zip(chosen, chosen[1:]):
+            # Mark the gap where sentences were left out
+            pieces.append(" " if sentence['index'] == previous['index'] + 1 else self.ELLIPSIS)
+            pieces.append(sentence['text'])
+        result = "".join(pieces)
+        return result, self.count_tokens(result)
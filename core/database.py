@@ -1,19 +1,33 @@
 """ChromaDB database management"""
 import chromadb
 from chromadb.config import Settings
+from chromadb.utils import embedding_functions
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, List, Optional
+import atexit
+import json
 import logging
+import os
+import threading
 
-from models.document import DocumentChunk
+from models.document import Document, DocumentChunk
+from core.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from core.answer_cache import CorpusGeneration
+from core.catalog import DocumentCatalog
+from core.embedding_store import EmbeddingStore
+from core.write_buffer import ChunkWriteBuffer
+from utils import FileUtils, LRUCache, TextUtils
 
 logger = logging.getLogger(__name__)
 
 
 class DatabaseManager:
     """Manages ChromaDB operations"""
+
+    RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
     
-    def __init__(self, db_path: Path):
+    def __init__(self, db_path: Path, query_cache_size: int = 1024, persist_query_cache: bool = False,
+                 embedding_store_dir: Optional[Path] = None):
         self.db_path = Path(db_path)
         self.db_path.mkdir(parents=True, exist_ok=True)
         
@@ -22,81 +36,396 @@ class DatabaseManager:
             settings=Settings(anonymized_telemetry=False)
         )
         
+        # Same model Chroma uses by default; held here so queries can be embedded
+        # (and cached) before calling collection.query
+        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
         self.collection = self.client.get_or_create_collection(
             name="documents",
-            metadata={"hnsw:space": "cosine"}
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=self.embedding_function
         )
         
+        # Chunk embeddings persisted outside db_path, so a rebuild only runs the
+        # model on text it hasn't seen before
+        self.embedding_store = None
+        if embedding_store_dir is not None:
+            model_id = getattr(self.embedding_function, 'MODEL_NAME', type(self.embedding_function).__name__)
+            self.embedding_store = EmbeddingStore(embedding_store_dir, model_id=model_id)
+        
+        # Optional write-behind buffer (see enable_write_buffer)
+        self.write_buffer = None
+        self.durable_writes = True
+        
+        # Query embedding LRU keyed by normalized query text
+        self.query_cache = LRUCache(max_size=query_cache_size)
+        self.query_cache_path = self.db_path / "query_embedding_cache.json" if persist_query_cache else None
+        self._query_cache_dirty = 0
+        self._query_cache_lock = threading.Lock()
+        if self.query_cache_path:
+            self._load_query_cache()
+            atexit.register(self.save_query_cache)
+        
+        # BM25 index over the same chunks, kept in a SQLite file next to Chroma
+        self.lexical_index = LexicalIndex(self.db_path / "lexical_index.sqlite3")
+        self._backfill_lexical_index()
+        
+        # Bumped on every add/delete so cached answers can't outlive the corpus they came from
+        self.generation = CorpusGeneration(self.db_path / "corpus_generation.sqlite3")
+        
+        # One row per ingested file so path/hash lookups don't scan the collection
+        self.catalog = DocumentCatalog(self.db_path / "catalog.sqlite3")
+        self._backfill_catalog()
+        
+        # Called with the ids of chunks this manager deletes (in-process only)
+        self._delete_listeners: List[Callable[[List[str]], None]] = []
+        
         logger.info(f"Database initialized. Total documents: {self.collection.count()}")
     
-    def add_chunks(self, chunks: List[DocumentChunk]) -> None:
-        """Add document chunks to database"""
-        if not chunks:
+    def _backfill_lexical_index(self, page_size: int = 1000) -> None:
+        """Index chunks that were stored before the lexical index existed"""
+        total = self.collection.count()
+        if total == 0 or self.lexical_index.count() > 0:
+            return
+        
+        logger.info(f"Building lexical index for {total} existing chunks...")
+        for offset in range(0, total, page_size):
+            results = self.collection.get(limit=page_size, offset=offset, include=['documents'])
+            self.lexical_index.add(zip(results['ids'], results['documents']))
+        logger.info(f"Lexical index built: {self.lexical_index.count()} chunks")
+    
+    def _backfill_catalog(self, page_size: int = 1000) -> None:
+        """Catalog files whose chunks were stored without a catalog entry
+        
+        Covers chunks written before the catalog existed and by scripts that
+        call add_chunks directly; files already catalogued are left alone.
+        """
+        total = self.collection.count()
+        if total == 0 or self.catalog.chunk_count() >= total:
+            return
+        
+        logger.info(f"Reconciling document catalog with {total} stored chunks...")
+        catalogued = set(self.catalog.filepaths())
+        files = {}
+        for offset in range(0, total, page_size):
+            results = self.collection.get(limit=page_size, offset=offset, include=['metadatas'])
+            for chunk_id, metadata in zip(results['ids'], results['metadatas']):
+                metadata = metadata or {}
+                filepath = metadata.get('filepath')
+                if not filepath or filepath in catalogued:
+                    continue
+                entry = files.setdefault(filepath, {'metadata': metadata, 'chunk_ids': []})
+                entry['chunk_ids'].append(chunk_id)
+        
+        for filepath, entry in files.items():
+            metadata = entry['metadata']
+            path = Path(filepath)
+            stat = path.stat() if path.exists() else None
+            self.catalog.record(
+                filepath=filepath,
+                file_hash=metadata.get('file_hash', ''),
+                size_bytes=stat.st_size if stat else None,
+                mtime=stat.st_mtime if stat else None,
+                domain=metadata.get('category', 'Uncategorized'),
+                category=path.parent.parent.name if stat else '',
+                chunk_ids=entry['chunk_ids']
+            )
+        logger.info(f"Document catalog: {len(files)} files added, {self.catalog.count()} in total")
+    
+    def enable_write_buffer(self, max_chunks: int = 512, max_wait_ms: int = 500, durable: bool = True) -> None:
+        """Group-commit add_chunks calls from concurrent tasks in this process
+        
+        Chunks are flushed to Chroma when max_chunks are pending or the oldest
+        has waited max_wait_ms; add_chunks returns as soon as they are buffered.
+        With durable=True add_chunks instead writes at once and blocks until
+        done; calls that arrive during a write share the next one, so only
+        threaded or gevent pools coalesce, and solo/prefork pay no extra wait.
+        """
+        if self.write_buffer is None:
+            self.write_buffer = ChunkWriteBuffer(self._write_chunks, max_chunks=max_chunks, max_wait_ms=max_wait_ms)
+        self.durable_writes = durable
+        logger.info(f"Write buffer enabled ({max_chunks} chunks / {max_wait_ms} ms, durable={durable})")
+    
+    def flush_writes(self) -> None:
+        """Write out anything held in the write buffer"""
+        if self.write_buffer is not None:
+            self.write_buffer.flush()
+    
+    def close(self) -> None:
+        """Flush buffered writes and persist caches (for shutdown hooks)"""
+        if self.write_buffer is not None:
+            self.write_buffer.close()
+            self.write_buffer = None
+        self.save_query_cache()
+    
+    def add_chunks(self, chunks: List[DocumentChunk], on_written: Optional[Callable[[], None]] = None) -> None:
+        """Add document chunks to database, calling on_written once they are stored"""
+        if self.write_buffer is not None and chunks:
+            ticket = self.write_buffer.submit(chunks, on_written)
+            if self.durable_writes:
+                self.write_buffer.commit(ticket)
             return
         
+        if chunks:
+            self._write_chunks(chunks)
+        if on_written is not None:
+            on_written()
+    
+    def add_document(self, document: Document, chunks: List[DocumentChunk], category: str = "") -> None:
+        """Add a document's chunks and record the file in the catalog
+        
+        The catalog entry is written only after the chunks are stored (for
+        buffered writes, by the flush), so a failed write never leaves a
+        catalogued file without chunks.
+        """
+        self.add_chunks(chunks, on_written=lambda: self.catalog_document(document, chunks, category))
+    
+    def catalog_document(self, document: Document, chunks: List[DocumentChunk], category: str = "") -> None:
+        """Record a stored document (its chunks already added) in the catalog"""
+        path = Path(document.filepath)
+        try:
+            mtime = path.stat().st_mtime
+            quick_hash = FileUtils.get_quick_hash(path)
+        except OSError:
+            mtime = quick_hash = None
+        self.catalog.record(
+            filepath=str(document.filepath),
+            file_hash=document.file_hash,
+            size_bytes=document.size_bytes,
+            mtime=mtime,
+            domain=document.category,
+            category=category,
+            chunk_ids=[chunk.chunk_id for chunk in chunks],
+            quick_hash=quick_hash
+        )
+    
+    def reingest_document(self, document: Document, chunks: List[DocumentChunk], category: str = "") -> dict:
+        """Re-ingest a file in place, writing only the chunks that changed
+        
+        Diffs the new chunk ids against the ones catalogued for the same
+        filepath: new chunks are embedded and upserted, vanished ones deleted
+        and unchanged ones only get their metadata (hash, position) refreshed.
+        """
+        filepath = str(document.filepath)
+        entry = self.catalog.get(filepath)
+        if entry is not None:
+            old_ids = set(entry['chunk_ids'])
+        else:
+            old_ids = set(self.collection.get(where={"filepath": filepath}, include=[]).get('ids') or [])
+        
+        new_chunks = [chunk for chunk in chunks if chunk.chunk_id not in old_ids]
+        kept_chunks = [chunk for chunk in chunks if chunk.chunk_id in old_ids]
+        vanished = list(old_ids - {chunk.chunk_id for chunk in chunks})
+        
+        # Add before deleting so the file never drops out of search results
+        self.add_chunks(new_chunks)
+        batch_size = getattr(self.client, 'max_batch_size', None) or max(1, len(kept_chunks))
+        for start in range(0, len(kept_chunks), batch_size):
+            batch = kept_chunks[start:start + batch_size]
+            self.collection.update(ids=[chunk.chunk_id for chunk in batch],
+                                   metadatas=[chunk.to_metadata() for chunk in batch])
+        self.delete_ids(vanished)
+        self.catalog_document(document, chunks, category)
+        
+        logger.info(f"Re-ingested {document.filename}: {len(new_chunks)} added, "
+                    f"{len(kept_chunks)} unchanged, {len(vanished)} removed")
+        return {'added': len(new_chunks), 'unchanged': len(kept_chunks), 'removed': len(vanished)}
+    
+    def _write_chunks(self, chunks: List[DocumentChunk]) -> None:
+        """Write chunks to Chroma and the lexical index"""
         ids = [chunk.chunk_id for chunk in chunks]
         documents = [chunk.text for chunk in chunks]
         metadatas = [chunk.to_metadata() for chunk in chunks]
+        embeddings = self._embed_documents(documents) if self.embedding_store is not None else None
         
-        self.collection.add(
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
+        # Large batches are written in as few calls as Chroma allows; upsert
+        # so that writing the same chunk twice is harmless
+        batch_size = getattr(self.client, 'max_batch_size', None) or len(chunks)
+        for start in range(0, len(chunks), batch_size):
+            end = start + batch_size
+            self.collection.upsert(
+                documents=documents[start:end],
+                metadatas=metadatas[start:end],
+                ids=ids[start:end],
+                embeddings=embeddings[start:end] if embeddings is not None else None
+            )
+        self.lexical_index.add(zip(ids, documents))
+        self.generation.bump()
         
         logger.info(f"Added {len(chunks)} chunks to database")
     
-    def query(self, query_text: str, n_results: int = 5) -> List[dict]:
-        """Query database for relevant chunks with optimized matching"""
+    def _embed_documents(self, documents: List[str]) -> List[List[float]]:
+        """Embeddings for chunk texts, running the model only for texts not in the store"""
+        stored = self.embedding_store.get_many(documents)
+        missing = [i for i in range(len(documents)) if i not in stored]
+        if missing:
+            missing_texts = [documents[i] for i in missing]
+            computed = [[float(x) for x in e] for e in self.embedding_function(missing_texts)]
+            self.embedding_store.put_many(missing_texts, computed)
+            stored.update(zip(missing, computed))
+        
+        logger.info(f"Embeddings: {len(documents) - len(missing)} from store, {len(missing)} computed")
+        return [stored[i] for i in range(len(documents))]
+    
+    def query(self, query_text: str, n_results: int = 5, mode: str = "vector") -> List[dict]:
+        """Query database for relevant chunks
+        
+        Modes: "vector" (dense only), "lexical" (BM25 only) or "hybrid"
+        (both lists fused by reciprocal rank fusion).
+        """
         if self.collection.count() == 0:
             return []
+        if mode not in self.RETRIEVAL_MODES:
+            logger.warning(f"Unknown retrieval mode '{mode}', falling back to vector")
+            mode = "vector"
         
         try:
             # Get more results for better context coverage
             search_count = min(n_results * 4, self.collection.count())
             
-            results = self.collection.query(
-                query_texts=[query_text],
-                n_results=search_count
-            )
+            if mode == "vector":
+                return self._vector_search(query_text, search_count)[:n_results]
             
-            chunks = []
-            if results and results['documents'] and len(results['documents']) > 0:
-                # Improved similarity filtering with better thresholds
-                for i, doc in enumerate(results['documents'][0]):
-                    metadata = results['metadatas'][0][i] if results['metadatas'] else {}
-                    distance = results['distances'][0][i] if results['distances'] else 0
-                    
-                    # More aggressive filtering: distance < 1.3 for better recall
-                    if distance < 1.3:
-                        similarity = 1.0 - (distance / 2.0)
-                        chunks.append({
-                            'text': doc,
-                            'filename': metadata.get('filename', 'Unknown'),
-                            'category': metadata.get('category', 'Uncategorized'),
-                            'filepath': metadata.get('filepath', ''),
-                            'similarity': similarity,
-                            'distance': distance
-                        })
+            vector_chunks = self._vector_search(query_text, search_count) if mode == "hybrid" else []
+            lexical_hits = self.lexical_index.search(query_text, search_count)
             
-            # Sort by similarity (best first) and return top n_results
-            chunks.sort(key=lambda x: x['similarity'], reverse=True)
-            return chunks[:n_results]
+            rankings = [[c['chunk_id'] for c in vector_chunks], [chunk_id for chunk_id, _ in lexical_hits]]
+            fused = reciprocal_rank_fusion([r for r in rankings if r])[:n_results]
+            
+            by_id = {c['chunk_id']: c for c in vector_chunks}
+            bm25_scores = dict(lexical_hits)
+            missing = [chunk_id for chunk_id, _ in fused if chunk_id not in by_id]
+            if missing:
+                # Lexical-only hits were not in the vector top list, so they are
+                # at least as far from the query as the worst vector hit.
+                floor = max((c['distance'] for c in vector_chunks), default=1.3)
+                by_id.update(self._fetch_chunks(missing, distance=floor))
+            
+            chunks = []
+            for chunk_id, rrf_score in fused:
+                chunk = by_id.get(chunk_id)
+                if chunk is None:
+                    continue
+                chunk['rrf_score'] = rrf_score
+                chunk['bm25_score'] = bm25_scores.get(chunk_id, 0.0)
+                chunks.append(chunk)
+            return chunks
             
         except Exception as e:
             logger.error(f"Error querying database: {e}")
             return []
     
+    def _embed_query(self, query_text: str) -> List[float]:
+        """Embed a query, serving repeats from the LRU cache"""
+        key = TextUtils.normalize_query(query_text)
+        embedding = self.query_cache.get(key)
+        if embedding is not None:
+            return embedding
+        
+        # Embed the key itself so every spelling that shares it gets the same vector
+        embedding = [float(x) for x in self.embedding_function([key])[0]]
+        self.query_cache.put(key, embedding)
+        
+        if self.query_cache_path:
+            with self._query_cache_lock:
+                self._query_cache_dirty += 1
+                should_save = self._query_cache_dirty >= 50
+            if should_save:
+                self.save_query_cache()
+        return embedding
+    
+    def _load_query_cache(self) -> None:
+        """Load persisted query embeddings (oldest first so LRU order is kept)"""
+        if not self.query_cache_path.exists():
+            return
+        try:
+            with open(self.query_cache_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            for entry in entries:
+                self.query_cache.put(entry['query'], entry['embedding'], stored_at=entry.get('stored_at'))
+            logger.info(f"Loaded {len(self.query_cache)} cached query embeddings")
+        except Exception as e:
+            logger.error(f"Failed to load query embedding cache: {e}")
+    
+    def save_query_cache(self) -> None:
+        """Persist the query embedding cache to disk"""
+        if not self.query_cache_path:
+            return
+        with self._query_cache_lock:
+            try:
+                entries = [
+                    {'query': key, 'stored_at': stored_at, 'embedding': embedding}
+                    for key, stored_at, embedding in self.query_cache.items()
+                ]
+                tmp_path = self.query_cache_path.with_suffix('.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.query_cache_path)
+                self._query_cache_dirty = 0
+            except Exception as e:
+                logger.error(f"Failed to save query embedding cache: {e}")
+    
+    def get_cache_stats(self) -> dict:
+        """Hit/miss counters for the query embedding cache (and chunk embedding store)"""
+        stats = {'query_embedding': self.query_cache.stats()}
+        if self.embedding_store is not None:
+            stats['embedding_store'] = self.embedding_store.stats()
+        return stats
+    
+    def _vector_search(self, query_text: str, search_count: int) -> List[dict]:
+        """Dense retrieval, best first, with the distance filter applied"""
+        results = self.collection.query(
+            query_embeddings=[self._embed_query(query_text)],
+            n_results=search_count
+        )
+        
+        chunks = []
+        if results and results['documents'] and len(results['documents']) > 0:
+            # Improved similarity filtering with better thresholds
+            for i, doc in enumerate(results['documents'][0]):
+                metadata = results['metadatas'][0][i] if results['metadatas'] else {}
+                distance = results['distances'][0][i] if results['distances'] else 0
+                
+                # More aggressive filtering: distance < 1.3 for better recall
+                if distance < 1.3:
+                    chunks.append(self._make_chunk(results['ids'][0][i], doc, metadata, distance))
+        
+        # Sort by similarity (best first)
+        chunks.sort(key=lambda x: x['similarity'], reverse=True)
+        return chunks
+    
+    def _fetch_chunks(self, chunk_ids: List[str], distance: float) -> dict:
+        """Load chunks by id (used for lexical-only hits)"""
+        results = self.collection.get(ids=chunk_ids, include=['documents', 'metadatas'])
+        return {
+            chunk_id: self._make_chunk(chunk_id, results['documents'][i], results['metadatas'][i] or {}, distance)
+            for i, chunk_id in enumerate(results['ids'])
+        }
+    
+    @staticmethod
+    def _make_chunk(chunk_id: str, text: str, metadata: dict, distance: float) -> dict:
+        """Build the chunk dict returned by query()"""
+        return {
+            'chunk_id': chunk_id,
+            'text': text,
+            'filename': metadata.get('filename', 'Unknown'),
+            'category': metadata.get('category', 'Uncategorized'),
+            'filepath': metadata.get('filepath', ''),
+            'similarity': 1.0 - (distance / 2.0),
+            'distance': distance
+        }
+    
     def delete_by_hash(self, file_hash: str) -> int:
         """Delete all chunks for a given file hash"""
         try:
-            results = self.collection.get(where={"file_hash": file_hash})
-            if results and results.get('ids'):
-                self.collection.delete(ids=results['ids'])
-                deleted_count = len(results['ids'])
-                logger.info(f"Deleted {deleted_count} chunks for file hash {file_hash}")
-                return deleted_count
-            return 0
+            entries = self.catalog.remove_by_hash(file_hash)
+            ids = [chunk_id for entry in entries for chunk_id in entry['chunk_ids']]
+            if not entries:
+                # Not catalogued (e.g. written by an older script); fall back to the metadata filter
+                ids = self.collection.get(where={"file_hash": file_hash}, include=[]).get('ids') or []
+            self.delete_ids(ids)
+            if ids:
+                logger.info(f"Deleted {len(ids)} chunks for file hash {file_hash}")
+            return len(ids)
         except Exception as e:
             logger.error(f"Error deleting chunks: {e}")
             return 0
@@ -104,25 +433,68 @@ class DatabaseManager:
     def delete_by_filepath(self, filepath: str) -> int:
         """Delete all chunks associated with a specific filepath"""
         try:
-            results = self.collection.get(where={"filepath": filepath})
-            if results and results.get('ids'):
-                self.collection.delete(ids=results['ids'])
-                deleted_count = len(results['ids'])
-                logger.info(f"Deleted {deleted_count} chunks for filepath {filepath}")
-                return deleted_count
-            return 0
+            entry = self.catalog.remove(filepath)
+            if entry is not None:
+                ids = entry['chunk_ids']
+            else:
+                ids = self.collection.get(where={"filepath": filepath}, include=[]).get('ids') or []
+            self.delete_ids(ids)
+            if ids:
+                logger.info(f"Deleted {len(ids)} chunks for filepath {filepath}")
+            return len(ids)
         except Exception as e:
             logger.error(f"Error deleting by filepath: {e}")
             return 0
 
+    def delete_ids(self, ids: List[str]) -> None:
+        """Delete chunks by id from the collection and the lexical index"""
+        if not ids:
+            return
+        self.collection.delete(ids=ids)
+        self.lexical_index.remove(ids)
+        self.generation.bump()
+        for listener in self._delete_listeners:
+            try:
+                listener(list(ids))
+            except Exception as e:
+                logger.error(f"Delete listener failed: {e}")
+    
+    def add_delete_listener(self, listener: Callable[[List[str]], None]) -> None:
+        """Call listener(chunk_ids) whenever this manager deletes chunks"""
+        self._delete_listeners.append(listener)
+
+    def find_duplicate(self, filepath: Path, file_hash: Optional[str] = None) -> Optional[str]:
+        """Catalogued path holding the same content as filepath, if any
+        
+        Compares size and a head/tail quick hash first; the full content hash
+        is computed only when that fingerprint collides with a catalogued file.
+        """
+        filepath = Path(filepath)
+        candidates = self.catalog.find_by_fingerprint(filepath.stat().st_size, FileUtils.get_quick_hash(filepath))
+        candidates = [c for c in candidates if c['filepath'] != str(filepath)]
+        if not candidates:
+            return None
+        
+        file_hash = file_hash or FileUtils.get_file_hash(filepath)
+        for candidate in candidates:
+            if candidate['file_hash'] == file_hash:
+                return candidate['filepath']
+        return None
+    
     def has_filepath(self, filepath: str) -> bool:
-        """Check if any chunks exist for the given filepath"""
+        """Check if the given filepath has been ingested"""
         try:
-            results = self.collection.get(where={"filepath": filepath}, limit=1)
-            return bool(results and results.get('ids'))
+            if self.catalog.has(filepath):
+                return True
+            # Chunks stored without a catalog entry
+            return bool(self.collection.get(where={"filepath": str(filepath)}, limit=1, include=[]).get('ids'))
         except Exception:
             return False
     
+    def get_generation(self) -> int:
+        """Corpus generation counter (changes whenever chunks are added or deleted)"""
+        return self.generation.get()
+    
     def get_count(self) -> int:
         """Get total document count"""
         return self.collection.count()
@@ -0,0 +1,157 @@
+"""Persistent chunk embedding store: memory-mapped float32 rows plus a SQLite index"""
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import logging
+import sqlite3
+import threading
+
+import numpy as np
+import xxhash
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingStore:
+    """Embeddings keyed by hash of (chunk text, model id)
+
+    Vectors live in a memory-mapped ``<model>.f32`` file (one row per
+    embedding); ``<model>.index.sqlite3`` maps keys to rows. Rows are written
+    before their index entries are committed, so readers in other processes
+    never see a half-written vector. Kept outside the Chroma directory so a
+    rebuild only has to re-embed text that actually changed.
+    """
+
+    GROWTH_ROWS = 4096
+
+    def __init__(self, store_dir: Path, model_id: str, dim: Optional[int] = None):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.model_id = model_id
+
+        name = "".join(c if c.isalnum() or c in "-_." else "_" for c in model_id)
+        self.data_path = self.store_dir / f"{name}.f32"
+        self.data_path.touch(exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.store_dir / f"{name}.index.sqlite3"), check_same_thread=False, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+        # The dimension can be left to the first put_many (so opening the store
+        # doesn't require loading the model)
+        self.dim = None
+        self._mmap: Optional[np.memmap] = None
+        self._set_dim(dim)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text: str) -> str:
+        return xxhash.xxh3_128_hexdigest(f"{self.model_id}\0{text}".encode('utf-8'))
+
+    def _set_dim(self, dim: Optional[int]) -> None:
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        stored_dim = int(row[0]) if row else None
+        if stored_dim is None and dim is not None:
+            with self._conn:
+                self._conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('dim', ?)", (str(dim),))
+            stored_dim = dim
+        if dim is not None and stored_dim != dim:
+            raise ValueError(f"Embedding store {self.data_path} holds {stored_dim}-d vectors, not {dim}-d")
+        if stored_dim is not None and self.dim is None:
+            self.dim = stored_dim
+            self._remap()
+
+    def _capacity(self) -> int:
+        return self.data_path.stat().st_size // (4 * self.dim)
+
+    def _remap(self) -> None:
+        """(Re)open the memmap at the file's current size"""
+        rows = self._capacity()
+        self._mmap = np.memmap(self.data_path, dtype=np.float32, mode='r+', shape=(rows, self.dim)) if rows else None
+
+    def _rows(self, rows: Sequence[int]) -> np.ndarray:
+        if self._mmap is None or max(rows) >= self._mmap.shape[0]:
+            self._remap()  # another process grew the file
+        return np.asarray(self._mmap[list(rows)])
+
+    def _lookup(self, keys: Sequence[str]) -> Dict[str, int]:
+        """key -> row for the keys present in the index"""
+        found = {}
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            found.update(self._conn.execute(
+                f"SELECT key, row FROM embeddings WHERE key IN ({placeholders})", batch).fetchall())
+        return found
+
+    def get_many(self, texts: Sequence[str]) -> Dict[int, List[float]]:
+        """Map input position -> stored embedding, for the texts already in the store"""
+        keys = [self.key(text) for text in texts]
+        with self._lock:
+            if self.dim is None:
+                self._set_dim(None)  # another process may have stored the first vectors
+            found = self._lookup(keys) if self.dim is not None else {}
+
+            positions = [i for i, key in enumerate(keys) if key in found]
+            result = {}
+            if positions:
+                vectors = self._rows([found[keys[i]] for i in positions])
+                result = {i: vectors[n].tolist() for n, i in enumerate(positions)}
+
+        self.hits += len(result)
+        self.misses += len(keys) - len(result)
+        return result
+
+    def put_many(self, texts: Sequence[str], embeddings: Sequence[Sequence[float]]) -> None:
+        """Append embeddings for texts not already stored"""
+        if not texts:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
+        keys = [self.key(text) for text in texts]
+
+        with self._lock:
+            self._set_dim(vectors.shape[1])
+            # BEGIN IMMEDIATE serializes writers across processes while rows are allocated
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._lookup(keys)
+                new = {}
+                for key, vector in zip(keys, vectors):
+                    if key not in existing and key not in new:
+                        new[key] = vector
+                if not new:
+                    self._conn.execute("COMMIT")
+                    return
+
+                next_row = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM embeddings").fetchone()[0]
+                needed = next_row + len(new)
+                if needed > self._capacity():
+                    with open(self.data_path, 'r+b') as f:
+                        f.truncate((needed + self.GROWTH_ROWS) * 4 * self.dim)
+                if self._mmap is None or needed > self._mmap.shape[0]:
+                    self._remap()
+
+                self._mmap[next_row:needed] = np.stack(list(new.values()))
+                self._mmap.flush()
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (key, row) VALUES (?, ?)",
+                    [(key, next_row + i) for i, key in enumerate(new)]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': self.count(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,111 @@
+"""On-disk cache of extracted text, keyed by file content hash and extractor version"""
+from pathlib import Path
+from typing import Optional
+import logging
+import os
+import threading
+
+import zstandard
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionCache:
+    """zstd-compressed extracted text, one file per (content hash, extractor version)
+
+    Lives outside the Chroma directory so it survives DB rebuilds. When the
+    total size exceeds ``max_bytes`` the least recently used entries (by
+    mtime, refreshed on every hit) are deleted.
+    """
+
+    SUFFIX = ".txt.zst"
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 2 * 1024 ** 3, level: int = 3):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._lock = threading.Lock()
+        self._total_bytes = sum(entry.stat().st_size for entry in self._entries())
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, content_hash: str, version: str) -> Path:
+        # Two-character shards keep directories small
+        return self.cache_dir / content_hash[:2] / f"{content_hash}-{version}{self.SUFFIX}"
+
+    def _entries(self):
+        return (entry for entry in self.cache_dir.glob(f"*/*{self.SUFFIX}") if entry.is_file())
+
+    def get(self, content_hash: str, version: str) -> Optional[str]:
+        """Cached text, or None"""
+        path = self._path(content_hash, version)
+        try:
+            data = path.read_bytes()
+            text = self._decompressor.decompress(data).decode('utf-8')
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            # Missing, or evicted by another process between the read and the touch
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Dropping unreadable extraction cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return text
+
+    def put(self, content_hash: str, version: str, text: str) -> None:
+        """Store text (atomically) and evict old entries if over budget"""
+        path = self._path(content_hash, version)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            data = self._compressor.compress(text.encode('utf-8'))
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not write extraction cache entry {path.name}: {e}")
+            return
+
+        with self._lock:
+            self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until under 90% of the budget"""
+        # Rescan: other processes share the directory
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for _, size, entry in entries:
+            if total <= target:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        self._total_bytes = total
+        logger.info(f"Evicted {evicted} extraction cache entries ({total / 1024 ** 2:.1f} MB left)")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size_bytes': self._total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,78 @@
+"""Fingerprints of files queued for ingestion but not catalogued yet"""
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional
+import threading
+import logging
+
+from utils import FileUtils, LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class InFlightFiles:
+    """Lets the watcher skip a second copy of content that is still being ingested
+
+    The catalog only knows a file once a worker has stored it, so identical
+    files queued together would all be ingested. ``claim`` records each
+    queued file by (size, quick hash), computing full hashes only when that
+    collides, and returns the queued twin of a duplicate. The duplicate is
+    remembered as waiting on its twin: once the twin's task has finished
+    (stored or failed), ``release`` forgets the twin and hands its waiting
+    duplicates back to be checked again. Entries expire after
+    ``ttl_seconds`` in case a task's end is never seen.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: Optional[float] = 3600):
+        # (size, quick hash) -> [[path, full hash or None], ...]
+        self._queued = LRUCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._keys: Dict[str, Hashable] = {}
+        # queued path -> duplicates skipped because of it
+        self._waiting: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def claim(self, filepath: Path) -> Optional[str]:
+        """Path of a queued file with the same content (this one then waits on it); otherwise queue this one"""
+        filepath = Path(filepath)
+        key = (filepath.stat().st_size, FileUtils.get_quick_hash(filepath))
+        with self._lock:
+            entries = self._queued.get(key) or []
+            file_hash = None
+            for entry in entries:
+                other_path, other_hash = entry
+                if other_path == str(filepath):
+                    continue
+                if other_hash is None:
+                    try:
+                        other_hash = entry[1] = FileUtils.get_file_hash(Path(other_path))
+                    except OSError:
+                        continue  # already moved by the worker, so the catalog check covers it
+                file_hash = file_hash or FileUtils.get_file_hash(filepath)
+                if file_hash == other_hash:
+                    waiting = self._waiting.setdefault(other_path, [])
+                    if str(filepath) not in waiting:
+                        waiting.append(str(filepath))
+                    return other_path
+            if not any(path == str(filepath) for path, _ in entries):
+                entries.append([str(filepath), file_hash])
+            self._queued.put(key, entries)
+            self._keys[str(filepath)] = key
+            if len(self._keys) > 2 * self._queued.max_size:
+                self._prune()
+        return None
+
+    def release(self, filepath) -> List[str]:
+        """Forget a file whose task has finished; returns the duplicates that waited on it"""
+        filepath = str(filepath)
+        with self._lock:
+            key = self._keys.pop(filepath, None)
+            entries = self._queued.pop(key) if key is not None else None
+            remaining = [entry for entry in entries or [] if entry[0] != filepath]
+            if remaining:
+                self._queued.put(key, remaining)
+            return self._waiting.pop(filepath, [])
+
+    def _prune(self) -> None:
+        # Drop bookkeeping for entries the LRU has evicted or expired
+        live = {path for _, _, entries in self._queued.items() for path, _ in entries}
+        self._keys = {path: key for path, key in self._keys.items() if path in live}
+        self._waiting = {path: waiting for path, waiting in self._waiting.items() if path in live}
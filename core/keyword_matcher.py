@@ -0,0 +1,66 @@
+"""Multi-keyword counting in a single pass over the text (Aho-Corasick)"""
+from collections import Counter
+from operator import itemgetter
+from typing import Dict, Iterable
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional C extension
+    ahocorasick = None
+
+
+def _borders(keyword: str) -> list:
+    """Lengths k where the keyword's k-prefix equals its k-suffix (self-overlap points)"""
+    return [k for k in range(1, len(keyword)) if keyword[:k] == keyword[-k:]]
+
+
+class KeywordMatcher:
+    """Counts every keyword in one scan, with the same result as ``text.count(keyword)``
+
+    str.count counts non-overlapping occurrences. An automaton reports all
+    occurrences, which only differs for keywords that can overlap themselves
+    (e.g. "deed" in "deedeed"). For those we also feed the automaton the
+    overlap strings; if one shows up, that keyword is recounted with str.count.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = sorted({k for k in keywords if k})
+        self._keyword_set = set(self.keywords)
+        self._overlap_probes = {}  # probe string -> keywords it signals overlap for
+
+        for keyword in self.keywords:
+            for k in _borders(keyword):
+                self._overlap_probes.setdefault(keyword + keyword[k:], []).append(keyword)
+
+        self._automaton = None
+        if ahocorasick is not None:
+            automaton = ahocorasick.Automaton()
+            for word in self._keyword_set | set(self._overlap_probes):
+                automaton.add_word(word, word)
+            automaton.make_automaton()
+            self._automaton = automaton
+        else:
+            logger.warning("pyahocorasick not installed; keyword matching falls back to str.count")
+
+    def count_all(self, text: str) -> Dict[str, int]:
+        """Map each keyword found in text to its non-overlapping count (absent keywords omitted)"""
+        if not text:
+            return {}
+
+        if self._automaton is None:
+            counts = {k: text.count(k) for k in self.keywords}
+            return {k: n for k, n in counts.items() if n}
+
+        # Counter over a C iterator keeps the per-match cost out of Python bytecode
+        counts = Counter(map(itemgetter(1), self._automaton.iter(text)))
+
+        for probe, keywords in self._overlap_probes.items():
+            hit = counts.get(probe, 0) if probe in self._keyword_set else counts.pop(probe, 0)
+            if hit:
+                for keyword in keywords:
+                    counts[keyword] = text.count(keyword)
+
+        return dict(counts)
@@ -0,0 +1,173 @@
+"""Persistent BM25 inverted index kept alongside the Chroma collection"""
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tokens are runs of letters/digits, so "ERR-1042" and "form 16" both
+# survive as exact terms ("err", "1042", "form", "16").
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have",
+    "in", "is", "it", "its", "of", "on", "or", "that", "the", "this", "to", "was",
+    "were", "what", "when", "where", "which", "who", "will", "with", "how", "does",
+    "do", "can", "about", "tell", "me"
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokenizer shared by indexing and querying"""
+    if not text:
+        return []
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class LexicalIndex:
+    """BM25 inverted index over chunk text, stored in a SQLite sidecar file"""
+
+    def __init__(self, index_path: Path, k1: float = 1.5, b: float = 0.75):
+        self.index_path = Path(index_path)
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.index_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        """Create tables on first use"""
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    chunk_id TEXT PRIMARY KEY,
+                    length INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, chunk_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_postings_chunk ON postings(chunk_id);
+                CREATE TABLE IF NOT EXISTS stats (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO stats (key, value) VALUES ('doc_count', 0), ('total_length', 0);
+            """)
+
+    def add(self, items: Iterable[Tuple[str, str]]) -> None:
+        """Index (chunk_id, text) pairs, replacing any existing entry for the same id"""
+        items = list(items)
+        if not items:
+            return
+
+        with self._lock, self._conn:
+            self._remove_locked([chunk_id for chunk_id, _ in items])
+
+            chunk_rows = []
+            posting_rows = []
+            total_length = 0
+            for chunk_id, text in items:
+                terms = tokenize(text)
+                chunk_rows.append((chunk_id, len(terms)))
+                total_length += len(terms)
+                posting_rows.extend((term, chunk_id, tf) for term, tf in Counter(terms).items())
+
+            self._conn.executemany("INSERT INTO chunks (chunk_id, length) VALUES (?, ?)", chunk_rows)
+            self._conn.executemany("INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)", posting_rows)
+            self._conn.execute("UPDATE stats SET value = value + ? WHERE key = 'doc_count'", (len(chunk_rows),))
+            self._conn.execute("UPDATE stats SET value = value + ? WHERE key = 'total_length'", (total_length,))
+
+    def remove(self, chunk_ids: Iterable[str]) -> int:
+        """Remove chunks from the index, returns number removed"""
+        chunk_ids = list(chunk_ids)
+        if not chunk_ids:
+            return 0
+        with self._lock, self._conn:
+            return self._remove_locked(chunk_ids)
+
+    def _remove_locked(self, chunk_ids: List[str]) -> int:
+        """Remove chunks; caller holds the lock and an open transaction"""
+        removed = 0
+        removed_length = 0
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(chunk_ids), 500):
+            batch = chunk_ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            row = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks WHERE chunk_id IN ({placeholders})",
+                batch
+            ).fetchone()
+            if not row[0]:
+                continue
+            removed += row[0]
+            removed_length += row[1]
+            self._conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", batch)
+            self._conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({placeholders})", batch)
+
+        if removed:
+            self._conn.execute("UPDATE stats SET value = value - ? WHERE key = 'doc_count'", (removed,))
+            self._conn.execute("UPDATE stats SET value = value - ? WHERE key = 'total_length'", (removed_length,))
+        return removed
+
+    def search(self, query_text: str, n_results: int = 10) -> List[Tuple[str, float]]:
+        """Return (chunk_id, bm25_score) pairs, best first"""
+        terms = set(tokenize(query_text))
+        if not terms:
+            return []
+
+        with self._lock:
+            stats = dict(self._conn.execute("SELECT key, value FROM stats").fetchall())
+            doc_count = stats.get('doc_count', 0)
+            if doc_count <= 0:
+                return []
+            avg_length = max(stats.get('total_length', 0) / doc_count, 1.0)
+
+            scores: Dict[str, float] = {}
+            for term in terms:
+                rows = self._conn.execute(
+                    "SELECT p.chunk_id, p.tf, c.length FROM postings p "
+                    "JOIN chunks c ON c.chunk_id = p.chunk_id WHERE p.term = ?",
+                    (term,)
+                ).fetchall()
+                if not rows:
+                    continue
+                df = len(rows)
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                for chunk_id, tf, length in rows:
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        return ranked[:n_results]
+
+    def count(self) -> int:
+        """Number of indexed chunks"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM stats WHERE key = 'doc_count'").fetchone()
+        return int(row[0]) if row else 0
+
+    def clear(self) -> None:
+        """Drop every indexed chunk"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("UPDATE stats SET value = 0")
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse several ranked id lists: score(d) = sum(1 / (k + rank))"""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, 1):
+            fused[item_id] = fused.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
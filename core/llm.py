@@ -1,10 +1,16 @@
 """LLM service using Ollama for response generation and semantic operations"""
 import ollama
 import logging
-import re
-from typing import Tuple, List, Dict, Optional
-from sentence_transformers import CrossEncoder
+from typing import Tuple, List, Dict, Iterator, Optional
+import numpy as np
+from config import Config
 from core.classifier import DocumentClassifier
+from core.context_packer import ContextPacker
+from core.lexical_index import tokenize
+from core.rerank_batcher import RerankBatcher
+from core.rerank_cache import RerankScoreCache
+from core.reranker import create_reranker
+from utils import TextUtils
 
 logger = logging.getLogger(__name__)
 
@@ -15,13 +21,30 @@ class LLMService:
     def __init__(self, model: str = "llama3.2"):
         self.model = model
         self.classifier = DocumentClassifier()
-        try:
-            logger.info("Loading CrossEncoder model for re-ranking...")
-            self.reranker = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2', max_length=512)
-            logger.info("CrossEncoder loaded successfully.")
-        except Exception as e:
-            logger.error(f"Failed to load CrossEncoder: {e}")
-            self.reranker = None
+        self.reranker = create_reranker(
+            Config.RERANKER_BACKEND,
+            Config.RERANKER_MODEL,
+            max_length=Config.RERANKER_MAX_LENGTH,
+            batch_size=Config.RERANKER_BATCH_SIZE,
+            threads=Config.RERANKER_THREADS,
+            cache_dir=Config.RERANKER_CACHE_DIR
+        )
+        self.rerank_batcher = None
+        if self.reranker and Config.RERANK_BATCHING_ENABLED:
+            self.rerank_batcher = RerankBatcher(
+                self.reranker,
+                max_pairs=Config.RERANK_BATCH_MAX_PAIRS,
+                max_wait_ms=Config.RERANK_BATCH_MAX_WAIT_MS
+            )
+        self.count_tokens = TextUtils.load_token_counter(Config.PROMPT_TOKENIZER)
+        self.context_packer = ContextPacker(
+            max_chunks=5,
+            max_chunk_tokens=Config.PROMPT_CHUNK_MAX_TOKENS,
+            count_tokens=self.count_tokens
+        )
+        self.rerank_cache = None
+        if self.reranker and Config.RERANK_CACHE_SIZE > 0:
+            self.rerank_cache = RerankScoreCache(Config.RERANK_CACHE_SIZE, model_version=self.reranker.version)
         logger.info(f"LLM Service initialized with model: {model}")
     
     def classify_hierarchical(self, text: str, filename: str = "") -> Dict:
@@ -54,25 +77,81 @@ class LLMService:
         else:
             return "🔴 LOW"
 
+    def _prefilter_scores(self, query: str, chunks: List[dict]) -> np.ndarray:
+        """Cheap first-stage score: dense similarity plus query-term coverage, both scaled to 0..1"""
+        terms = set(tokenize(query))
+        similarity = np.array([float(c.get('similarity', 0) or 0) for c in chunks])
+        coverage = np.array([
+            len(terms.intersection(tokenize(c.get('text', '')))) / len(terms) if terms else 0.0
+            for c in chunks
+        ])
+        scores = np.zeros(len(chunks))
+        for feature in (similarity, coverage):
+            spread = feature.max() - feature.min()
+            if spread > 0:
+                scores += (feature - feature.min()) / spread
+        return scores
+    
+    def _score_chunks(self, query: str, chunks: List[dict]) -> List[float]:
+        """Cross-encoder scores for chunks (batched with concurrent requests when enabled)
+        
+        Scores cached for this query are reused; only the missing pairs go to the model.
+        """
+        chunk_ids = [chunk.get('chunk_id') for chunk in chunks]
+        cached = {}
+        if self.rerank_cache is not None:
+            cached = self.rerank_cache.get_many(query, [chunk_id for chunk_id in chunk_ids if chunk_id])
+        scores = [cached.get(chunk_id) for chunk_id in chunk_ids]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            computed = (self.rerank_batcher or self.reranker).score(query, [chunks[i]['text'] for i in missing])
+            for i, score in zip(missing, computed):
+                scores[i] = float(score)
+            if self.rerank_cache is not None:
+                self.rerank_cache.put_many(query, {chunk_ids[i]: scores[i] for i in missing if chunk_ids[i]})
+        return scores
+    
     def _rerank_chunks(self, query: str, chunks: List[dict], top_k: int = 5) -> List[dict]:
-        """Re-rank chunks using Cross-Encoder"""
+        """Re-rank chunks using Cross-Encoder
+        
+        Cascade: the prefilter score keeps the best RERANK_PREFILTER_KEEP
+        candidates, which are cross-encoded best-first (top_k, then
+        RERANK_CASCADE_STEP at a time). Scoring stops once a whole step
+        lands RERANK_CASCADE_MARGIN or more below the current k-th best.
+        """
         if not self.reranker or not chunks:
             return chunks[:top_k]
             
         try:
-            # Create pairs of (query, document_text)
-            pairs = [[query, chunk['text']] for chunk in chunks]
-            
-            # Predict scores
-            scores = self.reranker.predict(pairs)
+            candidates = chunks
+            if Config.RERANK_CASCADE_ENABLED and len(chunks) > top_k:
+                order = np.argsort(-self._prefilter_scores(query, chunks), kind='stable')
+                keep = max(top_k, Config.RERANK_PREFILTER_KEEP)
+                candidates = [chunks[i] for i in order[:keep]]
             
-            # Attach scores to chunks
-            for i, chunk in enumerate(chunks):
-                chunk['relevance_score'] = float(scores[i])
+            scored, early_exit = [], False
+            start, size = 0, len(candidates)
+            if Config.RERANK_CASCADE_ENABLED:
+                size = top_k
+            while start < len(candidates):
+                batch = candidates[start:start + size]
+                scores = self._score_chunks(query, batch)
+                for chunk, score in zip(batch, scores):
+                    chunk['relevance_score'] = float(score)
+                scored.extend(batch)
+                start += len(batch)
+                size = max(1, Config.RERANK_CASCADE_STEP)
+                if start < len(candidates) and len(scored) > top_k:
+                    kth = sorted((c['relevance_score'] for c in scored), reverse=True)[top_k - 1]
+                    if kth - max(float(s) for s in scores) >= Config.RERANK_CASCADE_MARGIN:
+                        early_exit = True
+                        break
                 
             # Sort by new relevance score
-            reranked = sorted(chunks, key=lambda x: x['relevance_score'], reverse=True)
+            reranked = sorted(scored, key=lambda x: x['relevance_score'], reverse=True)
             
+            logger.info(f"Re-rank cascade: {len(chunks)} candidates -> {len(candidates)} after prefilter -> "
+                        f"{len(scored)} cross-encoded{' (early exit)' if early_exit else ''}")
             logger.info(f"Re-ranking complete. Top chunk: {reranked[0].get('filename')} (Score: {reranked[0].get('relevance_score'):.4f})")
             return reranked[:top_k]
             
@@ -80,21 +159,26 @@ class LLMService:
             logger.error(f"Re-ranking failed: {e}")
             return chunks[:top_k]
     
-    def generate_response(self, query: str, context_chunks: List[dict]) -> Tuple[str, List[str], float, List[dict]]:
-        """Generate response STRICTLY from documents only - no external knowledge"""
-        
-        if not context_chunks:
-            # No documents found - cannot answer
-            return "I don't have this information in your documents. Please upload relevant documents or ask questions about the documents you've provided.", [], 0, []
-        
-        # Relevance filter: prefer chunks containing query keywords
-        keywords = [w.strip().lower() for w in re.split(r"[^A-Za-z0-9]+", query) if len(w.strip()) > 2]
-        def relevance(c):
-            text = c.get('text', '').lower()
-            hits = sum(1 for k in keywords if k and k in text)
-            sim = float(c.get('similarity', 0) or 0)
-            return hits * 2 + sim
+    # Ollama generation options shared by the blocking and streaming paths
+    GENERATION_OPTIONS = {
+        "temperature": 0.3,
+        "top_p": 0.9,
+        "top_k": 40,
+        "num_predict": 1024,
+        "num_ctx": 4096,
+        "repeat_penalty": 1.1,
+        "num_thread": 8,
+    }
+    
+    NO_DOCUMENTS_ANSWER = "I don't have this information in your documents. Please upload relevant documents or ask questions about the documents you've provided."
+    OLLAMA_UNAVAILABLE_ANSWER = "I cannot answer right now because Ollama is not running. Please start Ollama to get AI-powered answers from your documents."
+    
+    def prepare_context(self, query: str, context_chunks: List[dict]) -> Dict:
+        """Re-rank and filter chunks, build source snippets and the prompt
         
+        Returns dict with: chunks, source_snippets, cited_files, confidence_score,
+        confidence_level, prompt, prompt_tokens, context_tokens.
+        """
         # Re-rank deeper pool of chunks (using CrossEncoder)
         context_chunks = self._rerank_chunks(query, context_chunks, top_k=5)
         
@@ -114,6 +198,19 @@ class LLMService:
             for i, c in enumerate(context_chunks):
                 logger.info(f"Chunk {i+1} ({c['filename']}): {c['text'][:100]}...")
             
+        # Fit the best chunks into what num_ctx leaves after the instructions and the answer
+        prompt_overhead = self.count_tokens(self._build_prompt(query, ""))
+        budget = (self.GENERATION_OPTIONS["num_ctx"] - self.GENERATION_OPTIONS["num_predict"]
+                  - prompt_overhead - Config.PROMPT_RESERVE_TOKENS)
+        if Config.PROMPT_CONTEXT_TOKENS > 0:
+            budget = min(budget, Config.PROMPT_CONTEXT_TOKENS)
+        packed = self.context_packer.pack(query, context_chunks, budget)
+        context_chunks = packed.chunks
+        full_prompt = self._build_prompt(query, packed.text)
+        prompt_tokens = self.count_tokens(full_prompt)
+        logger.info(f"Prompt: {prompt_tokens} tokens, {packed.tokens} of them context from {len(packed.chunks)} chunks "
+                    f"({packed.trimmed} trimmed, {packed.dropped} dropped, context budget {packed.budget})")
+        
         confidence_score = self._calculate_confidence(query, context_chunks)
         confidence_level = self._get_confidence_level(confidence_score)
         
@@ -129,19 +226,25 @@ class LLMService:
             }
             source_snippets.append(snippet)
         
-        context_parts = []
-        for i, chunk in enumerate(context_chunks, 1):
-            source_info = f"[Source {i}: {chunk['filename']}]"
-            context_parts.append(f"{source_info}\n{chunk['text']}\n")
-        
-        context_text = "\n".join(context_parts)
-        
+        return {
+            'chunks': context_chunks,
+            'source_snippets': source_snippets,
+            'cited_files': list(set([chunk['filename'] for chunk in context_chunks])),
+            'confidence_score': confidence_score,
+            'confidence_level': confidence_level,
+            'prompt': full_prompt,
+            'prompt_tokens': prompt_tokens,
+            'context_tokens': packed.tokens
+        }
+    
+    def _build_prompt(self, query: str, context_text: str) -> str:
+        """Full prompt: fixed instructions, the packed documents and the question"""
         # STRICT DOCUMENT-ONLY PROMPT - No external knowledge allowed
         # If query asks for definition, require a direct definition first
         needs_definition = any(x in query.lower() for x in ["what is", "define", "definition of", "meaning of"]) 
         definition_preamble = "" if not needs_definition else "Provide a concise 1-2 line definition FIRST, then details."
 
-        full_prompt = f"""You are a helpful AI assistant that answers questions EXCLUSIVELY and STRICTLY based on the provided documents.
+        return f"""You are a helpful AI assistant that answers questions EXCLUSIVELY and STRICTLY based on the provided documents.
 
 CRITICAL RULES:
 1. ONLY answer using information from the documents below
@@ -160,68 +263,122 @@ Documents:
 Question: {query}
 
 Answer ONLY based on the documents above. Provide a comprehensive, detailed answer with all relevant information. If information is not in documents, say so clearly:"""
+    
+    def _finalize_answer(self, answer: str, context: Dict) -> Tuple[str, List[str], float, List[dict]]:
+        """Apply the 'no info' check and append confidence/sources to a raw LLM answer"""
+        answer = answer.strip()
+        
+        # Check if LLM says information is not in documents
+        no_info_phrases = [
+            "don't have this information",
+            "not in the provided documents",
+            "not in the documents",
+            "cannot find this information",
+            "no information about",
+            "not mentioned in the documents",
+            "not available in the documents"
+        ]
+        
+        is_no_info = any(phrase in answer.lower() for phrase in no_info_phrases)
+        
+        # FIX: If answer is long (>100 chars) and contains "no info" phrase, it's likely a hallucinated suffix.
+        # We should valid the answer if it has substance.
+        if is_no_info and len(answer) > 100:
+            logger.warning(f"Detected 'no info' phrase but answer length is {len(answer)}. Treating as valid.")
+            is_no_info = False
+        
+        if is_no_info:
+            # Don't add sources/confidence if information not found
+            return answer, [], 0, []
+        
+        cited_files = context['cited_files']
+        confidence_score = context['confidence_score']
+        
+        if cited_files:
+            answer += f"\n\n📊 Confidence: {context['confidence_level']} ({confidence_score}%)"
+            answer += f"\n📄 Sources: {', '.join(cited_files)}"
+        
+        return answer, cited_files, confidence_score, context['source_snippets']
+    
+    def _error_answer(self, e: Exception) -> Tuple[str, List[str], float, List[dict]]:
+        """Map a generation failure to a user-facing answer"""
+        error_msg = str(e).lower()
+        
+        # Check if it's an Ollama connection error
+        if "connection" in error_msg or "ollama" in error_msg or "failed" in error_msg:
+            logger.warning(f"Ollama unavailable: {e}")
+            # Return message asking to start Ollama
+            return self.OLLAMA_UNAVAILABLE_ANSWER, [], 0, []
+        
+        logger.error(f"Error generating response: {e}")
+        return f"Error: Unable to generate response. {str(e)}", [], 0, []
+    
+    def generate_response(self, query: str, context_chunks: List[dict]) -> Tuple[str, List[str], float, List[dict]]:
+        """Generate response STRICTLY from documents only - no external knowledge"""
+        
+        if not context_chunks:
+            # No documents found - cannot answer
+            return self.NO_DOCUMENTS_ANSWER, [], 0, []
+        
+        context = self.prepare_context(query, context_chunks)
         
         try:
             response = ollama.generate(
                 model=self.model,
-                prompt=full_prompt,
+                prompt=context['prompt'],
                 stream=False,
-                options={
-                    "temperature": 0.3,
-                    "top_p": 0.9,
-                    "top_k": 40,
-                    "num_predict": 1024,
-                    "num_ctx": 4096,
-                    "repeat_penalty": 1.1,
-                    "num_thread": 8,
-                }
+                options=self.GENERATION_OPTIONS
             )
-            
-            answer = response['response'].strip()
-            
-            # Check if LLM says information is not in documents
-            no_info_phrases = [
-                "don't have this information",
-                "not in the provided documents",
-                "not in the documents",
-                "cannot find this information",
-                "no information about",
-                "not mentioned in the documents",
-                "not available in the documents"
-            ]
-            
-            is_no_info = any(phrase in answer.lower() for phrase in no_info_phrases)
-            
-            # FIX: If answer is long (>100 chars) and contains "no info" phrase, it's likely a hallucinated suffix.
-            # We should valid the answer if it has substance.
-            if is_no_info and len(answer) > 100:
-                logger.warning(f"Detected 'no info' phrase but answer length is {len(answer)}. Treating as valid.")
-                is_no_info = False
-            
-            if is_no_info:
-                # Don't add sources/confidence if information not found
-                return answer, [], 0, []
-            
-            cited_files = list(set([chunk['filename'] for chunk in context_chunks]))
-            
-            if cited_files:
-                answer += f"\n\n📊 Confidence: {confidence_level} ({confidence_score}%)"
-                answer += f"\n📄 Sources: {', '.join(cited_files)}"
-            
-            return answer, cited_files, confidence_score, source_snippets
+            return self._finalize_answer(response['response'], context)
             
         except Exception as e:
-            error_msg = str(e).lower()
+            return self._error_answer(e)
+    
+    def stream_response(self, query: str, context_chunks: List[dict]) -> Iterator[Tuple[str, Dict]]:
+        """Stream a response as (event, payload) pairs
+        
+        Emits "metadata" (snippets, cited files, confidence) as soon as re-ranking
+        is done, then one "token" per Ollama chunk, then a final "done" carrying
+        the same fields generate_response returns.
+        """
+        if not context_chunks:
+            yield 'done', self._response_payload(self.NO_DOCUMENTS_ANSWER, [], 0, [])
+            return
+        
+        context = self.prepare_context(query, context_chunks)
+        yield 'metadata', {
+            'source_snippets': context['source_snippets'],
+            'cited_files': context['cited_files'],
+            'confidence_score': context['confidence_score'],
+            'prompt_tokens': context['prompt_tokens']
+        }
+        
+        parts = []
+        try:
+            for part in ollama.generate(
+                model=self.model,
+                prompt=context['prompt'],
+                stream=True,
+                options=self.GENERATION_OPTIONS
+            ):
+                token = part.get('response', '')
+                if token:
+                    parts.append(token)
+                    yield 'token', {'text': token}
             
-            # Check if it's an Ollama connection error
-            if "connection" in error_msg or "ollama" in error_msg or "failed" in error_msg:
-                logger.warning(f"Ollama unavailable: {e}")
-                # Return message asking to start Ollama
-                return "I cannot answer right now because Ollama is not running. Please start Ollama to get AI-powered answers from your documents.", [], 0, []
+            yield 'done', self._response_payload(*self._finalize_answer(''.join(parts), context))
             
-            else:
-                logger.error(f"Error generating response: {e}")
-                return f"Error: Unable to generate response. {str(e)}", [], 0, []
+        except Exception as e:
+            yield 'done', self._response_payload(*self._error_answer(e))
+    
+    @staticmethod
+    def _response_payload(answer: str, cited_files: List[str], confidence_score: float, source_snippets: List[dict]) -> Dict:
+        return {
+            'answer': answer,
+            'cited_files': cited_files,
+            'confidence_score': confidence_score,
+            'source_snippets': source_snippets
+        }
     
     def check_availability(self) -> bool:
         """Check if Ollama is available"""
@@ -2,14 +2,20 @@
 from pathlib import Path
 from typing import List, Optional
 from datetime import datetime
+import hashlib
 import logging
 
+import xxhash
+
 from models.document import Document, DocumentChunk
 from extractors import (
     PDFExtractor, ImageExtractor, AudioExtractor,
-    DocumentExtractor, CodeExtractor
+    DocumentExtractor, CodeExtractor, OCREngine, LogExtractor
 )
-from utils import FileUtils, TextUtils
+from utils import FileUtils, FileSnapshot, TextUtils, LRUCache
+from config import Config
+from core.extraction_cache import ExtractionCache
+from core.chunking import POLICIES, ChunkingPolicy, LogPolicy, parse_setting, policy_name_for
 
 logger = logging.getLogger(__name__)
 
@@ -17,14 +23,101 @@ logger = logging.getLogger(__name__)
 class FileProcessor:
     """Processes files and extracts text"""
     
-    def __init__(self):
-        self.pdf_extractor = PDFExtractor()
-        self.image_extractor = ImageExtractor()
+    # Bump when extractor output changes so cached extractions are not reused
+    EXTRACTOR_VERSION = "1"
+    # Slow extractors whose output is worth caching (text/code files are cheap to re-read)
+    CACHED_FILE_TYPES = {'pdf', 'image', 'document', 'presentation', 'spreadsheet'}
+    CACHED_EXTENSIONS = {'.log'}  # template mining reads the whole log
+    
+    def __init__(self, extraction_cache: Optional[ExtractionCache] = None):
+        # One OCR engine shared by images, scanned PDF pages and embedded pictures
+        self.ocr_engine = OCREngine(
+            max_workers=Config.OCR_MAX_WORKERS or None,
+            threads_per_worker=Config.OCR_THREADS_PER_WORKER,
+            batch_size=Config.OCR_BATCH_SIZE,
+            target_dpi=Config.OCR_DPI,
+            lang=Config.OCR_LANG
+        )
+        self.pdf_extractor = PDFExtractor(
+            engine=Config.PDF_ENGINE,
+            parallel_min_pages=Config.PDF_PARALLEL_MIN_PAGES,
+            max_workers=Config.PDF_MAX_WORKERS or None,
+            ocr_engine=self.ocr_engine if Config.PDF_OCR_ENABLED else None,
+            ocr_dpi=Config.OCR_DPI,
+            ocr_embedded_images=Config.OCR_EMBEDDED_IMAGES
+        )
+        self.image_extractor = ImageExtractor(self.ocr_engine)
         self.audio_extractor = AudioExtractor()
         self.document_extractor = DocumentExtractor()
         self.code_extractor = CodeExtractor()
+        self.log_extractor = LogExtractor(
+            similarity=Config.LOG_TEMPLATE_SIMILARITY,
+            min_lines=Config.LOG_MINING_MIN_LINES
+        ) if Config.LOG_TEMPLATE_MINING else None
+        
+        # Extracted text keyed by content hash, shared by the worker and rebuild scripts
+        if extraction_cache is None and Config.EXTRACTION_CACHE_ENABLED:
+            extraction_cache = ExtractionCache(
+                Config.EXTRACTION_CACHE_DIR,
+                max_bytes=Config.EXTRACTION_CACHE_MAX_MB * 1024 ** 2
+            )
+        self.extraction_cache = extraction_cache
+        settings = (self.EXTRACTOR_VERSION, Config.PDF_ENGINE, Config.PDF_OCR_ENABLED,
+                    Config.OCR_LANG, Config.OCR_DPI, Config.OCR_EMBEDDED_IMAGES,
+                    Config.LOG_TEMPLATE_MINING, Config.LOG_MINING_MIN_LINES, Config.LOG_TEMPLATE_SIMILARITY)
+        self.extraction_version = hashlib.sha1(repr(settings).encode()).hexdigest()[:12]
+        self._hash_memo = LRUCache(max_size=256)
+        self._count_tokens = None  # loaded on first use
+        self._chunking_policies = {}
+        self.chunking_overrides = parse_setting(Config.CHUNK_POLICIES)
+        self.chunking_budgets = {name: int(tokens) for name, tokens in parse_setting(Config.CHUNK_POLICY_TOKENS).items()}
+    
+    def get_file_hash(self, filepath: Path) -> str:
+        """Content hash, remembered per (path, size, mtime) so a file is hashed once"""
+        stat = filepath.stat()
+        key = (str(filepath), stat.st_size, stat.st_mtime_ns)
+        file_hash = self._hash_memo.get(key)
+        if file_hash is None:
+            file_hash = FileUtils.get_file_hash(filepath)
+            self._hash_memo.put(key, file_hash)
+        return file_hash
+    
+    def read_file(self, filepath: Path) -> FileSnapshot:
+        """Read a file once (stat, hash and bytes) for extract_text and create_document"""
+        snapshot = FileUtils.read_file(filepath)
+        self._hash_memo.put((str(filepath), snapshot.size_bytes, snapshot.mtime_ns), snapshot.file_hash)
+        return snapshot
+    
+    def extract_text(self, filepath: Path, snapshot: Optional[FileSnapshot] = None) -> str:
+        """Extract text from any file type, reusing cached output for unchanged content
+        
+        With a snapshot from read_file, extractors that can parse bytes use
+        them instead of reading the file again.
+        """
+        data = snapshot.data if snapshot is not None else None
+        cacheable = (FileUtils.get_file_type(filepath) in self.CACHED_FILE_TYPES
+                     or (filepath.suffix.lower() in self.CACHED_EXTENSIONS and self.log_extractor is not None))
+        if self.extraction_cache is None or not cacheable:
+            return self._extract_text(filepath, data)
+        
+        try:
+            file_hash = snapshot.file_hash if snapshot is not None else self.get_file_hash(filepath)
+        except OSError:
+            return self._extract_text(filepath, data)
+        version = f"{filepath.suffix.lower().lstrip('.')}-{self.extraction_version}"
+        
+        text = self.extraction_cache.get(file_hash, version)
+        if text is not None:
+            logger.info(f"Extraction cache hit for {filepath.name}")
+            return text
+        
+        text = self._extract_text(filepath, data)
+        # Empty output usually means a failed extraction; don't pin it
+        if text and text.strip():
+            self.extraction_cache.put(file_hash, version, text)
+        return text
     
-    def extract_text(self, filepath: Path) -> str:
+    def _extract_text(self, filepath: Path, data: Optional[bytes] = None) -> str:
         """Extract text from any file type"""
         file_type = FileUtils.get_file_type(filepath)
         ext = filepath.suffix.lower()
@@ -32,7 +125,7 @@ class FileProcessor:
         try:
             # PDF files
             if file_type == 'pdf':
-                return self.pdf_extractor.extract(filepath)
+                return self.pdf_extractor.extract(filepath, data)
             
             # Images (OCR)
             elif file_type == 'image':
@@ -44,15 +137,19 @@ class FileProcessor:
             
             # DOCX files
             elif ext in ['.docx', '.doc', '.odt', '.rtf', '.epub']:
-                return self.document_extractor.extract_docx(filepath)
+                return self.document_extractor.extract_docx(filepath, data)
             
             # PPTX files (PowerPoint)
             elif ext in ['.pptx', '.ppt', '.odp']:
-                return self.document_extractor.extract_pptx(filepath)
+                text = self.document_extractor.extract_pptx(filepath, data)
+                if Config.OCR_EMBEDDED_IMAGES:
+                    image_text = self.document_extractor.ocr_pptx_images(filepath, self.ocr_engine)
+                    text = f"{text}\n{image_text}".strip() if image_text else text
+                return text
             
             # Excel/Spreadsheet files
             elif ext in ['.xlsx', '.xls', '.ods']:
-                return self.document_extractor.extract_xlsx(filepath)
+                return self.document_extractor.extract_xlsx(filepath, data)
             
             # CSV files
             elif ext == '.csv':
@@ -66,13 +163,17 @@ class FileProcessor:
             elif ext == '.ipynb':
                 return self.document_extractor.extract_jupyter(filepath)
             
+            # Logs: collapsed into line templates when long
+            elif ext == '.log' and self.log_extractor is not None:
+                return self.log_extractor.extract(filepath, data)
+            
             # Text/Code/Web files - Explicitly handle .log and .txt
             elif ext in ['.log', '.txt', '.md', '.rst'] or file_type in ['text', 'code', 'web', 'data']:
-                return self.document_extractor.extract_text(filepath)
+                return self.document_extractor.extract_text(filepath, data)
             
             # Research files (LaTeX, BibTeX)
             elif ext in ['.tex', '.bib']:
-                return self.document_extractor.extract_text(filepath)
+                return self.document_extractor.extract_text(filepath, data)
             
             # ZIP files
             elif file_type == 'archive':
@@ -102,28 +203,70 @@ class FileProcessor:
             logger.error(f"Error extracting text from {filepath}: {e}")
             return f"File: {filepath.name}"
     
-    def create_document(self, filepath: Path, text: str, category: str) -> Document:
+    def create_document(self, filepath: Path, text: str, category: str, snapshot: Optional[FileSnapshot] = None) -> Document:
         """Create Document object"""
+        if snapshot is not None:
+            file_hash, size_bytes, created_at = snapshot.file_hash, snapshot.size_bytes, snapshot.created_at
+        else:
+            stat = filepath.stat()
+            file_hash = self.get_file_hash(filepath)
+            size_bytes, created_at = stat.st_size, datetime.fromtimestamp(stat.st_ctime)
+        
         return Document(
             filename=filepath.name,
             filepath=filepath,
-            file_hash=FileUtils.get_file_hash(filepath),
+            file_hash=file_hash,
             category=category,
             text_content=text,
             file_type=FileUtils.get_file_type(filepath),
-            size_bytes=filepath.stat().st_size,
-            created_at=datetime.fromtimestamp(filepath.stat().st_ctime),
+            size_bytes=size_bytes,
+            created_at=created_at,
             processed_at=datetime.now()
         )
     
-    def create_chunks(self, document: Document, chunk_size: int = 1200) -> List[DocumentChunk]:
-        """Create chunks from document - optimized size for accuracy and retrieval"""
-        text_chunks = TextUtils.chunk_text(document.text_content, chunk_size)
+    @staticmethod
+    def chunk_id(filepath, text: str, occurrence: int = 0) -> str:
+        """Chunk id from the file path and chunk text
+        
+        Unchanged text keeps its id when the rest of the file is edited, so
+        re-ingesting only has to embed and write the chunks that changed.
+        """
+        return xxhash.xxh3_128_hexdigest(f"{filepath}\0{occurrence}\0{text}".encode('utf-8'))
+    
+    def chunking_policy(self, filepath: Path) -> ChunkingPolicy:
+        """Chunking policy for a file, by extension or file type (see Config.CHUNK_POLICIES)"""
+        name = policy_name_for(filepath, self.chunking_overrides)
+        policy = self._chunking_policies.get(name)
+        if policy is None:
+            if self._count_tokens is None:
+                self._count_tokens = TextUtils.load_token_counter(Config.CHUNK_TOKENIZER)
+            policy_class = POLICIES[name]
+            # Prose follows the global chunk settings; other policies bring their own budget
+            if name == 'prose':
+                kwargs = {'max_tokens': Config.CHUNK_MAX_TOKENS, 'overlap_tokens': Config.CHUNK_OVERLAP_TOKENS}
+            else:
+                kwargs = {'max_tokens': min(policy_class.max_tokens, Config.CHUNK_MAX_TOKENS)}
+            if name in self.chunking_budgets:
+                kwargs['max_tokens'] = self.chunking_budgets[name]
+            if policy_class is LogPolicy:
+                kwargs['window_seconds'] = Config.LOG_CHUNK_WINDOW_SECONDS
+            policy = self._chunking_policies[name] = policy_class(count_tokens=self._count_tokens, **kwargs)
+        return policy
+    
+    def create_chunks(self, document: Document, max_tokens: Optional[int] = None) -> List[DocumentChunk]:
+        """Create chunks from document using its file type's chunking policy"""
+        policy = self.chunking_policy(document.filepath)
+        if max_tokens is not None:
+            policy = policy.with_max_tokens(max_tokens)
+        text_chunks = policy.iter_chunks(document.text_content)
         
         chunks = []
+        occurrences = {}
         for i, text in enumerate(text_chunks):
+            # Repeated text within a file gets distinct ids
+            occurrence = occurrences[text] = occurrences.get(text, -1) + 1
             chunk = DocumentChunk(
-                chunk_id=f"{document.file_hash}_{i}",
+                chunk_id=self.chunk_id(document.filepath, text, occurrence),
                 document_hash=document.file_hash,
                 text=text,
                 chunk_index=i,
@@ -139,8 +282,9 @@ class FileProcessor:
         """Process a file and return chunks"""
         try:
             file_path = Path(filepath)
-            text = self.extract_text(file_path)
-            document = self.create_document(file_path, text, category)
+            snapshot = self.read_file(file_path)
+            text = self.extract_text(file_path, snapshot)
+            document = self.create_document(file_path, text, category, snapshot)
             chunks = self.create_chunks(document)
             return chunks
         except Exception as e:
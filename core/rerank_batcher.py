@@ -0,0 +1,145 @@
+"""Micro-batching of re-ranking requests from concurrent chat requests"""
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+import logging
+
+from core.reranker import Reranker
+
+logger = logging.getLogger(__name__)
+
+
+class RerankTicket:
+    """Handed back by RerankBatcher.submit; completes when its pairs are scored"""
+
+    def __init__(self, query: str, texts: Sequence[str]):
+        self.pairs: List[Tuple[str, str]] = [(query, text) for text in texts]
+        self.scores: List[float] = []
+        self.error: Optional[Exception] = None
+        self._event = threading.Event()
+
+    def _complete(self, scores: List[float], error: Optional[Exception] = None) -> None:
+        self.scores = scores
+        self.error = error
+        self._event.set()
+
+    @property
+    def done(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> List[float]:
+        """Block until scored; re-raises the model error if the batch failed"""
+        if not self._event.wait(timeout):
+            raise TimeoutError("Timed out waiting for re-ranking batch")
+        if self.error is not None:
+            raise self.error
+        return self.scores
+
+
+class RerankBatcher:
+    """Scores (query, chunk) pairs from concurrent callers in shared forward passes
+
+    Each Flask request thread submits its pairs and waits; one scoring thread
+    runs the model on everything that arrived within ``max_wait_ms`` (or as
+    soon as ``max_pairs`` are pending) and hands each caller its slice. A
+    single model call at a time keeps threaded requests from oversubscribing
+    the CPU cores. Requests are never split; one larger than ``max_pairs``
+    is scored on its own.
+    """
+
+    def __init__(self, reranker: Reranker, max_pairs: int = 64, max_wait_ms: int = 5):
+        self.reranker = reranker
+        self.max_pairs = max(1, max_pairs)
+        self.max_wait = max(0, max_wait_ms) / 1000.0
+
+        self._pending: List[RerankTicket] = []
+        self._pending_pairs = 0
+        self._oldest: Optional[float] = None
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="rerank-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, query: str, texts: Sequence[str]) -> RerankTicket:
+        """Queue a query's passages for the next batch"""
+        ticket = RerankTicket(query, texts)
+        if not ticket.pairs:
+            ticket._complete([])
+            return ticket
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Rerank batcher is closed")
+            self._pending.append(ticket)
+            self._pending_pairs += len(ticket.pairs)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._cond.notify()
+        return ticket
+
+    def score(self, query: str, texts: Sequence[str], timeout: Optional[float] = None) -> List[float]:
+        """Same interface as Reranker.score, batched with other callers"""
+        return self.submit(query, texts).wait(timeout)
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return self._pending_pairs
+
+    def close(self) -> None:
+        """Score what is still pending and stop the scoring thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=5.0)
+        while self._run_batch(self._take_batch()):
+            pass
+
+    def _take_batch(self) -> List[RerankTicket]:
+        """Pop whole tickets up to max_pairs (at least one ticket)"""
+        with self._cond:
+            batch, size = [], 0
+            while self._pending and (not batch or size + len(self._pending[0].pairs) <= self.max_pairs):
+                ticket = self._pending.pop(0)
+                batch.append(ticket)
+                size += len(ticket.pairs)
+            self._pending_pairs -= size
+            # Tickets left behind start the next wait window now
+            self._oldest = time.monotonic() if self._pending else None
+            return batch
+
+    def _run_batch(self, batch: List[RerankTicket]) -> bool:
+        if not batch:
+            return False
+        pairs = [pair for ticket in batch for pair in ticket.pairs]
+        try:
+            scores = self.reranker.score_pairs(pairs)
+        except Exception as e:
+            logger.error(f"Batched re-ranking failed: {e}")
+            for ticket in batch:
+                ticket._complete([], e)
+            return True
+        if len(batch) > 1:
+            logger.debug(f"Re-ranked {len(pairs)} pairs from {len(batch)} requests in one batch")
+        start = 0
+        for ticket in batch:
+            ticket._complete(scores[start:start + len(ticket.pairs)])
+            start += len(ticket.pairs)
+        return True
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._pending_pairs >= self.max_pairs:
+                        break
+                    if self._oldest is not None:
+                        remaining = self.max_wait - (time.monotonic() - self._oldest)
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if self._closed:
+                    return
+            self._run_batch(self._take_batch())
@@ -0,0 +1,53 @@
+"""Cross-encoder score cache keyed by (query, chunk id, model version)"""
+from typing import Dict, Iterable
+import logging
+
+import xxhash
+
+from utils import LRUCache, TextUtils
+
+logger = logging.getLogger(__name__)
+
+
+class RerankScoreCache:
+    """LRU cache of re-ranker scores for (normalized query, chunk id) pairs
+
+    Keys include the re-ranker's model version, so switching models or
+    backends never serves stale scores. Chunk ids are content-addressed (a
+    re-ingest with new text gets new ids), so a cached score never goes
+    stale, whichever process changed the corpus; scores of deleted chunks
+    are simply never asked for again and the LRU ages them out.
+    """
+
+    def __init__(self, max_entries: int = 20000, model_version: str = ""):
+        self.model_version = model_version
+        self._cache = LRUCache(max_size=max_entries)
+
+    @staticmethod
+    def query_key(query: str) -> str:
+        return xxhash.xxh3_64_hexdigest(TextUtils.normalize_query(query).encode('utf-8'))
+
+    def _key(self, query_key: str, chunk_id: str) -> tuple:
+        return (query_key, chunk_id, self.model_version)
+
+    def get_many(self, query: str, chunk_ids: Iterable[str]) -> Dict[str, float]:
+        """Cached scores for whichever of chunk_ids have one"""
+        query_key = self.query_key(query)
+        scores = {}
+        for chunk_id in chunk_ids:
+            score = self._cache.get(self._key(query_key, chunk_id))
+            if score is not None:
+                scores[chunk_id] = score
+        return scores
+
+    def put_many(self, query: str, scores: Dict[str, float]) -> None:
+        """Store scores for one query"""
+        query_key = self.query_key(query)
+        for chunk_id, score in scores.items():
+            self._cache.put(self._key(query_key, chunk_id), float(score))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
@@ -0,0 +1,216 @@
+"""Cross-encoder re-ranking backends: PyTorch (sentence-transformers) and int8 ONNX Runtime"""
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class Reranker(ABC):
+    """Scores (query, passage) pairs with a cross-encoder; higher is more relevant"""
+
+    name = "base"
+
+    def __init__(self, model_name: str, max_length: int = 512, batch_size: int = 32):
+        self.model_name = model_name
+        self.max_length = max_length
+        self.batch_size = max(1, batch_size)
+
+    @property
+    def version(self) -> str:
+        """Identifies the scoring model, so cached scores from another model or backend aren't reused"""
+        return f"{self.model_name}@{self.name}"
+
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        return self.score_pairs([(query, text) for text in texts])
+
+    @abstractmethod
+    def score_pairs(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        """Scores for (query, passage) pairs, which may mix queries"""
+
+
+class TorchReranker(Reranker):
+    """sentence-transformers CrossEncoder in PyTorch fp32"""
+
+    name = "torch"
+
+    def __init__(self, model_name: str, max_length: int = 512, batch_size: int = 32, threads: int = 0):
+        super().__init__(model_name, max_length, batch_size)
+        from sentence_transformers import CrossEncoder
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.model = CrossEncoder(model_name, max_length=max_length)
+
+    def score_pairs(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        if not pairs:
+            return []
+        scores = self.model.predict([list(pair) for pair in pairs], batch_size=self.batch_size,
+                                    show_progress_bar=False)
+        return [float(s) for s in np.asarray(scores).reshape(len(pairs), -1)[:, 0]]
+
+
+class OnnxReranker(Reranker):
+    """The same cross-encoder exported to ONNX and dynamically quantized to int8
+
+    The export (and quantization) happens once into ``cache_dir``; later
+    starts only load the ONNX file and tokenizer.json. Pairs are tokenized
+    with the model's fast tokenizer, truncating the passage rather than the
+    query, and scored in batches of ``batch_size``.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_name: str, max_length: int = 512, batch_size: int = 32, threads: int = 0,
+                 cache_dir: Optional[Path] = None, quantize: bool = True):
+        super().__init__(model_name, max_length, batch_size)
+        self.quantize = quantize
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = self.export_dir(model_name, cache_dir)
+        model_path = model_dir / ("model-int8.onnx" if quantize else "model.onnx")
+        if not self.is_exported(model_dir, quantize):
+            self.export(model_name, model_dir, quantize)
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length, strategy="only_second")
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.sigmoid = self.uses_sigmoid(json.loads((model_dir / "config.json").read_text()))
+    
+    @property
+    def version(self) -> str:
+        return f"{self.model_name}@{self.name}-{'int8' if self.quantize else 'fp32'}"
+
+    @staticmethod
+    def uses_sigmoid(config: dict) -> bool:
+        """Whether CrossEncoder would squash this model's logit with a sigmoid
+        
+        Models can name their activation in config.json (ms-marco rerankers
+        ask for Identity, i.e. raw logits); otherwise single-label models get
+        a sigmoid.
+        """
+        activation = (config.get("sentence_transformers", {}).get("activation_fn")
+                      or config.get("sbert_ce_default_activation_function"))
+        if activation:
+            return activation.endswith("Sigmoid")
+        return config.get("num_labels", len(config.get("id2label", {}) or [0])) == 1
+
+    @staticmethod
+    def export_dir(model_name: str, cache_dir: Optional[Path] = None) -> Path:
+        """Where the exported model for model_name lives (a local model directory is used as is)"""
+        if Path(model_name).is_dir() and cache_dir is None:
+            return Path(model_name) / "onnx"
+        cache_dir = Path(cache_dir) if cache_dir is not None else Path.home() / ".cache" / "documind" / "rerankers"
+        return cache_dir / "".join(c if c.isalnum() or c in "-_." else "_" for c in model_name)
+
+    @staticmethod
+    def is_exported(model_dir: Path, quantize: bool = True) -> bool:
+        """Whether every file the backend loads is in place"""
+        files = ["tokenizer.json", "config.json", "model.onnx"] + (["model-int8.onnx"] if quantize else [])
+        return all((model_dir / name).is_file() for name in files)
+
+    @classmethod
+    def export(cls, model_name: str, model_dir: Path, quantize: bool = True) -> None:
+        """Export a HuggingFace cross-encoder to ONNX (fp32, plus a dynamic int8 copy)
+        
+        Files are written to a temporary directory next to model_dir and
+        then moved in one by one with os.replace, ONNX models last, so a
+        crashed or concurrent export (Flask and each Celery child start one)
+        never leaves a truncated model behind.
+        """
+        logger.info(f"Exporting {model_name} to ONNX in {model_dir}")
+        model_dir.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{model_dir.name}-", dir=str(model_dir.parent)))
+        try:
+            cls._export_files(model_name, staging, quantize)
+            model_dir.mkdir(exist_ok=True)
+            for path in sorted(staging.iterdir(), key=lambda p: (p.suffix == ".onnx", p.name)):
+                os.replace(path, model_dir / path.name)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    @staticmethod
+    def _export_files(model_name: str, model_dir: Path, quantize: bool) -> None:
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        try:
+            # Plain attention ops export to a graph ONNX Runtime runs (and quantizes) well
+            model = AutoModelForSequenceClassification.from_pretrained(model_name, attn_implementation="eager").eval()
+        except (TypeError, ValueError):
+            model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+        tokenizer.save_pretrained(str(model_dir))  # writes tokenizer.json
+        model.config.to_json_file(str(model_dir / "config.json"))
+
+        inputs = tokenizer(["query"], ["passage"], return_tensors="pt")
+        # Positional inputs in the order of the model's forward()
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in inputs]
+        fp32_path = model_dir / "model.onnx"
+        with torch.no_grad():
+            torch.onnx.export(
+                model, tuple(inputs[name] for name in input_names), str(fp32_path),
+                input_names=input_names, output_names=["logits"],
+                dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in input_names}, "logits": {0: "batch"}},
+                opset_version=17, dynamo=False
+            )
+
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(str(fp32_path), str(model_dir / "model-int8.onnx"), weight_type=QuantType.QInt8)
+
+    def score_pairs(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        scores = []
+        for start in range(0, len(pairs), self.batch_size):
+            encodings = self.tokenizer.encode_batch([tuple(pair) for pair in pairs[start:start + self.batch_size]])
+            feed = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            logits = self.session.run(None, {k: v for k, v in feed.items() if k in self.input_names})[0]
+            logits = logits.reshape(len(encodings), -1)[:, 0]
+            if self.sigmoid:
+                logits = 1 / (1 + np.exp(-logits))
+            scores.extend(float(s) for s in logits)
+        return scores
+
+
+BACKENDS = {backend.name: backend for backend in (OnnxReranker, TorchReranker)}
+
+
+def create_reranker(backend: str, model_name: str, **kwargs) -> Optional[Reranker]:
+    """Load the requested backend, falling back to PyTorch, or None if neither loads"""
+    if backend not in BACKENDS:
+        logger.warning(f"Unknown reranker backend '{backend}', using torch")
+        backend = TorchReranker.name
+    for name in dict.fromkeys([backend, TorchReranker.name]):
+        backend_class = BACKENDS[name]
+        options = dict(kwargs)
+        if backend_class is TorchReranker:
+            options.pop('cache_dir', None)
+            options.pop('quantize', None)
+        try:
+            logger.info(f"Loading {name} reranker {model_name}...")
+            reranker = backend_class(model_name, **options)
+            logger.info(f"Reranker loaded ({name})")
+            return reranker
+        except Exception as e:
+            logger.error(f"Failed to load {name} reranker: {e}")
+    return None
@@ -0,0 +1,123 @@
+"""Coalescing queue that releases files once they stop changing"""
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StableFileQueue:
+    """Collects paths from watcher events and dispatches each one once it is settled
+
+    A path is released when its (size, mtime) has stayed the same for
+    ``settle_seconds``, so half-copied files are not picked up. Repeated
+    create/modify events for a pending path only refresh its entry, which
+    collapses them into a single dispatch. Ready paths are handed to
+    ``dispatch_fn`` together as one list.
+    """
+
+    def __init__(self, dispatch_fn: Callable[[List[Path]], None], settle_seconds: float = 1.0, poll_interval: Optional[float] = None):
+        self.dispatch_fn = dispatch_fn
+        self.settle_seconds = max(0.0, settle_seconds)
+        self.poll_interval = poll_interval if poll_interval is not None else max(0.05, self.settle_seconds / 4)
+
+        # path -> ((size, mtime), monotonic time the signature last changed)
+        self._pending: Dict[Path, Tuple[Tuple[int, float], float]] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="stable-file-queue", daemon=True)
+            self._thread.start()
+
+    def add(self, path) -> None:
+        """Queue a path (or refresh it if already pending)"""
+        path = Path(path)
+        signature = self._signature(path)
+        if signature is None:
+            return
+        with self._cond:
+            current = self._pending.get(path)
+            if current is None or current[0] != signature:
+                self._pending[path] = (signature, time.monotonic())
+            self._cond.notify()
+
+    def discard(self, path) -> None:
+        """Forget a pending path (e.g. it was deleted before settling)"""
+        with self._cond:
+            self._pending.pop(Path(path), None)
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def poll(self) -> List[Path]:
+        """Re-stat pending paths and dispatch those that have settled"""
+        with self._cond:
+            pending = list(self._pending.items())
+        now = time.monotonic()
+
+        ready, changed, gone = [], {}, []
+        for path, (signature, changed_at) in pending:
+            current = self._signature(path)
+            if current is None:
+                gone.append(path)
+            elif current != signature:
+                changed[path] = (current, now)
+            elif now - changed_at >= self.settle_seconds:
+                ready.append(path)
+
+        snapshot = dict(pending)
+        with self._cond:
+            # Entries refreshed by an event since the snapshot are left alone
+            for path in gone:
+                if self._pending.get(path) == snapshot[path]:
+                    del self._pending[path]
+            for path, entry in changed.items():
+                if self._pending.get(path) == snapshot[path]:
+                    self._pending[path] = entry
+            released = []
+            for path in ready:
+                if self._pending.get(path) == snapshot[path]:
+                    del self._pending[path]
+                    released.append(path)
+            ready = released
+
+        if ready:
+            try:
+                self.dispatch_fn(ready)
+            except Exception as e:
+                logger.error(f"Failed to dispatch {len(ready)} settled files: {e}")
+        return ready
+
+    def close(self) -> None:
+        """Stop the background thread (pending paths are dropped)"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+
+    @staticmethod
+    def _signature(path: Path) -> Optional[Tuple[int, float]]:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and not self._pending:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                self._cond.wait(self.poll_interval)
+                if self._closed:
+                    return
+            self.poll()
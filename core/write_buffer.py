@@ -0,0 +1,146 @@
+"""Write-behind buffer that group-commits chunk inserts"""
+import threading
+import time
+from typing import Callable, List, Optional
+import logging
+
+from models.document import DocumentChunk
+
+logger = logging.getLogger(__name__)
+
+
+class FlushTicket:
+    """Handed back by ChunkWriteBuffer.submit; completes when the chunks are written"""
+
+    def __init__(self, on_written: Optional[Callable[[], None]] = None):
+        self._event = threading.Event()
+        self.error: Optional[Exception] = None
+        self.on_written = on_written
+
+    def _complete(self, error: Optional[Exception] = None) -> None:
+        self.error = error
+        self._event.set()
+
+    @property
+    def done(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Block until flushed; re-raises the write error if the flush failed"""
+        if not self._event.wait(timeout):
+            raise TimeoutError("Timed out waiting for chunk buffer flush")
+        if self.error is not None:
+            raise self.error
+
+
+class ChunkWriteBuffer:
+    """Collects chunks from concurrent callers and writes them in one call
+
+    A flush happens when ``max_chunks`` are pending or the oldest pending
+    chunk has waited ``max_wait_ms``, whichever comes first. ``commit``
+    instead writes straight away (group commit): callers that arrive while
+    a write is running share the next one, so a lone caller never waits
+    for the timer.
+    """
+
+    def __init__(self, write_fn: Callable[[List[DocumentChunk]], None], max_chunks: int = 512, max_wait_ms: int = 500):
+        self.write_fn = write_fn
+        self.max_chunks = max(1, max_chunks)
+        self.max_wait = max(0, max_wait_ms) / 1000.0
+
+        self._pending: List[DocumentChunk] = []
+        self._tickets: List[FlushTicket] = []
+        self._oldest: Optional[float] = None
+        self._cond = threading.Condition()
+        self._write_lock = threading.RLock()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="chunk-write-buffer", daemon=True)
+        self._thread.start()
+
+    def submit(self, chunks: List[DocumentChunk], on_written: Optional[Callable[[], None]] = None) -> FlushTicket:
+        """Queue chunks for the next flush; on_written runs once they are stored"""
+        ticket = FlushTicket(on_written)
+        if not chunks:
+            ticket._complete(self._run_callback(ticket))
+            return ticket
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Chunk write buffer is closed")
+            self._pending.extend(chunks)
+            self._tickets.append(ticket)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._cond.notify()
+        return ticket
+
+    def commit(self, ticket: FlushTicket, timeout: Optional[float] = None) -> None:
+        """Write ticket's chunks now, together with everything else pending, and wait for them"""
+        with self._write_lock:
+            # A write that finished while we waited for the lock may already have taken them
+            if not ticket.done:
+                self.flush()
+        ticket.wait(timeout)
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def flush(self) -> None:
+        """Write everything pending now (called on shutdown and by the flusher thread)"""
+        with self._write_lock:
+            with self._cond:
+                chunks, tickets = self._pending, self._tickets
+                self._pending, self._tickets, self._oldest = [], [], None
+            if not chunks:
+                return
+
+            # Last write wins if the same chunk id was submitted twice in one window
+            unique = list({chunk.chunk_id: chunk for chunk in chunks}.values())
+            error = None
+            try:
+                self.write_fn(unique)
+                logger.info(f"Flushed {len(unique)} buffered chunks from {len(tickets)} submissions")
+            except Exception as e:
+                logger.error(f"Buffered chunk flush failed: {e}")
+                error = e
+            for ticket in tickets:
+                # Callbacks (e.g. catalog entries) only run for chunks that were stored
+                ticket._complete(error or self._run_callback(ticket))
+
+    @staticmethod
+    def _run_callback(ticket: FlushTicket) -> Optional[Exception]:
+        if ticket.on_written is None:
+            return None
+        try:
+            ticket.on_written()
+        except Exception as e:
+            logger.error(f"Post-flush callback failed: {e}")
+            return e
+        return None
+
+    def close(self) -> None:
+        """Flush remaining chunks and stop the flusher thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=max(5.0, self.max_wait * 2))
+        self.flush()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if len(self._pending) >= self.max_chunks:
+                        break
+                    if self._oldest is not None:
+                        remaining = self.max_wait - (time.monotonic() - self._oldest)
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if self._closed:
+                    return
+            self.flush()
@@ -2,6 +2,8 @@
 import docx
 from pptx import Presentation
 from pathlib import Path
+from typing import Optional
+import io
 import logging
 import csv
 import json
@@ -13,10 +15,10 @@ class DocumentExtractor:
     """Extract text from document files"""
     
     @staticmethod
-    def extract_docx(filepath: Path) -> str:
-        """Extract text from DOCX file"""
+    def extract_docx(filepath: Path, data: Optional[bytes] = None) -> str:
+        """Extract text from DOCX file (from data if the bytes are already in memory)"""
         try:
-            doc = docx.Document(filepath)
+            doc = docx.Document(io.BytesIO(data) if data is not None else filepath)
             text = '\n'.join([para.text for para in doc.paragraphs])
             return text.strip() if text else ""
         except Exception as e:
@@ -24,10 +26,10 @@ class DocumentExtractor:
             return ""
     
     @staticmethod
-    def extract_pptx(filepath: Path) -> str:
+    def extract_pptx(filepath: Path, data: Optional[bytes] = None) -> str:
         """Extract text from PPTX (PowerPoint) file"""
         try:
-            prs = Presentation(filepath)
+            prs = Presentation(io.BytesIO(data) if data is not None else filepath)
             text_parts = []
             
             for slide_num, slide in enumerate(prs.slides, 1):
@@ -103,9 +105,27 @@ class DocumentExtractor:
             return []
     
     @staticmethod
-    def extract_text(filepath: Path) -> str:
+    def ocr_pptx_images(filepath: Path, ocr_engine) -> str:
+        """OCR the pictures in a PPTX file with the shared OCR engine"""
+        import tempfile
+        
+        with tempfile.TemporaryDirectory(prefix="pptx_img_") as tmp_dir:
+            images = DocumentExtractor.extract_pptx_images(filepath, Path(tmp_dir))
+            texts = ocr_engine.ocr_images([image['path'] for image in images])
+        
+        return "\n".join(
+            f"\n=== Slide {image['slide']} (image text) ===\n{text}"
+            for image, text in zip(images, texts) if text
+        ).strip()
+    
+    @staticmethod
+    def extract_text(filepath: Path, data: Optional[bytes] = None) -> str:
         """Extract text from plain text file"""
         try:
+            if data is not None:
+                # Same newline handling as text-mode open(), so CRLF files keep their paragraph breaks
+                text = data.decode('utf-8', errors='ignore')
+                return text.replace('\r\n', '\n').replace('\r', '\n').strip()
             with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
                 return f.read().strip()
         except Exception as e:
@@ -113,11 +133,11 @@ class DocumentExtractor:
             return ""
     
     @staticmethod
-    def extract_xlsx(filepath: Path) -> str:
+    def extract_xlsx(filepath: Path, data: Optional[bytes] = None) -> str:
         """Extract text from Excel file"""
         try:
             import openpyxl
-            wb = openpyxl.load_workbook(filepath, data_only=True)
+            wb = openpyxl.load_workbook(io.BytesIO(data) if data is not None else filepath, data_only=True)
             text_parts = []
             
             for sheet_name in wb.sheetnames:
@@ -1,22 +1,31 @@
 """Image text extraction using OCR"""
-from PIL import Image
-import pytesseract
 from pathlib import Path
+from typing import List, Optional
 import logging
 
+from .ocr_engine import OCREngine
+
 logger = logging.getLogger(__name__)
 
 
 class ImageExtractor:
     """Extract text from images using OCR"""
     
-    @staticmethod
-    def extract(filepath: Path) -> str:
+    def __init__(self, ocr_engine: Optional[OCREngine] = None):
+        self.ocr_engine = ocr_engine or OCREngine()
+    
+    def extract(self, filepath: Path) -> str:
         """Extract text from image using Tesseract OCR"""
         try:
-            image = Image.open(filepath)
-            text = pytesseract.image_to_string(image)
-            return text.strip() if text else ""
+            return self.ocr_engine.ocr_image(filepath)
         except Exception as e:
             logger.error(f"Error extracting image {filepath}: {e}")
             return ""
+    
+    def extract_many(self, filepaths: List[Path]) -> List[str]:
+        """OCR several images in batches across the engine's process pool"""
+        try:
+            return self.ocr_engine.ocr_images(filepaths)
+        except Exception as e:
+            logger.error(f"Error extracting {len(filepaths)} images: {e}")
+            return [""] * len(filepaths)
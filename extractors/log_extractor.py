@@ -0,0 +1,203 @@
+"""Log file extraction: Drain-style template mining to collapse repetitive lines"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import io
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+WILDCARD = "<*>"
+
+# Leading timestamps: ISO 8601, Apache/nginx access logs and syslog (no year)
+TIMESTAMP_FORMATS = (
+    (re.compile(r"^\W{0,2}(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}:\d{2})\S*"), "%Y-%m-%d %H:%M:%S"),
+    (re.compile(r"\[(\d{2}/\w{3}/\d{4}):(\d{2}:\d{2}:\d{2})[^\]]*\]"), "%d/%b/%Y %H:%M:%S"),
+    (re.compile(r"^(\w{3}\s+\d{1,2}) (\d{2}:\d{2}:\d{2})"), "%b %d %H:%M:%S"),
+)
+
+
+@lru_cache(maxsize=4096)
+def _parse_timestamp(text: str, fmt: str) -> Optional[datetime]:
+    # Consecutive lines mostly share a timestamp, and strptime is slow
+    try:
+        return datetime.strptime(text, fmt)
+    except ValueError:
+        return None
+
+
+def split_timestamp(line: str) -> Tuple[Optional[datetime], str]:
+    """(timestamp, line without it) for lines with a recognised timestamp, else (None, line)"""
+    head = line[:64]
+    for pattern, fmt in TIMESTAMP_FORMATS:
+        match = pattern.search(head)
+        if match:
+            timestamp = _parse_timestamp(" ".join(match.groups()), fmt)
+            if timestamp is None:
+                continue
+            return timestamp, line[:match.start()] + line[match.end():]
+    return None, line
+
+
+@dataclass
+class LogTemplate:
+    """One mined line template with its occurrences"""
+    template_id: int
+    tokens: List[str]
+    count: int = 0
+    first_seen: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
+    examples: List[str] = field(default_factory=list)
+    # (first line, last line, start byte, end byte) of each run of consecutive lines
+    ranges: List[List[int]] = field(default_factory=list)
+    ranges_truncated: bool = False
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+
+@dataclass
+class LogSummary:
+    """Result of mining one log file"""
+    filename: str
+    line_count: int
+    templates: List[LogTemplate]
+
+
+class LogExtractor:
+    """Collapse a log into its distinct line templates (Drain-style parse tree)
+
+    Lines are grouped by token count and first token, then matched against
+    the templates in that group; a line joins the most similar template if
+    at least ``similarity`` of its tokens agree, and differing positions
+    become ``<*>``. Each template keeps its count, time range, a few
+    example lines and the byte ranges of the lines it covers, so citations
+    can point back into the raw file. Logs shorter than ``min_lines`` are
+    returned as they are.
+    """
+
+    SUMMARY_HEADER = "=== Log summary"
+    MAX_RANGES = 1000
+    RANGES_SHOWN = 5
+    # Tokens holding variables (ids, numbers, IPs, durations) all contain a digit
+    VARIABLE_RE = re.compile(r"\d")
+
+    def __init__(self, similarity: float = 0.5, max_examples: int = 3, min_lines: int = 1000,
+                 max_templates_per_group: int = 100):
+        self.similarity = similarity
+        self.max_examples = max_examples
+        self.min_lines = min_lines
+        self.max_templates_per_group = max_templates_per_group
+
+    def extract(self, filepath: Path, data: Optional[bytes] = None) -> str:
+        """Template summary of a log, or its raw text when it is short"""
+        try:
+            summary = self.mine(filepath, data)
+            if summary.line_count < self.min_lines:
+                raw = data if data is not None else Path(filepath).read_bytes()
+                return raw.decode('utf-8', errors='ignore').replace('\r\n', '\n').replace('\r', '\n').strip()
+            logger.info(f"Mined {len(summary.templates)} templates from {summary.line_count} lines of {filepath.name}")
+            return self.format_summary(summary)
+        except Exception as e:
+            logger.error(f"Error extracting log {filepath}: {e}")
+            return ""
+
+    def mine(self, filepath: Path, data: Optional[bytes] = None) -> LogSummary:
+        """Mine templates from a log file (or its bytes), streaming line by line"""
+        groups: Dict[Tuple[int, str], List[LogTemplate]] = {}
+        templates: List[LogTemplate] = []
+        line_count = 0
+
+        for line_no, offset, raw in self._iter_lines(filepath, data):
+            line = raw.decode('utf-8', errors='ignore').rstrip("\r\n")
+            if not line.strip():
+                continue
+            line_count += 1
+            timestamp, content = split_timestamp(line)
+            tokens = [WILDCARD if self.VARIABLE_RE.search(token) else token for token in content.split()]
+            if not tokens:
+                continue
+
+            key = (len(tokens), tokens[0])
+            group = groups.setdefault(key, [])
+            template = self._match(group, tokens)
+            if template is None:
+                template = LogTemplate(template_id=len(templates) + 1, tokens=tokens)
+                templates.append(template)
+                if len(group) < self.max_templates_per_group:
+                    group.append(template)
+            else:
+                template.tokens = [t if t == u else WILDCARD for t, u in zip(template.tokens, tokens)]
+            self._record(template, line, line_no, offset, offset + len(raw), timestamp)
+
+        return LogSummary(filename=Path(filepath).name, line_count=line_count, templates=templates)
+
+    def _match(self, group: List[LogTemplate], tokens: List[str]) -> Optional[LogTemplate]:
+        best, best_score = None, -1.0
+        for template in group:
+            same = sum(1 for t, u in zip(template.tokens, tokens) if t == u and t != WILDCARD)
+            wildcards = template.tokens.count(WILDCARD)
+            score = same / max(1, len(tokens) - wildcards) if len(tokens) > wildcards else 1.0
+            if score > best_score:
+                best, best_score = template, score
+        return best if best_score >= self.similarity else None
+
+    def _record(self, template: LogTemplate, line: str, line_no: int, start: int, end: int,
+                timestamp: Optional[datetime]) -> None:
+        template.count += 1
+        if len(template.examples) < self.max_examples:
+            template.examples.append(line)
+        if timestamp is not None:
+            template.first_seen = min(template.first_seen or timestamp, timestamp)
+            template.last_seen = max(template.last_seen or timestamp, timestamp)
+        if template.ranges and template.ranges[-1][1] == line_no - 1:
+            template.ranges[-1][1] = line_no
+            template.ranges[-1][3] = end
+        elif len(template.ranges) < self.MAX_RANGES:
+            template.ranges.append([line_no, line_no, start, end])
+        else:
+            template.ranges_truncated = True
+
+    @staticmethod
+    def _iter_lines(filepath: Path, data: Optional[bytes] = None) -> Iterator[Tuple[int, int, bytes]]:
+        """(1-based line number, byte offset, raw line) without loading the whole file"""
+        with (io.BytesIO(data) if data is not None else open(filepath, 'rb')) as f:
+            offset = 0
+            for line_no, raw in enumerate(f, start=1):
+                yield line_no, offset, raw
+                offset += len(raw)
+
+    def format_summary(self, summary: LogSummary) -> str:
+        """Compact text for chunking: one block per template, most frequent first"""
+        parts = [f"{self.SUMMARY_HEADER}: {summary.filename}, {summary.line_count} lines, "
+                 f"{len(summary.templates)} templates ==="]
+        for template in sorted(summary.templates, key=lambda t: -t.count):
+            header = f"=== Template {template.template_id}: {template.count} lines"
+            if template.first_seen is not None:
+                header += f", {template.first_seen:%Y-%m-%d %H:%M:%S} to {template.last_seen:%Y-%m-%d %H:%M:%S}"
+            lines = [header + " ===", template.template, "Examples:"]
+            lines.extend(template.examples)
+            shown = [self._format_range(r) for r in template.ranges[:self.RANGES_SHOWN]]
+            more = len(template.ranges) - len(shown)
+            if more > 0 or template.ranges_truncated:
+                shown.append(f"+{more}{'+' if template.ranges_truncated else ''} more")
+            lines.append("Lines " + "; ".join(shown))
+            parts.append("\n".join(lines))
+        return "\n\n".join(parts)
+
+    @staticmethod
+    def _format_range(line_range: List[int]) -> str:
+        first, last, start, end = line_range
+        lines = f"{first}" if first == last else f"{first}-{last}"
+        return f"{lines} (bytes {start}-{end})"
+
+    @staticmethod
+    def read_range(filepath: Path, start: int, end: int) -> str:
+        """Raw log text between two byte offsets (for citing a template's lines)"""
+        with open(filepath, 'rb') as f:
+            f.seek(start)
+            return f.read(max(0, end - start)).decode('utf-8', errors='ignore')
@@ -0,0 +1,212 @@
+"""Batched, preprocessed Tesseract OCR shared by the image, PDF and PPTX extractors"""
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Sequence, Union
+import logging
+import multiprocessing
+import os
+import subprocess
+import tempfile
+from PIL import Image, ImageFilter, ImageOps, ImageStat
+
+logger = logging.getLogger(__name__)
+
+ImageInput = Union[str, Path, Image.Image]
+
+# Text-presence heuristic thresholds (on a 256 px grayscale thumbnail)
+MIN_CONTRAST = 12.0       # pixel std-dev; blank/flat images sit below this
+MIN_EDGE_DENSITY = 0.02   # share of strong-edge pixels; text has many sharp strokes
+MAX_DARK_RATIO = 0.6      # share of dark pixels above which an image needs dense edges to count
+# Images bigger/smaller than this (longest side, px) are rescaled when their DPI is unknown
+MAX_SIDE = 3500
+MIN_SIDE = 1000
+
+
+def has_text(image: Image.Image) -> bool:
+    """Cheap check for whether an image could contain text (edge density + contrast)
+
+    Meant to skip blank scans and smooth photos before paying for Tesseract;
+    it errs on the side of OCR-ing anything with sharp, high-contrast detail.
+    """
+    thumb = ImageOps.grayscale(image)
+    thumb.thumbnail((256, 256))
+    pixel_count = thumb.width * thumb.height
+    if pixel_count == 0:
+        return False
+
+    if ImageStat.Stat(thumb).stddev[0] < MIN_CONTRAST:
+        return False
+
+    edge_density = sum(thumb.filter(ImageFilter.FIND_EDGES).histogram()[65:]) / pixel_count
+    if edge_density < MIN_EDGE_DENSITY:
+        return False
+
+    # A mostly dark image with only moderate edge detail is most likely a photo;
+    # light-on-dark text has dense edges and still passes
+    dark_ratio = sum(thumb.histogram()[:96]) / pixel_count
+    return dark_ratio <= MAX_DARK_RATIO or edge_density >= 4 * MIN_EDGE_DENSITY
+
+
+def _otsu_threshold(image: Image.Image) -> int:
+    """Threshold that best separates the two grayscale intensity classes"""
+    histogram = image.histogram()[:256]
+    total = sum(histogram)
+    sum_all = sum(i * h for i, h in enumerate(histogram))
+    sum_bg = weight_bg = 0
+    best_threshold, best_variance = 127, -1.0
+    for i, count in enumerate(histogram):
+        weight_bg += count
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += i * count
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = i, variance
+    return best_threshold
+
+
+def preprocess(image: Image.Image, target_dpi: int = 300) -> Image.Image:
+    """Grayscale, rescale towards target_dpi and binarize (dark text on white)"""
+    gray = ImageOps.grayscale(image)
+
+    dpi = image.info.get('dpi')
+    if dpi and dpi[0]:
+        scale = target_dpi / float(dpi[0])
+    else:
+        longest = max(gray.size)
+        scale = MAX_SIDE / longest if longest > MAX_SIDE else (2.0 if longest < MIN_SIDE else 1.0)
+    scale = min(max(scale, 0.25), 3.0)
+    if abs(scale - 1.0) > 0.05:
+        size = (max(1, int(gray.width * scale)), max(1, int(gray.height * scale)))
+        gray = gray.resize(size, Image.LANCZOS if scale < 1 else Image.BICUBIC)
+
+    threshold = _otsu_threshold(gray)
+    binary = gray.point(lambda p: 255 if p > threshold else 0)
+    # Tesseract prefers dark text on a light background
+    if sum(binary.histogram()[:128]) > (binary.width * binary.height) / 2:
+        binary = ImageOps.invert(binary)
+    return binary
+
+
+def _tesseract_env(threads: int) -> dict:
+    """Environment for one Tesseract run, capped at threads (an explicit OMP_THREAD_LIMIT wins)
+
+    Passed to the subprocess only, so the limit never leaks into the worker
+    process or its later tasks.
+    """
+    env = dict(os.environ)
+    env.setdefault('OMP_THREAD_LIMIT', str(threads))
+    return env
+
+
+def _image_to_string(path: str, lang: str, threads: int) -> str:
+    """Run Tesseract on an image (or a .txt list of images) and return its text"""
+    import pytesseract
+
+    proc = subprocess.run([pytesseract.pytesseract.tesseract_cmd, path, "stdout", "-l", lang],
+                          env=_tesseract_env(threads), capture_output=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"tesseract exited with {proc.returncode}: "
+                           f"{proc.stderr.decode('utf-8', errors='replace').strip()[-200:]}")
+    return proc.stdout.decode('utf-8', errors='replace')
+
+
+def _ocr_batch(paths: List[str], lang: str, target_dpi: int, skip_textless: bool, threads: int = 1) -> List[str]:
+    """OCR a batch of image files with a single Tesseract process (runs in a worker process)"""
+    texts = [""] * len(paths)
+    with tempfile.TemporaryDirectory(prefix="ocr_") as tmp_dir:
+        prepared = []  # (index, preprocessed image path)
+        for index, path in enumerate(paths):
+            try:
+                with Image.open(path) as image:
+                    image.load()
+                    if skip_textless and not has_text(image):
+                        continue
+                    out_path = os.path.join(tmp_dir, f"{index}.png")
+                    preprocess(image, target_dpi).save(out_path)
+                    prepared.append((index, out_path))
+            except Exception as e:
+                logger.warning(f"Could not prepare image {path} for OCR: {e}")
+
+        if not prepared:
+            return texts
+        if len(prepared) == 1:
+            index, out_path = prepared[0]
+            texts[index] = _image_to_string(out_path, lang, threads).strip()
+            return texts
+
+        # Tesseract reads a .txt file as a list of images and separates their
+        # output with form feeds
+        list_path = os.path.join(tmp_dir, "images.txt")
+        with open(list_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(out_path for _, out_path in prepared) + "\n")
+        pages = _image_to_string(list_path, lang, threads).split("\f")
+
+        if len(pages) >= len(prepared):
+            for (index, _), page_text in zip(prepared, pages):
+                texts[index] = page_text.strip()
+        else:
+            logger.warning("Batched OCR output did not split per image; retrying one by one")
+            for index, out_path in prepared:
+                texts[index] = _image_to_string(out_path, lang, threads).strip()
+    return texts
+
+
+class OCREngine:
+    """Runs Tesseract over many images: text check, preprocessing, batching and a process pool
+
+    Total CPU use is bounded by ``max_workers`` processes times
+    ``threads_per_worker`` Tesseract threads (OMP_THREAD_LIMIT).
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, threads_per_worker: int = 1, batch_size: int = 8,
+                 target_dpi: int = 300, lang: str = "eng", skip_textless: bool = True):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.batch_size = max(1, batch_size)
+        self.target_dpi = target_dpi
+        self.lang = lang
+        self.skip_textless = skip_textless
+
+    def ocr_image(self, image: ImageInput) -> str:
+        """OCR a single image"""
+        return self.ocr_images([image])[0]
+
+    def ocr_images(self, images: Sequence[ImageInput]) -> List[str]:
+        """OCR many images (paths or PIL images); returns one string per input, in order"""
+        if not images:
+            return []
+
+        with tempfile.TemporaryDirectory(prefix="ocr_in_") as tmp_dir:
+            paths = []
+            for index, image in enumerate(images):
+                if isinstance(image, Image.Image):
+                    # In-memory images (e.g. rasterized PDF pages) go to disk for the workers
+                    path = os.path.join(tmp_dir, f"{index}.png")
+                    save_kwargs = {'dpi': image.info['dpi']} if image.info.get('dpi') else {}
+                    image.save(path, **save_kwargs)
+                    paths.append(path)
+                else:
+                    paths.append(str(image))
+
+            batches = [paths[i:i + self.batch_size] for i in range(0, len(paths), self.batch_size)]
+            workers = min(self.max_workers, len(batches))
+            args = (self.lang, self.target_dpi, self.skip_textless, self.threads_per_worker)
+
+            try:
+                if workers > 1 and not multiprocessing.current_process().daemon:
+                    with ProcessPoolExecutor(max_workers=workers) as pool:
+                        results = list(pool.map(_ocr_batch, batches, *[[a] * len(batches) for a in args]))
+                else:
+                    # Daemonic processes (e.g. Celery prefork children) may not start children
+                    results = [_ocr_batch(batch, *args) for batch in batches]
+            except Exception as e:
+                logger.error(f"OCR failed for {len(paths)} images: {e}")
+                return [""] * len(paths)
+
+        return [text for batch_texts in results for text in batch_texts]
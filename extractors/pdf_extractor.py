@@ -1,29 +1,203 @@
 """PDF text and image extraction"""
+from concurrent.futures import ProcessPoolExecutor
 from pdfminer.high_level import extract_text as extract_pdf_text
 from pathlib import Path
+from typing import Iterator, List, Optional
+import json
 import logging
+import multiprocessing
+import os
+import subprocess
+import sys
 import fitz  # PyMuPDF
 import io
+import tempfile
 from PIL import Image
 
+from .ocr_engine import OCREngine
+
 logger = logging.getLogger(__name__)
 
 
+def _extract_page_range(filepath: str, start: int, stop: int) -> List[str]:
+    """Text of pages [start, stop) with PyMuPDF (runs in a worker process)"""
+    with fitz.open(filepath) as doc:
+        return [doc[page_num].get_text() for page_num in range(start, stop)]
+
+
+# Same as _extract_page_range, for a plain subprocess (python -c SCRIPT filepath start stop)
+_PAGE_RANGE_SCRIPT = (
+    "import json, sys, fitz\n"
+    "with fitz.open(sys.argv[1]) as doc:\n"
+    "    json.dump([doc[i].get_text() for i in range(int(sys.argv[2]), int(sys.argv[3]))], sys.stdout)\n"
+)
+
+
 class PDFExtractor:
     """Extract text and images from PDF files"""
     
-    @staticmethod
-    def extract(filepath: Path) -> str:
-        """Extract text from PDF"""
+    ENGINES = ("pymupdf", "pdfminer")
+    
+    # Pages with less text than this (and at least one image) are treated as scans
+    OCR_MIN_CHARS = 16
+    
+    def __init__(self, engine: str = "pymupdf", parallel_min_pages: int = 64, max_workers: Optional[int] = None,
+                 ocr_engine: Optional[OCREngine] = None, ocr_dpi: int = 300, ocr_embedded_images: bool = False):
+        if engine not in self.ENGINES:
+            logger.warning(f"Unknown PDF engine '{engine}', using pymupdf")
+            engine = "pymupdf"
+        self.engine = engine
+        self.parallel_min_pages = parallel_min_pages
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Without an OCR engine scanned pages stay empty
+        self.ocr_engine = ocr_engine
+        self.ocr_dpi = ocr_dpi
+        self.ocr_embedded_images = ocr_embedded_images
+    
+    def extract(self, filepath: Path, data: Optional[bytes] = None) -> str:
+        """Extract text from PDF, OCR-ing only pages without a text layer"""
         try:
-            text = extract_pdf_text(str(filepath))
+            pages = list(self.iter_pages(filepath, data))
+            if self.ocr_engine is not None:
+                scanned = set(self.pages_needing_ocr(filepath, pages))
+                pages = self.ocr_missing_pages(filepath, pages, scanned)
+                if self.ocr_embedded_images:
+                    text_pages = [i for i in range(len(pages)) if i not in scanned]
+                    image_text = self.ocr_embedded_image_text(filepath, text_pages)
+                    if image_text:
+                        pages.append(image_text)
+            text = "\n\n".join(page.strip() for page in pages if page.strip())
             return text.strip() if text else ""
         except Exception as e:
             logger.error(f"Error extracting PDF {filepath}: {e}")
             return ""
     
+    def iter_pages(self, filepath: Path, data: Optional[bytes] = None) -> Iterator[str]:
+        """Yield the text of each page in order
+        
+        Uses PyMuPDF unless the pdfminer engine is configured. If PyMuPDF
+        fails part-way, pdfminer takes over from the first page not yet yielded.
+        When the file's bytes are passed in, they are parsed instead of re-reading it.
+        """
+        yielded = 0
+        if self.engine == "pymupdf":
+            try:
+                for page_text in self._iter_pages_pymupdf(filepath, data):
+                    yield page_text
+                    yielded += 1
+                return
+            except Exception as e:
+                logger.warning(f"PyMuPDF failed on {filepath} after {yielded} pages ({e}); falling back to pdfminer")
+        
+        yield from self._iter_pages_pdfminer(filepath, skip=yielded, data=data)
+    
+    def _iter_pages_pymupdf(self, filepath: Path, data: Optional[bytes] = None) -> Iterator[str]:
+        # Worker processes re-open the path; it is in the page cache after the ingest read
+        with (fitz.open(stream=data, filetype="pdf") if data is not None else fitz.open(str(filepath))) as doc:
+            page_count = len(doc)
+            if page_count < self.parallel_min_pages or self.max_workers < 2:
+                for page in doc:
+                    yield page.get_text()
+                return
+        
+        # Large document: one contiguous page range per worker, collected in order
+        workers = min(self.max_workers, page_count)
+        step = -(-page_count // workers)
+        starts = list(range(0, page_count, step))
+        stops = [min(start + step, page_count) for start in starts]
+        logger.info(f"Extracting {page_count} pages of {filepath.name} in {len(starts)} ranges")
+        if not self._can_use_process_pool():
+            yield from self._iter_ranges_subprocess(filepath, starts, stops)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for pages in pool.map(_extract_page_range, [str(filepath)] * len(starts), starts, stops):
+                yield from pages
+    
+    @staticmethod
+    def _iter_ranges_subprocess(filepath: Path, starts: List[int], stops: List[int]) -> Iterator[str]:
+        """Page ranges extracted by plain subprocesses, for daemonic processes that can't use a pool"""
+        procs = [
+            subprocess.Popen([sys.executable, "-c", _PAGE_RANGE_SCRIPT, str(filepath), str(start), str(stop)],
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            for start, stop in zip(starts, stops)
+        ]
+        try:
+            for proc in procs:
+                out, err = proc.communicate()
+                if proc.returncode != 0:
+                    raise RuntimeError(f"page range worker failed: {err.decode(errors='replace').strip()[-200:]}")
+                # The JSON is the last line (PyMuPDF may print notices on import)
+                yield from json.loads(out.splitlines()[-1])
+        finally:
+            for proc in procs:
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+    
+    def pages_needing_ocr(self, filepath: Path, pages: List[str]) -> List[int]:
+        """Indices of pages with (almost) no text layer but with images, i.e. scans"""
+        with fitz.open(str(filepath)) as doc:
+            if len(doc) != len(pages):
+                logger.warning(f"Page count mismatch for {filepath.name}; skipping OCR detection")
+                return []
+            return [
+                page_num for page_num, text in enumerate(pages)
+                if len(text.strip()) < self.OCR_MIN_CHARS and doc[page_num].get_images()
+            ]
+    
+    def ocr_missing_pages(self, filepath: Path, pages: List[str], page_nums=None) -> List[str]:
+        """Fill in scanned pages with OCR output; text pages are left untouched"""
+        try:
+            missing = sorted(page_nums) if page_nums is not None else self.pages_needing_ocr(filepath, pages)
+            if not missing or self.ocr_engine is None:
+                return pages
+            
+            logger.info(f"OCR on {len(missing)}/{len(pages)} pages of {filepath.name} without a text layer")
+            with tempfile.TemporaryDirectory(prefix="pdf_ocr_") as tmp_dir:
+                # Rasterized pages go to disk rather than memory (~8 MB each at 300 DPI)
+                image_paths = []
+                with fitz.open(str(filepath)) as doc:
+                    for page_num in missing:
+                        pix = doc[page_num].get_pixmap(dpi=self.ocr_dpi, colorspace=fitz.csGRAY)
+                        pix.set_dpi(self.ocr_dpi, self.ocr_dpi)
+                        image_path = Path(tmp_dir) / f"page{page_num + 1}.png"
+                        pix.save(str(image_path))
+                        image_paths.append(image_path)
+                texts = self.ocr_engine.ocr_images(image_paths)
+            
+            pages = list(pages)
+            for page_num, text in zip(missing, texts):
+                pages[page_num] = text
+        except Exception as e:
+            logger.warning(f"OCR failed for {filepath}: {e}")
+        return pages
+    
+    def ocr_embedded_image_text(self, filepath: Path, page_nums=None) -> str:
+        """OCR the images embedded in a PDF (optionally only on some pages)"""
+        if self.ocr_engine is None:
+            return ""
+        with tempfile.TemporaryDirectory(prefix="pdf_img_") as tmp_dir:
+            image_paths = self.extract_images(filepath, Path(tmp_dir), page_nums=page_nums)
+            texts = self.ocr_engine.ocr_images(image_paths)
+        return "\n\n".join(text for text in texts if text)
+    
+    @staticmethod
+    def _can_use_process_pool() -> bool:
+        # Daemonic processes (e.g. Celery prefork children) may not start multiprocessing
+        # children with any start method, but may run plain subprocesses
+        return not multiprocessing.current_process().daemon
+    
+    @staticmethod
+    def _iter_pages_pdfminer(filepath: Path, skip: int = 0, data: Optional[bytes] = None) -> Iterator[str]:
+        text = extract_pdf_text(io.BytesIO(data) if data is not None else str(filepath)) or ""
+        # pdfminer separates pages with form feeds (and ends with one)
+        pages = text.split("\f")
+        if pages and not pages[-1].strip():
+            pages.pop()
+        yield from pages[skip:]
+    
     @staticmethod
-    def extract_images(filepath: Path, output_dir: Path) -> list:
+    def extract_images(filepath: Path, output_dir: Path, page_nums=None) -> list:
         """Extract images from PDF and save them
         
         Returns: List of extracted image paths
@@ -33,7 +207,7 @@ class PDFExtractor:
             doc = fitz.open(str(filepath))
             image_paths = []
             
-            for page_num in range(len(doc)):
+            for page_num in (range(len(doc)) if page_nums is None else page_nums):
                 page = doc[page_num]
                 image_list = page.get_images(full=True)
                 
@@ -3,6 +3,7 @@ import logging
 import shutil
 from pathlib import Path
 from core import DatabaseManager
+from config import Config
 from core.processor import FileProcessor
 from models.document import Document
 
@@ -28,7 +29,7 @@ def rebuild():
             # Best is to ensure app is killed first.
             
     # 2. Init new DB
-    db = DatabaseManager(DB_DIR)
+    db = DatabaseManager(DB_DIR, embedding_store_dir=Config.EMBEDDING_STORE_DIR)
     processor = FileProcessor()
     
     # 3. Scan and Ingest
@@ -55,10 +56,10 @@ def rebuild():
                      pass
                 
                 doc = processor.create_document(filepath, text, domain)
-                chunks = processor.create_chunks(doc, chunk_size=600)
+                chunks = processor.create_chunks(doc)
                 
                 if chunks:
-                    db.add_chunks(chunks)
+                    db.add_document(doc, chunks, category=parts[1] if len(parts) > 2 else "")
                     count += 1
             except Exception as e:
                 print(f"Failed to process {filepath.name}: {e}")
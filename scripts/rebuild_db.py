@@ -9,6 +9,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from core import DatabaseManager, FileProcessor
+from config import Config
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -20,7 +21,7 @@ SORTED_DIR = DATA_DIR / "sorted"
 DB_DIR = DATA_DIR / "database"
 
 # Initialize services
-db_manager = DatabaseManager(DB_DIR)
+db_manager = DatabaseManager(DB_DIR, embedding_store_dir=Config.EMBEDDING_STORE_DIR)
 file_processor = FileProcessor()
 
 def rebuild_database():
@@ -52,11 +53,11 @@ def rebuild_database():
                     document = file_processor.create_document(filepath, text, category)
                     
                     # Create chunks with new improved settings
-                    chunks = file_processor.create_chunks(document, chunk_size=600)
+                    chunks = file_processor.create_chunks(document)
                     
                     # Add to database
                     if chunks:
-                        db_manager.add_chunks(chunks)
+                        db_manager.add_document(document, chunks)
                         logger.info(f"    ✓ Added {len(chunks)} chunks")
                         total_files += 1
                         total_chunks += len(chunks)
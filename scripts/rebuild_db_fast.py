@@ -11,6 +11,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from core import DatabaseManager, FileProcessor
+from config import Config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -24,7 +25,7 @@ def rebuild_database_fast():
     DB_DIR = DATA_DIR / "database"
     
     # Initialize database
-    db_manager = DatabaseManager(DB_DIR)
+    db_manager = DatabaseManager(DB_DIR, embedding_store_dir=Config.EMBEDDING_STORE_DIR)
     processor = FileProcessor()
     
     print("=" * 60)
@@ -51,10 +52,14 @@ def rebuild_database_fast():
             if file_path.is_file():
                 try:
                     # Process file
-                    chunks = processor.process_file(str(file_path), category)
+                    snapshot = processor.read_file(file_path)
+                    text = processor.extract_text(file_path, snapshot)
+                    document = processor.create_document(file_path, text, category, snapshot)
+                    chunks = processor.create_chunks(document)
                     
                     if chunks:
-                        db_manager.add_chunks(chunks)
+                        # add_document also catalogs the file (lookups, downloads, dangling-file sync)
+                        db_manager.add_document(document, chunks)
                         total_chunks += len(chunks)
                         total_files += 1
                         print(f"   ✓ {file_path.name} ({len(chunks)} chunks)")
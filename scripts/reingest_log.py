@@ -2,6 +2,7 @@
 import logging
 from pathlib import Path
 from core import DatabaseManager
+from config import Config
 from core.processor import FileProcessor
 from models.document import Document
 
@@ -16,7 +17,7 @@ def reingest():
     print(f"Target Log File: {LOG_FILE}")
     
     # Init
-    db = DatabaseManager(DB_DIR)
+    db = DatabaseManager(DB_DIR, embedding_store_dir=Config.EMBEDDING_STORE_DIR)
     processor = FileProcessor()
     
     # 1. Process File (Now extracting full text!)
@@ -31,14 +32,14 @@ def reingest():
 
     # 2. Create chunks
     doc = processor.create_document(LOG_FILE, text, "Technology")
-    chunks = processor.create_chunks(doc, chunk_size=600)
+    chunks = processor.create_chunks(doc)
     print(f"Created {len(chunks)} chunks.")
     
-    # 3. Add to DB (Upsert logic in Chroma usually handles IDs)
-    # Note: Chunk IDs are hash based, so if content changed, IDs change.
-    # Ideally should delete old chunks first, but I'll trust the search will find the new ones.
-    print("Adding to DB...")
-    db.add_chunks(chunks)
+    # 3. Update the DB in place: chunk ids come from the chunk text, so only
+    # changed chunks are embedded and chunks that disappeared are deleted
+    print("Updating DB...")
+    stats = db.reingest_document(doc, chunks, category=LOG_FILE.parent.parent.name)
+    print(f"Added {stats['added']}, unchanged {stats['unchanged']}, removed {stats['removed']} chunks.")
     print("✅ Re-ingestion complete.")
 
 if __name__ == "__main__":
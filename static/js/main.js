@@ -180,21 +180,24 @@ async function sendMessage() {
     }
 
     try {
-        const response = await fetch('/chat', {
+        const response = await fetch('/chat/stream', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ query, chat_id: currentChatId })
         });
 
-        const data = await response.json();
+        if (!response.ok || !response.body) {
+            const data = await response.json().catch(() => ({}));
+            showError(data.error || 'Error occurred');
+            return;
+        }
 
-        if (response.ok) {
-            addMessage(data.answer, 'assistant', data.cited_files, data.confidence_score, data.source_snippets);
+        const final = await readChatStream(response);
+        if (final) {
+            addMessage(final.answer, 'assistant', final.cited_files, final.confidence_score, final.source_snippets);
             showToast('Response received', 'success');
             // Refresh sessions to update titles if first message
             loadChatSessions();
-        } else {
-            showError(data.error || 'Error occurred');
         }
     } catch (error) {
         showError('Failed to connect to server');
@@ -205,6 +208,65 @@ async function sendMessage() {
     }
 }
 
+// Render Server-Sent Events from /chat/stream into a live message bubble.
+// Returns the final response (from the "done" event), or null on error.
+async function readChatStream(response) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let final = null;
+
+    // Live bubble that tokens are appended to; replaced by the full message on "done"
+    const liveDiv = document.createElement('div');
+    liveDiv.className = 'message assistant streaming';
+    const liveLabel = document.createElement('div');
+    liveLabel.className = 'message-label';
+    liveLabel.textContent = 'Assistant';
+    const liveContent = document.createElement('div');
+    liveContent.className = 'message-content';
+    liveContent.style.whiteSpace = 'pre-wrap';
+    liveDiv.appendChild(liveLabel);
+    liveDiv.appendChild(liveContent);
+
+    const handleEvent = (event, data) => {
+        if (event === 'metadata') {
+            // Retrieval finished: show the bubble and hide the spinner
+            loading.classList.remove('active');
+            chatContainer.appendChild(liveDiv);
+        } else if (event === 'token') {
+            if (!liveDiv.parentNode) chatContainer.appendChild(liveDiv);
+            liveContent.textContent += data.text;
+            chatContainer.scrollTop = chatContainer.scrollHeight;
+        } else if (event === 'done') {
+            final = data;
+        } else if (event === 'error') {
+            showError(data.error || 'Error occurred');
+        }
+    };
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let sep;
+        while ((sep = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, sep);
+            buffer = buffer.slice(sep + 2);
+            let event = 'message';
+            let data = '';
+            raw.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            if (data) handleEvent(event, JSON.parse(data));
+        }
+    }
+
+    liveDiv.remove();
+    return final;
+}
+
 async function loadChatSessions() {
     if (!chatHistoryList) return;
     try {
@@ -0,0 +1,52 @@
+"""Test cases for the /chat answer cache"""
+import unittest
+import tempfile
+from pathlib import Path
+from core.answer_cache import AnswerCache, CorpusGeneration
+
+
+class TestAnswerCache(unittest.TestCase):
+    """Test answer caching and generation-based invalidation"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.generation = CorpusGeneration(Path(self.temp_dir.name) / "generation.sqlite3")
+        self.cache = AnswerCache(max_entries=8, ttl_seconds=60)
+
+    def tearDown(self):
+        self.generation._conn.close()
+        self.temp_dir.cleanup()
+
+    def test_hit_on_normalized_query(self):
+        """Same question with different casing/spacing should hit"""
+        gen = self.generation.get()
+        self.cache.put("What is GST?", gen, {'answer': 'A tax', 'cited_files': ['gst.pdf']})
+
+        cached = self.cache.get("  what is gst ", gen)
+        self.assertEqual(cached['answer'], 'A tax')
+
+    def test_generation_bump_invalidates(self):
+        """Corpus changes should make older answers unreachable"""
+        gen = self.generation.get()
+        self.cache.put("What is GST?", gen, {'answer': 'A tax'})
+
+        new_gen = self.generation.bump()
+        self.assertEqual(new_gen, gen + 1)
+        self.assertIsNone(self.cache.get("What is GST?", new_gen))
+
+    def test_generation_shared_across_instances(self):
+        """Bumps from another process/instance should be visible"""
+        other = CorpusGeneration(self.generation.path)
+        other.bump()
+        self.assertEqual(self.generation.get(), 1)
+        other._conn.close()
+
+    def test_returned_response_is_a_copy(self):
+        """Mutating a cached response should not alter the cache"""
+        self.cache.put("q", 0, {'answer': 'a'})
+        self.cache.get("q", 0)['cached'] = True
+        self.assertNotIn('cached', self.cache.get("q", 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""Test cases for the document catalog"""
+import unittest
+import tempfile
+from pathlib import Path
+from core.catalog import DocumentCatalog
+
+
+class TestDocumentCatalog(unittest.TestCase):
+    """Test catalog lookups by path, hash and filename"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.catalog = DocumentCatalog(Path(self.temp_dir.name) / "catalog.sqlite3")
+        self.catalog.record("/sorted/Finance/Tax/pdf/gst.pdf", "abc", 100, 1.0, "Finance", "Tax", ["abc_0", "abc_1"])
+        self.catalog.record("/sorted/Technology/DevOps/log/app.log", "def", 50, 2.0, "Technology", "DevOps", ["def_0"])
+
+    def tearDown(self):
+        self.catalog._conn.close()
+        self.temp_dir.cleanup()
+
+    def test_get_and_has(self):
+        """Entries should round-trip including chunk ids"""
+        entry = self.catalog.get("/sorted/Finance/Tax/pdf/gst.pdf")
+        self.assertEqual(entry['filename'], "gst.pdf")
+        self.assertEqual(entry['chunk_ids'], ["abc_0", "abc_1"])
+        self.assertTrue(self.catalog.has("/sorted/Technology/DevOps/log/app.log"))
+        self.assertFalse(self.catalog.has("/sorted/missing.txt"))
+
+    def test_chunk_count(self):
+        """Chunk ids across entries should be counted (used to spot uncatalogued chunks)"""
+        self.assertEqual(self.catalog.chunk_count(), 3)
+        self.catalog.remove("/sorted/Finance/Tax/pdf/gst.pdf")
+        self.assertEqual(self.catalog.chunk_count(), 1)
+
+    def test_record_replaces_existing_path(self):
+        """Re-ingesting a path should overwrite its entry"""
+        self.catalog.record("/sorted/Finance/Tax/pdf/gst.pdf", "xyz", 120, 3.0, "Finance", "Tax", ["xyz_0"])
+        self.assertEqual(self.catalog.count(), 2)
+        self.assertEqual(self.catalog.get("/sorted/Finance/Tax/pdf/gst.pdf")['file_hash'], "xyz")
+
+    def test_find_by_hash_and_filename(self):
+        """Hash and filename lookups should use the indexed columns"""
+        self.assertEqual(len(self.catalog.find_by_hash("abc")), 1)
+        self.assertEqual(self.catalog.find_by_filename("app.log")[0]['domain'], "Technology")
+        self.assertEqual(self.catalog.find_by_filename("nope.txt"), [])
+
+    def test_remove(self):
+        """Removing returns the entry so its chunks can be deleted"""
+        entry = self.catalog.remove("/sorted/Technology/DevOps/log/app.log")
+        self.assertEqual(entry['chunk_ids'], ["def_0"])
+        self.assertIsNone(self.catalog.remove("/sorted/Technology/DevOps/log/app.log"))
+        self.assertEqual(len(self.catalog.remove_by_hash("abc")), 1)
+        self.assertEqual(self.catalog.count(), 0)
+
+    def test_find_by_fingerprint(self):
+        """Fingerprint lookups match size + quick hash, or size alone for entries without one"""
+        self.catalog.record("/sorted/Legal/Contracts/pdf/nda.pdf", "ghi", 100, 4.0, "Legal", "Contracts", [], quick_hash="q1")
+        self.assertEqual({e['file_hash'] for e in self.catalog.find_by_fingerprint(100, "q1")}, {"abc", "ghi"})
+        self.assertEqual([e['file_hash'] for e in self.catalog.find_by_fingerprint(100, "q2")], ["abc"])
+        self.assertEqual(self.catalog.find_by_fingerprint(999, "q1"), [])
+
+    def test_adds_quick_hash_column_to_old_catalog(self):
+        """Catalogs created before quick hashes existed should be migrated"""
+        import sqlite3
+        path = Path(self.temp_dir.name) / "old.sqlite3"
+        conn = sqlite3.connect(str(path))
+        conn.execute("CREATE TABLE files (filepath TEXT PRIMARY KEY, filename TEXT NOT NULL, file_hash TEXT NOT NULL, "
+                     "size_bytes INTEGER, mtime REAL, domain TEXT, category TEXT, chunk_ids TEXT NOT NULL DEFAULT '[]', "
+                     "ingested_at TEXT NOT NULL)")
+        conn.commit()
+        conn.close()
+        catalog = DocumentCatalog(path)
+        catalog.record("/sorted/a.txt", "aaa", 10, 1.0, "General", "Notes", [], quick_hash="q")
+        self.assertEqual(catalog.find_by_fingerprint(10, "q")[0]['quick_hash'], "q")
+        catalog._conn.close()
+
+    def test_summary(self):
+        """Summary should count files per domain"""
+        summary = self.catalog.summary()
+        self.assertEqual(summary['files'], 2)
+        self.assertEqual(summary['domains'], {'Finance': 1, 'Technology': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""Test cases for the /chat/stream Server-Sent Events endpoint"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from core.answer_cache import AnswerCache
+from core.chat_manager import ChatManager
+
+CHUNKS = [
+    {'chunk_id': "c1", 'text': "Run docker restart with the container name to restart it.",
+     'filename': "docker.txt", 'category': "Technology", 'similarity': 0.8},
+    {'chunk_id': "c2", 'text': "docker compose restart restarts every service in the compose file.",
+     'filename': "compose.txt", 'category': "Technology", 'similarity': 0.6},
+]
+
+
+class StubDatabase:
+    """Returns fixed chunks (or raises) instead of searching Chroma"""
+
+    def __init__(self):
+        self.error = None
+
+    def query(self, query, n_results=5, mode=None):
+        if self.error:
+            raise self.error
+        return [dict(chunk) for chunk in CHUNKS]
+
+    def get_generation(self):
+        return 1
+
+
+def parse_events(body):
+    """[(event, payload)] from an SSE body, checking each frame is exactly 'event' + 'data' lines"""
+    events = []
+    assert body.endswith("\n\n"), body
+    for frame in body[:-2].split("\n\n"):
+        event_line, data_line = frame.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: "), frame
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+
+class TestChatStream(unittest.TestCase):
+    """Event framing, the final sources, errors and chat history"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = Path(tempfile.mkdtemp())
+        # Keep the module-level DatabaseManager out of the real data directory
+        with mock.patch.dict(os.environ, {'CHROMA_DB_DIR': str(cls.temp_dir / "chroma")}):
+            import app
+        cls.app = app
+        cls.saved = (app.db_manager, app.chat_manager, app.answer_cache, app.llm_service.reranker)
+        app.llm_service.reranker = None  # keep the retrieved order; re-ranking has its own tests
+        cls.client = app.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.app.db_manager, cls.app.chat_manager, cls.app.answer_cache, cls.app.llm_service.reranker = cls.saved
+        cls.app.db_manager.query_cache_path = None  # its atexit save would target the removed directory
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.app.db_manager = self.db = StubDatabase()
+        self.app.chat_manager = ChatManager(Path(tempfile.mkdtemp(dir=self.temp_dir)))
+        self.app.answer_cache = AnswerCache(max_entries=10, ttl_seconds=60)
+
+    def stream(self, payload, parts=None, error=None):
+        def generate(**kwargs):
+            self.assertTrue(kwargs['stream'])
+            if error:
+                raise error
+            return iter({'response': part} for part in parts)
+
+        with mock.patch("core.llm.ollama.generate", side_effect=generate):
+            response = self.client.post('/chat/stream', json=payload)
+            body = response.get_data(as_text=True)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        return parse_events(body)
+
+    def test_events_and_saved_exchange(self):
+        """Metadata first, one token per Ollama part, then done with the sources; history is saved"""
+        chat_id = self.app.chat_manager.create_chat("New Chat")['id']
+        events = self.stream({'query': "How do I restart docker?", 'chat_id': chat_id},
+                             parts=["Use ", "docker restart", ""])
+
+        names = [event for event, _ in events]
+        self.assertEqual(names, ['metadata', 'token', 'token', 'done'])
+        metadata, done = events[0][1], events[-1][1]
+        self.assertEqual([payload['text'] for event, payload in events if event == 'token'], ["Use ", "docker restart"])
+        self.assertEqual(sorted(metadata['cited_files']), ["compose.txt", "docker.txt"])
+        self.assertGreater(metadata['prompt_tokens'], 0)
+
+        self.assertTrue(done['answer'].startswith("Use docker restart"))
+        self.assertIn("📄 Sources:", done['answer'])
+        self.assertEqual(sorted(done['cited_files']), sorted(metadata['cited_files']))
+        self.assertEqual(done['source_snippets'], metadata['source_snippets'])
+        self.assertFalse(done['cached'])
+
+        messages = self.app.chat_manager.get_messages(chat_id)
+        self.assertEqual([m['sender'] for m in messages], ["user", "assistant"])
+        self.assertEqual(messages[0]['text'], "How do I restart docker?")
+        self.assertEqual(messages[1]['text'], done['answer'])
+
+    def test_repeat_is_served_from_cache(self):
+        """A grounded answer should be replayed from the answer cache without calling Ollama"""
+        self.stream({'query': "restart docker"}, parts=["Use docker restart."])
+        events = self.stream({'query': "restart docker"}, error=AssertionError("Ollama should not be called"))
+
+        self.assertEqual([event for event, _ in events], ['metadata', 'token', 'done'])
+        self.assertTrue(events[-1][1]['cached'])
+
+    def test_ollama_failure_ends_with_done(self):
+        """A generation failure should still finish the stream with a user-facing answer"""
+        events = self.stream({'query': "restart docker"}, error=ConnectionError("connection refused"))
+
+        self.assertEqual([event for event, _ in events], ['metadata', 'done'])
+        self.assertEqual(events[-1][1]['answer'], self.app.llm_service.OLLAMA_UNAVAILABLE_ANSWER)
+        self.assertEqual(events[-1][1]['cited_files'], [])
+
+    def test_error_event(self):
+        """An exception outside generation should be reported as an error event"""
+        self.db.error = RuntimeError("index unavailable")
+        events = self.stream({'query': "restart docker"}, parts=[])
+
+        self.assertEqual(events, [('error', {'error': "index unavailable"})])
+
+    def test_invalid_requests(self):
+        """Empty queries are rejected before streaming starts"""
+        self.assertEqual(self.client.post('/chat/stream', json={'query': "  "}).status_code, 400)
+        self.assertEqual(self.client.post('/chat/stream', data="not json").status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
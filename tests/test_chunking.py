@@ -0,0 +1,120 @@
+"""Test cases for the per-file-type chunking policies"""
+import unittest
+from pathlib import Path
+from core.chunking import (
+    CodePolicy, LogPolicy, MarkdownPolicy, ProsePolicy, SlidePolicy, TablePolicy,
+    parse_setting, policy_name_for
+)
+from utils import TextUtils
+
+
+class TestPolicySelection(unittest.TestCase):
+    """Policies are chosen by extension, then file type, with config overrides"""
+
+    def test_defaults(self):
+        self.assertEqual(policy_name_for(Path("a.py")), "code")
+        self.assertEqual(policy_name_for(Path("deck.pptx")), "slides")
+        self.assertEqual(policy_name_for(Path("sheet.xlsx")), "table")
+        self.assertEqual(policy_name_for(Path("data.csv")), "table")
+        self.assertEqual(policy_name_for(Path("README.md")), "markdown")
+        self.assertEqual(policy_name_for(Path("app.log")), "log")
+        self.assertEqual(policy_name_for(Path("report.pdf")), "prose")
+
+    def test_overrides(self):
+        overrides = parse_setting(".log=prose, code=prose, .txt=nonsense")
+        self.assertEqual(policy_name_for(Path("app.log"), overrides), "prose")
+        self.assertEqual(policy_name_for(Path("a.py"), overrides), "prose")
+        self.assertEqual(policy_name_for(Path("notes.txt"), overrides), "prose")
+
+
+class TestPolicies(unittest.TestCase):
+    """Each policy keeps its file type's units whole and within budget"""
+
+    def test_python_functions_stay_whole(self):
+        functions = [f"def func_{i}(x):\n    \"\"\"Doc {i}\"\"\"\n" + "    x = x + 1\n" * 12 + "    return x\n"
+                     for i in range(6)]
+        source = "import os\n\n\n" + "\n\n".join(functions)
+        chunks = list(CodePolicy(max_tokens=120).iter_chunks(source))
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(TextUtils.estimate_tokens(chunk), 120)
+            # A function never spans two chunks
+            self.assertEqual(chunk.count("def func_"), chunk.count("return x"))
+
+    def test_python_large_class_repeats_class_line(self):
+        methods = "\n".join(f"    def method_{i}(self):\n" + "        self.value += 1\n" * 10 for i in range(6))
+        source = f"class Big:\n    value = 0\n\n{methods}"
+        chunks = list(CodePolicy(max_tokens=120).iter_chunks(source))
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(chunk.startswith("class Big:") for chunk in chunks))
+
+    def test_other_code_split_at_top_level_blocks(self):
+        source = "\n\n".join(f"function f{i}() {{\n  return {i};\n}}" for i in range(3))
+        chunks = list(CodePolicy(max_tokens=12).iter_chunks(source))
+        self.assertEqual(chunks, [f"function f{i}() {{\n  return {i};\n}}" for i in range(3)])
+
+    def test_slides(self):
+        text = "\n".join(f"\n=== Slide {i} ===\nTitle {i}\n" + "bullet point text\n" * (30 if i == 2 else 2)
+                         for i in range(1, 4))
+        chunks = list(SlidePolicy(max_tokens=40).iter_chunks(text))
+        self.assertTrue(chunks[0].startswith("=== Slide 1 ==="))
+        # The long slide is split with its heading on each piece
+        self.assertGreater(sum(1 for c in chunks if c.startswith("=== Slide 2 ===")), 1)
+        self.assertTrue(chunks[-1].startswith("=== Slide 3 ==="))
+
+    def test_table_repeats_header(self):
+        rows = "\n".join(f"{i} | item {i} | {i * 10}" for i in range(100))
+        text = f"=== Sheet: Stock ===\n\nid | name | qty\n{rows}\n\n=== Sheet: Empty ===\nonly | header"
+        chunks = list(TablePolicy(max_tokens=60).iter_chunks(text))
+        self.assertGreater(len(chunks), 3)
+        self.assertTrue(all(c.startswith("=== Sheet: Stock ===\nid | name | qty\n") for c in chunks[:-1]))
+        self.assertEqual(chunks[-1], "=== Sheet: Empty ===\nonly | header")
+        csv_chunks = list(TablePolicy(max_tokens=60).iter_chunks(f"id | name | qty\n{rows}"))
+        self.assertTrue(all(c.startswith("id | name | qty\n") for c in csv_chunks))
+
+    def test_markdown_sections(self):
+        text = "# Guide\nIntro text.\n\n## Install\n" + "Run the installer now. " * 40 + "\n\n## Usage\nCall it."
+        chunks = list(MarkdownPolicy(max_tokens=60).iter_chunks(text))
+        self.assertTrue(chunks[0].startswith("# Guide"))
+        self.assertGreater(sum(1 for c in chunks if c.startswith("## Install")), 1)
+        self.assertEqual(chunks[-1], "## Usage\nCall it.")
+
+    def test_log_time_windows(self):
+        lines = [f"2024-05-01 10:{minute:02d}:00 ERROR worker {minute} failed" for minute in range(0, 30)]
+        lines.insert(3, "Traceback (most recent call last):\n  File \"x.py\", line 1")
+        chunks = list(LogPolicy(max_tokens=240, window_seconds=600).iter_chunks("\n".join(lines)))
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(chunks[0].startswith("2024-05-01 10:00:00") and chunks[1].startswith("2024-05-01 10:10:00"))
+        self.assertIn("worker 2 failed\nTraceback", chunks[0])
+
+    def test_with_max_tokens_keeps_settings(self):
+        """Overriding the budget should keep policy-specific settings such as the log window"""
+        policy = LogPolicy(max_tokens=240, overlap_tokens=8, window_seconds=600)
+        smaller = policy.with_max_tokens(120)
+        self.assertIsInstance(smaller, LogPolicy)
+        self.assertEqual((smaller.max_tokens, smaller.overlap_tokens, smaller.window_seconds), (120, 8, 600))
+        self.assertIs(smaller.count_tokens, policy.count_tokens)
+        self.assertEqual(policy.max_tokens, 240)
+
+    def test_log_template_summary_kept_per_template(self):
+        blocks = [f"=== Template {i}: 10 lines ===\nINFO step <*> done\nExamples:\nINFO step {i} done" for i in range(1, 40)]
+        text = "=== Log summary: app.log, 390 lines, 39 templates ===\n\n" + "\n\n".join(blocks)
+        chunks = list(LogPolicy(max_tokens=80).iter_chunks(text))
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(c.count("=== Template") == c.count("Examples:") for c in chunks))
+        self.assertTrue(all(c.startswith("=== Template") for c in chunks[1:]))
+
+    def test_log_timestamp_formats(self):
+        self.assertIsNotNone(LogPolicy.parse_timestamp("[2024-05-01T10:00:00Z] INFO up"))
+        self.assertIsNotNone(LogPolicy.parse_timestamp('1.2.3.4 - - [01/May/2024:10:00:00 +0000] "GET /"'))
+        self.assertIsNotNone(LogPolicy.parse_timestamp("May  1 10:00:00 host sshd[1]: accepted"))
+        self.assertIsNone(LogPolicy.parse_timestamp("  at com.example.Main(Main.java:10)"))
+
+    def test_prose_is_default_chunker(self):
+        text = "One sentence here. " * 100
+        self.assertEqual(list(ProsePolicy(max_tokens=50, overlap_tokens=0).iter_chunks(text)),
+                         list(TextUtils.iter_chunks(text, 50, 0)))
+
+
+if __name__ == '__main__':
+    unittest.main()
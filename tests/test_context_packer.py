@@ -0,0 +1,60 @@
+"""Test cases for token-budgeted prompt packing"""
+import unittest
+from core.context_packer import ContextPacker
+from utils import TextUtils
+
+
+def make_chunk(name, text):
+    return {'filename': name, 'text': text}
+
+
+FILLER = " ".join(f"Unrelated sentence {i} about office furniture and lunch menus." for i in range(30))
+
+
+class TestContextPacker(unittest.TestCase):
+    """Test budget limits, sentence-level trimming and chunk order"""
+
+    def setUp(self):
+        self.packer = ContextPacker(max_chunks=5, max_chunk_tokens=400, min_chunk_tokens=5)
+
+    def test_whole_chunks_when_they_fit(self):
+        """Small chunks should be packed whole, best first, with source headers"""
+        chunks = [make_chunk("a.txt", "Docker restarts containers."), make_chunk("b.txt", "Tax forms are due in April.")]
+        packed = self.packer.pack("restart docker", chunks, budget=500)
+
+        self.assertEqual(packed.chunks, chunks)
+        self.assertEqual(packed.text, "[Source 1: a.txt]\nDocker restarts containers.\n\n[Source 2: b.txt]\nTax forms are due in April.\n")
+        self.assertEqual(packed.tokens, TextUtils.estimate_tokens(packed.text))
+        self.assertEqual((packed.trimmed, packed.dropped), (0, 0))
+
+    def test_budget_is_respected(self):
+        """Packed context should never exceed the budget"""
+        chunks = [make_chunk(f"{i}.txt", FILLER) for i in range(5)]
+        for budget in (50, 200, 700):
+            packed = self.packer.pack("office lunch", chunks, budget=budget)
+            self.assertLessEqual(packed.tokens, budget)
+            self.assertGreater(packed.tokens, 0)
+
+    def test_trim_keeps_relevant_sentences_not_prefix(self):
+        """An oversized chunk should keep the sentences that mention the query"""
+        text = FILLER + " To restart a stuck docker container run docker restart with its id. " + FILLER
+        packed = self.packer.pack("how to restart docker container", [make_chunk("ops.md", text)], budget=60)
+
+        self.assertEqual(packed.trimmed, 1)
+        self.assertIn("docker restart", packed.text)
+        self.assertNotIn("Unrelated sentence 0 ", packed.text)
+        self.assertLessEqual(packed.tokens, 60)
+
+    def test_max_chunks_and_drops(self):
+        """Chunks past max_chunks or too small to be useful should be dropped"""
+        packer = ContextPacker(max_chunks=2, min_chunk_tokens=5)
+        chunks = [make_chunk(f"{i}.txt", f"Chunk {i} text.") for i in range(4)]
+        packed = packer.pack("chunk", chunks, budget=500)
+        self.assertEqual([c['filename'] for c in packed.chunks], ["0.txt", "1.txt"])
+        self.assertEqual(packed.dropped, 2)
+
+        self.assertEqual(packer.pack("chunk", chunks, budget=3).chunks, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
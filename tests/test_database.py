@@ -1,4 +1,6 @@
 """Test cases for ChromaDB database operations"""
+import shutil
+import tempfile
 import unittest
 from pathlib import Path
 from core.database import DatabaseManager
@@ -10,8 +12,13 @@ class TestDatabaseManager(unittest.TestCase):
     
     @classmethod
     def setUpClass(cls):
-        """Initialize database manager once for all tests"""
-        cls.db = DatabaseManager(Path("data/database"))
+        """Initialize database manager once for all tests, in a scratch directory"""
+        cls.temp_dir = Path(tempfile.mkdtemp())
+        cls.db = DatabaseManager(cls.temp_dir / "database")
+    
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
     
     def test_database_initialization(self):
         """Database should initialize without errors"""
@@ -59,6 +66,36 @@ class TestDatabaseManager(unittest.TestCase):
         results = self.db.query("Python", n_results=1)
         self.assertIsInstance(results, list)
     
+    def test_uncatalogued_chunks_are_found(self):
+        """Files stored with add_chunks alone should still be found and reconciled into the catalog"""
+        filepath = "uncatalogued_test.txt"
+        self.db.add_chunks([
+            DocumentChunk(
+                chunk_id="uncatalogued_1",
+                document_hash="uncatalogued_hash",
+                text="Stored without a catalog entry",
+                chunk_index=0,
+                filename=filepath,
+                category="Test",
+                filepath=filepath
+            )
+        ])
+        try:
+            self.assertFalse(self.db.catalog.has(filepath))
+            self.assertTrue(self.db.has_filepath(filepath))
+            self.db._backfill_catalog()
+            self.assertEqual(self.db.catalog.get(filepath)['chunk_ids'], ["uncatalogued_1"])
+        finally:
+            self.db.delete_by_filepath(filepath)
+    
+    def test_query_embedding_uses_normalized_text(self):
+        """Query spellings that share a cache key should get the same (normalized) embedding"""
+        first = self.db._embed_query("What is  Python?")
+        second = self.db._embed_query("what is python")
+        self.assertEqual(first, second)
+        expected = [float(x) for x in self.db.embedding_function(["what is python"])[0]]
+        self.assertEqual(first, expected)
+    
     def test_delete_by_hash(self):
         """Should delete chunks by file hash"""
         file_hash = "delete_hash"
@@ -79,6 +116,48 @@ class TestDatabaseManager(unittest.TestCase):
         
         # Verify deletion
         self.assertGreater(deleted, 0)
+    
+    def test_delete_listeners(self):
+        """Delete listeners should be called with the ids of deleted chunks"""
+        self.db.add_chunks([
+            DocumentChunk(
+                chunk_id="listener_1",
+                document_hash="listener_hash",
+                text="Content whose deletion is observed",
+                chunk_index=0,
+                filename="listener_test.txt",
+                category="Test",
+                filepath="listener_test.txt"
+            )
+        ])
+        notified = []
+        self.db.add_delete_listener(notified.extend)
+        try:
+            self.db.delete_by_hash("listener_hash")
+        finally:
+            self.db._delete_listeners.remove(notified.extend)
+        
+        self.assertEqual(notified, ["listener_1"])
+    
+    def test_reingest_document(self):
+        """Re-ingesting should write new chunks, drop vanished ones and keep the rest"""
+        from datetime import datetime
+        
+        def make(texts, file_hash):
+            document = Document(filename="reingest.txt", filepath=Path("reingest.txt"), file_hash=file_hash,
+                                category="Test", text_content="", file_type="text", size_bytes=0,
+                                created_at=datetime.now())
+            chunks = [DocumentChunk(chunk_id=f"reingest_{text}", document_hash=file_hash, text=text, chunk_index=i,
+                                    filename="reingest.txt", category="Test", filepath="reingest.txt")
+                      for i, text in enumerate(texts)]
+            return document, chunks
+        
+        self.db.reingest_document(*make(["alpha", "beta", "gamma"], "v1"))
+        stats = self.db.reingest_document(*make(["alpha", "gamma", "delta"], "v2"))
+        self.assertEqual(stats, {'added': 1, 'unchanged': 2, 'removed': 1})
+        self.assertEqual(sorted(self.db.catalog.get("reingest.txt")['chunk_ids']),
+                         ["reingest_alpha", "reingest_delta", "reingest_gamma"])
+        self.assertEqual(self.db.delete_by_filepath("reingest.txt"), 3)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,64 @@
+"""Test cases for the persistent chunk embedding store"""
+import unittest
+import tempfile
+from pathlib import Path
+from core.embedding_store import EmbeddingStore
+
+
+class TestEmbeddingStore(unittest.TestCase):
+    """Test storage, lookup and cross-instance persistence"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store_dir = Path(self.temp_dir.name)
+        self.store = EmbeddingStore(self.store_dir, model_id="test-model")
+
+    def tearDown(self):
+        self.store._conn.close()
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        """Stored vectors come back for the same text, by input position"""
+        self.store.put_many(["alpha", "beta"], [[1.0, 0.0, 0.5], [0.0, 1.0, 0.25]])
+        found = self.store.get_many(["beta", "gamma", "alpha"])
+        self.assertEqual(sorted(found), [0, 2])
+        self.assertEqual(found[0], [0.0, 1.0, 0.25])
+        self.assertEqual(found[2], [1.0, 0.0, 0.5])
+
+    def test_duplicates_are_stored_once(self):
+        """Re-putting known text should not grow the store"""
+        self.store.put_many(["alpha", "alpha"], [[1.0, 2.0], [1.0, 2.0]])
+        self.store.put_many(["alpha"], [[9.0, 9.0]])
+        self.assertEqual(self.store.count(), 1)
+        self.assertEqual(self.store.get_many(["alpha"])[0], [1.0, 2.0])
+
+    def test_model_id_is_part_of_key(self):
+        """Another model must not see this model's vectors"""
+        self.store.put_many(["alpha"], [[1.0, 2.0]])
+        other = EmbeddingStore(self.store_dir, model_id="other-model")
+        self.assertEqual(other.get_many(["alpha"]), {})
+        other._conn.close()
+
+    def test_persists_and_grows_across_instances(self):
+        """A second instance sees rows written by the first, including after growth"""
+        texts = [f"chunk {i}" for i in range(EmbeddingStore.GROWTH_ROWS + 10)]
+        self.store.put_many(texts[:5], [[float(i), 1.0] for i in range(5)])
+
+        reopened = EmbeddingStore(self.store_dir, model_id="test-model")
+        self.assertEqual(reopened.get_many(["chunk 3"])[0], [3.0, 1.0])
+
+        # The first instance grows the file past the second one's mapping
+        self.store.put_many(texts[5:], [[float(i), 1.0] for i in range(5, len(texts))])
+        last = texts[-1]
+        self.assertEqual(reopened.get_many([last])[0], [float(len(texts) - 1), 1.0])
+        reopened._conn.close()
+
+    def test_dimension_mismatch_rejected(self):
+        """Vectors of a different size are refused"""
+        self.store.put_many(["alpha"], [[1.0, 2.0]])
+        with self.assertRaises(ValueError):
+            self.store.put_many(["beta"], [[1.0, 2.0, 3.0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
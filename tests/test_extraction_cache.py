@@ -0,0 +1,74 @@
+"""Test cases for the content-addressed extraction cache"""
+import unittest
+import tempfile
+import os
+import time
+from pathlib import Path
+from unittest import mock
+from core.extraction_cache import ExtractionCache
+from core.processor import FileProcessor
+
+
+class TestExtractionCache(unittest.TestCase):
+    """Test storage, versioning and size-bounded eviction"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self.temp_dir.name) / "cache"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_round_trip_and_version(self):
+        """Entries are found by (hash, version) only"""
+        cache = ExtractionCache(self.cache_dir)
+        cache.put("abc123", "pdf-v1", "Extracted text ✓")
+        self.assertEqual(cache.get("abc123", "pdf-v1"), "Extracted text ✓")
+        self.assertIsNone(cache.get("abc123", "pdf-v2"))
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_eviction_drops_least_recently_used(self):
+        """Going over budget evicts the oldest entries first"""
+        cache = ExtractionCache(self.cache_dir, max_bytes=3500)
+        for name in ("aa", "bb", "cc"):
+            # Random hex barely compresses, so each entry is ~1.6 KB on disk
+            cache.put(name * 8, "v", os.urandom(1500).hex())
+            time.sleep(0.02)
+
+        self.assertLessEqual(cache.stats()['size_bytes'], 3500)
+        self.assertIsNotNone(cache.get("cc" * 8, "v"))
+        self.assertIsNone(cache.get("aa" * 8, "v"))
+
+    def test_entry_evicted_during_get_is_a_miss(self):
+        """An entry removed by another process between the read and the touch is a miss, not an error"""
+        cache = ExtractionCache(self.cache_dir)
+        cache.put("abc123", "v", "Extracted text")
+        real_utime = os.utime
+
+        def evicted(path, *args, **kwargs):
+            Path(path).unlink()
+            return real_utime(path, *args, **kwargs)
+        with mock.patch("core.extraction_cache.os.utime", side_effect=evicted):
+            self.assertIsNone(cache.get("abc123", "v"))
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_processor_skips_repeat_extraction(self):
+        """A second FileProcessor reuses the first one's extraction"""
+        import fitz
+        pdf_path = Path(self.temp_dir.name) / "manual.pdf"
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), "Torque settings for the pump")
+        doc.save(str(pdf_path))
+        doc.close()
+
+        first = FileProcessor(extraction_cache=ExtractionCache(self.cache_dir))
+        text = first.extract_text(pdf_path)
+        self.assertIn("Torque settings", text)
+
+        second = FileProcessor(extraction_cache=ExtractionCache(self.cache_dir))
+        self.assertEqual(second.extract_text(pdf_path), text)
+        self.assertEqual(second.extraction_cache.stats()['hits'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
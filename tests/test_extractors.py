@@ -7,6 +7,8 @@ from extractors.image_extractor import ImageExtractor
 from extractors.document_extractor import DocumentExtractor
 from extractors.code_extractor import CodeExtractor
 from extractors.audio_extractor import AudioExtractor
+from extractors.ocr_engine import OCREngine
+from extractors.log_extractor import LogExtractor
 
 
 class TestPDFExtractor(unittest.TestCase):
@@ -17,6 +19,106 @@ class TestPDFExtractor(unittest.TestCase):
         # Create a dummy test - real test needs actual PDF file
         extractor = PDFExtractor()
         self.assertIsNotNone(extractor)
+    
+    def make_pdf(self, pages):
+        """Write a PDF with one line of text per page"""
+        import fitz
+        doc = fitz.open()
+        for text in pages:
+            doc.new_page().insert_text((72, 72), text)
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+            temp_path = Path(f.name)
+        doc.save(str(temp_path))
+        doc.close()
+        return temp_path
+    
+    def test_engines_yield_pages_in_order(self):
+        """PyMuPDF, page-parallel PyMuPDF and pdfminer should agree on page order"""
+        texts = [f"Page number {i} content" for i in range(6)]
+        temp_path = self.make_pdf(texts)
+        
+        try:
+            extractors = [
+                PDFExtractor(engine="pymupdf"),
+                PDFExtractor(engine="pymupdf", parallel_min_pages=2, max_workers=3),
+                PDFExtractor(engine="pdfminer")
+            ]
+            for extractor in extractors:
+                pages = [page.strip() for page in extractor.iter_pages(temp_path)]
+                self.assertEqual(pages, texts)
+            self.assertIn("Page number 5", PDFExtractor().extract(temp_path))
+        finally:
+            temp_path.unlink(missing_ok=True)
+    
+    def test_parallel_pages_in_daemon_process(self):
+        """Where a process pool can't be used (Celery prefork children), ranges go to subprocesses"""
+        texts = [f"Page number {i} content" for i in range(7)]
+        temp_path = self.make_pdf(texts)
+        
+        try:
+            extractor = PDFExtractor(engine="pymupdf", parallel_min_pages=2, max_workers=3)
+            extractor._can_use_process_pool = lambda: False
+            self.assertEqual([page.strip() for page in extractor.iter_pages(temp_path)], texts)
+        finally:
+            temp_path.unlink(missing_ok=True)
+    
+    def make_scanned_pdf(self):
+        """PDF with a text page followed by an image-only page"""
+        import fitz
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), "This page has a real text layer")
+        pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 50, 50), False)
+        pix.clear_with(255)
+        doc.new_page().insert_image(fitz.Rect(0, 0, 200, 200), pixmap=pix)
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+            temp_path = Path(f.name)
+        doc.save(str(temp_path))
+        doc.close()
+        return temp_path
+    
+    def test_only_image_pages_need_ocr(self):
+        """Pages with a text layer should never be sent to OCR"""
+        temp_path = self.make_scanned_pdf()
+        
+        try:
+            extractor = PDFExtractor()
+            pages = list(extractor.iter_pages(temp_path))
+            self.assertEqual(extractor.pages_needing_ocr(temp_path, pages), [1])
+        finally:
+            temp_path.unlink(missing_ok=True)
+    
+    def test_ocr_failure_keeps_text_pages(self):
+        """If Tesseract is unavailable or fails, the text layer is still returned"""
+        temp_path = self.make_scanned_pdf()
+        
+        try:
+            text = PDFExtractor(ocr_engine=OCREngine(max_workers=1)).extract(temp_path)
+            self.assertIn("real text layer", text)
+        finally:
+            temp_path.unlink(missing_ok=True)
+    
+    def test_extract_from_bytes_matches_path(self):
+        """Passing the already-read bytes should give the same text"""
+        temp_path = self.make_pdf(["First page", "Second page"])
+        
+        try:
+            data = temp_path.read_bytes()
+            for engine in PDFExtractor.ENGINES:
+                extractor = PDFExtractor(engine=engine)
+                self.assertEqual(extractor.extract(temp_path, data), extractor.extract(temp_path))
+        finally:
+            temp_path.unlink(missing_ok=True)
+    
+    def test_unreadable_pdf_returns_empty(self):
+        """Corrupt PDFs should fall back and finally return an empty string"""
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+            f.write(b"not a pdf")
+            temp_path = Path(f.name)
+        
+        try:
+            self.assertEqual(PDFExtractor().extract(temp_path), "")
+        finally:
+            temp_path.unlink(missing_ok=True)
 
 
 class TestImageExtractor(unittest.TestCase):
@@ -44,6 +146,20 @@ class TestDocumentExtractor(unittest.TestCase):
         finally:
             temp_path.unlink(missing_ok=True)
     
+    def test_extract_from_bytes_normalizes_newlines(self):
+        """CRLF bytes should give the same text as reading the file in text mode"""
+        data = b"First paragraph.\r\n\r\nSecond paragraph.\rThird line"
+        with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
+            f.write(data)
+            temp_path = Path(f.name)
+        
+        try:
+            result = DocumentExtractor.extract_text(temp_path, data)
+            self.assertEqual(result, "First paragraph.\n\nSecond paragraph.\nThird line")
+            self.assertEqual(result, DocumentExtractor.extract_text(temp_path))
+        finally:
+            temp_path.unlink(missing_ok=True)
+    
     def test_extract_empty_file(self):
         """Should handle empty files gracefully"""
         with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
@@ -73,6 +189,54 @@ class TestCodeExtractor(unittest.TestCase):
             temp_path.unlink(missing_ok=True)
 
 
+class TestLogExtractor(unittest.TestCase):
+    """Test log template mining"""
+    
+    def setUp(self):
+        lines = []
+        for i in range(300):
+            lines.append(f"2024-05-01 10:{i // 60:02d}:{i % 60:02d} INFO Request {i} served in {i % 17}ms from 10.0.0.{i % 255}")
+            if i % 50 == 0:
+                lines.append(f"2024-05-01 10:{i // 60:02d}:{i % 60:02d} ERROR Connection to db-{i % 3} refused")
+        self.text = "\n".join(lines) + "\n"
+        with tempfile.NamedTemporaryFile(suffix='.log', delete=False) as f:
+            f.write(self.text.encode())
+            self.temp_path = Path(f.name)
+    
+    def tearDown(self):
+        self.temp_path.unlink(missing_ok=True)
+    
+    def test_mines_templates_with_counts_and_times(self):
+        """Repetitive lines should collapse into a few templates"""
+        summary = LogExtractor(min_lines=10).mine(self.temp_path)
+        self.assertEqual(summary.line_count, 306)
+        by_template = {t.template: t for t in summary.templates}
+        self.assertEqual(set(by_template), {"INFO Request <*> served in <*> from <*>", "ERROR Connection to <*> refused"})
+        errors = by_template["ERROR Connection to <*> refused"]
+        self.assertEqual(errors.count, 6)
+        self.assertEqual((errors.first_seen.minute, errors.last_seen.minute), (0, 4))
+        self.assertEqual(len(errors.examples), 3)
+    
+    def test_ranges_address_raw_lines(self):
+        """Template byte ranges should read back the raw lines"""
+        summary = LogExtractor(min_lines=10).mine(self.temp_path)
+        errors = next(t for t in summary.templates if t.template.startswith("ERROR"))
+        first, last, start, end = errors.ranges[1]
+        self.assertEqual(first, last)
+        self.assertEqual(LogExtractor.read_range(self.temp_path, start, end),
+                         self.text.splitlines(keepends=True)[first - 1])
+    
+    def test_extract_summary_and_short_logs(self):
+        """Long logs become a compact summary; short ones stay raw"""
+        summary = LogExtractor(min_lines=10).extract(self.temp_path, self.temp_path.read_bytes())
+        self.assertTrue(summary.startswith(LogExtractor.SUMMARY_HEADER))
+        self.assertLess(len(summary), len(self.text) / 5)
+        self.assertIn("=== Template 1: 300 lines, 2024-05-01 10:00:00 to 2024-05-01 10:04:59 ===", summary)
+        self.assertEqual(LogExtractor(min_lines=1000).extract(self.temp_path), self.text.strip())
+        crlf = self.text.replace("\n", "\r\n").encode()
+        self.assertEqual(LogExtractor(min_lines=1000).extract(self.temp_path, crlf), self.text.strip())
+
+
 class TestAudioExtractor(unittest.TestCase):
     """Test audio extraction (marked for future)"""
     
@@ -0,0 +1,70 @@
+"""Test cases for the watcher's in-flight duplicate tracking"""
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from core.in_flight import InFlightFiles
+
+
+class TestInFlightFiles(unittest.TestCase):
+    """Duplicates queued together, release after the task ends and expiry"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.temp_dir.name)
+        self.in_flight = InFlightFiles(max_size=100, ttl_seconds=3600)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def make_file(self, name, content):
+        path = self.dir / name
+        path.write_bytes(content)
+        return path
+
+    def test_same_batch_duplicate_is_skipped(self):
+        """The second of two identical files should point at the first; other content is queued"""
+        first = self.make_file("a.txt", b"x" * 100)
+        second = self.make_file("b.txt", b"x" * 100)
+        same_size = self.make_file("c.txt", b"y" * 100)
+
+        self.assertIsNone(self.in_flight.claim(first))
+        self.assertEqual(self.in_flight.claim(second), str(first))
+        self.assertIsNone(self.in_flight.claim(same_size))
+        self.assertIsNone(self.in_flight.claim(first))  # re-queuing the same path is not a duplicate
+
+    def test_release_returns_waiting_duplicates(self):
+        """When the first copy's task ends, its duplicates should be handed back and no longer blocked"""
+        first = self.make_file("a.txt", b"report" * 50)
+        second = self.make_file("b.txt", b"report" * 50)
+        self.in_flight.claim(first)
+        self.in_flight.claim(second)
+        self.in_flight.claim(second)
+
+        self.assertEqual(self.in_flight.release(first), [str(second)])
+        self.assertEqual(self.in_flight.release(first), [])
+        # The first copy failed and stayed put: the duplicate can now be queued itself
+        self.assertIsNone(self.in_flight.claim(second))
+        self.assertEqual(self.in_flight.claim(first), str(second))
+
+    def test_moved_twin_is_ignored(self):
+        """A queued file the worker already moved should not block a new copy"""
+        first = self.make_file("a.txt", b"z" * 100)
+        self.in_flight.claim(first)
+        first.unlink()
+
+        self.assertIsNone(self.in_flight.claim(self.make_file("b.txt", b"z" * 100)))
+
+    def test_entries_expire(self):
+        """Without a release, entries should stop blocking after the TTL"""
+        in_flight = InFlightFiles(max_size=100, ttl_seconds=0.01)
+        first = self.make_file("a.txt", b"q" * 100)
+        in_flight.claim(first)
+        time.sleep(0.02)
+
+        self.assertIsNone(in_flight.claim(self.make_file("b.txt", b"q" * 100)))
+
+
+if __name__ == '__main__':
+    unittest.main()
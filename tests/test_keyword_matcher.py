@@ -0,0 +1,82 @@
+"""Test cases for single-pass keyword counting in the classifier"""
+import unittest
+import random
+from core.keyword_matcher import KeywordMatcher
+from core.classifier import DocumentClassifier
+
+
+def reference_classify(classifier, text, filename):
+    """Original per-keyword str.count scoring, used as the parity oracle"""
+    text_lower = text.lower()
+    filename_lower = filename.lower()
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    for rule in classifier.GUARDRAIL_RULES:
+        if any(k in text_lower or k in filename_lower for k in rule["kw"]):
+            return (rule["domain"], rule["category"], 100, 100)
+    if ext in {"md", "rst", "adoc"}:
+        return ("Documentation", "Other", 90, 90)
+
+    domain_scores = {}
+    for domain, keywords in classifier.DOMAIN_KEYWORDS.items():
+        score = sum(text_lower.count(k) * 2 for k in keywords["strong"])
+        score += sum(text_lower.count(k) for k in keywords["weak"])
+        score += sum(5 for k in keywords["strong"] if k in filename_lower)
+        domain_scores[domain] = score
+    best_domain = max(domain_scores, key=domain_scores.get)
+    if domain_scores[best_domain] == 0:
+        best_domain = "Technology"
+
+    category_scores = {}
+    for category, keywords in classifier.CATEGORY_KEYWORDS_BY_DOMAIN.get(best_domain, {}).items():
+        if category == "Other":
+            continue
+        category_scores[category] = sum(text_lower.count(k) for k in keywords) + sum(5 for k in keywords if k in filename_lower)
+    best_category = max(category_scores, key=category_scores.get) if category_scores else "Other"
+    if category_scores.get(best_category, 0) == 0:
+        best_category = "Other"
+    return (best_domain, best_category, domain_scores[best_domain], category_scores.get(best_category, 0))
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    """Counts must match str.count exactly"""
+
+    def test_matches_str_count(self):
+        """Non-overlapping semantics, including self-overlapping keywords"""
+        keywords = ["deed", "aa", "test", "test result", "api", "api design", "ai"]
+        matcher = KeywordMatcher(keywords)
+        text = "deedeed aaaaa testest test result api design maintain ai"
+        counts = matcher.count_all(text)
+        for keyword in keywords:
+            self.assertEqual(counts.get(keyword, 0), text.count(keyword), keyword)
+
+    def test_empty_text(self):
+        """Empty text should produce no counts"""
+        self.assertEqual(KeywordMatcher(["a"]).count_all(""), {})
+
+
+class TestClassifierParity(unittest.TestCase):
+    """Automaton-based scoring should reproduce the original scoring"""
+
+    def test_random_documents(self):
+        classifier = DocumentClassifier()
+        vocab = set()
+        for tiers in classifier.DOMAIN_KEYWORDS.values():
+            vocab.update(tiers["strong"], tiers["weak"])
+        guardrail = {k for rule in classifier.GUARDRAIL_RULES for k in rule["kw"]}
+        # Leave guardrail keywords out of most documents so domain scoring is exercised
+        vocab = sorted(vocab - guardrail) + ["the", "and", "report", "deedeed", "data"]
+
+        rng = random.Random(42)
+        for i in range(200):
+            text = " ".join(rng.choice(vocab) for _ in range(rng.randint(0, 60)))
+            if i % 10 == 0:
+                text += " " + rng.choice(sorted(guardrail))
+            filename = rng.choice(["notes.txt", "report.pdf", "drone_plan.docx", "readme.md", "data"])
+
+            result = classifier.classify_hierarchical(text, filename)
+            got = (result["domain"], result["category"], result["domain_score"], result["category_score"])
+            self.assertEqual(got, reference_classify(classifier, text, filename), text)
+
+
+if __name__ == '__main__':
+    unittest.main()
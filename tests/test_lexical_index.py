@@ -0,0 +1,70 @@
+"""Test cases for the BM25 lexical index"""
+import unittest
+import tempfile
+from pathlib import Path
+from core.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+
+class TestLexicalIndex(unittest.TestCase):
+    """Test BM25 indexing and search"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.index = LexicalIndex(Path(self.temp_dir.name) / "lexical.sqlite3")
+        self.index.add([
+            ("a_0", "Form 16 is issued by the employer for salary income"),
+            ("b_0", "Docker container failed with ERR-1042 on port 80"),
+            ("c_0", "Python programming language tutorial"),
+        ])
+
+    def tearDown(self):
+        self.index._conn.close()
+        self.temp_dir.cleanup()
+
+    def test_tokenize_keeps_codes(self):
+        """Error codes and numbers should survive tokenization"""
+        self.assertEqual(tokenize("ERR-1042 on Form 16"), ["err", "1042", "form", "16"])
+
+    def test_exact_term_ranks_first(self):
+        """Exact identifiers should retrieve their chunk"""
+        results = self.index.search("what does ERR-1042 mean", n_results=3)
+        self.assertEqual(results[0][0], "b_0")
+        self.assertEqual(self.index.search("form 16")[0][0], "a_0")
+
+    def test_no_match(self):
+        """Unknown terms should return no results"""
+        self.assertEqual(self.index.search("kubernetes"), [])
+
+    def test_remove(self):
+        """Removed chunks should disappear from results and stats"""
+        self.assertEqual(self.index.remove(["b_0", "missing"]), 1)
+        self.assertEqual(self.index.count(), 2)
+        self.assertEqual(self.index.search("ERR-1042"), [])
+
+    def test_re_add_replaces(self):
+        """Adding an existing id should replace, not duplicate, it"""
+        self.index.add([("c_0", "Rust programming language")])
+        self.assertEqual(self.index.count(), 3)
+        self.assertEqual(self.index.search("python"), [])
+        self.assertEqual(self.index.search("rust")[0][0], "c_0")
+
+    def test_persistence(self):
+        """Index should survive reopening"""
+        reopened = LexicalIndex(self.index.index_path)
+        self.assertEqual(reopened.count(), 3)
+        self.assertEqual(reopened.search("docker")[0][0], "b_0")
+        reopened._conn.close()
+
+
+class TestReciprocalRankFusion(unittest.TestCase):
+    """Test rank fusion"""
+
+    def test_items_in_both_lists_win(self):
+        """An item ranked by both retrievers should beat single-list items"""
+        fused = reciprocal_rank_fusion([["x", "y"], ["z", "y"]])
+        self.assertEqual(fused[0][0], "y")
+        self.assertEqual({item for item, _ in fused}, {"x", "y", "z"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,21 @@
 """Test cases for LLM service"""
 import unittest
 from core.llm import LLMService
+from core.rerank_cache import RerankScoreCache
+from core.reranker import Reranker
+
+
+class TableReranker(Reranker):
+    """Scores passages from a fixed table and counts model evaluations"""
+
+    def __init__(self, scores):
+        super().__init__("table")
+        self.scores = scores
+        self.evaluated = []
+
+    def score_pairs(self, pairs):
+        self.evaluated.extend(text for _, text in pairs)
+        return [self.scores[text] for _, text in pairs]
 
 
 class TestLLMService(unittest.TestCase):
@@ -71,5 +86,75 @@ class TestLLMService(unittest.TestCase):
         self.assertGreater(len(category), 0)
 
 
+class TestRerankCascade(unittest.TestCase):
+    """Test prefiltering and early exit in re-ranking"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.llm = LLMService()
+        cls.saved = (cls.llm.reranker, cls.llm.rerank_batcher, cls.llm.rerank_cache)
+        cls.llm.rerank_batcher = None
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.llm.reranker, cls.llm.rerank_batcher, cls.llm.rerank_cache = cls.saved
+    
+    def setUp(self):
+        self.llm.rerank_cache = None
+    
+    def make_pool(self, n=25):
+        """Chunks whose similarity and keyword overlap fall with their index"""
+        chunks = []
+        for i in range(n):
+            words = "docker restart container" if i < 8 else "tax form"
+            chunks.append({'text': f"passage {i} {words}", 'filename': f"{i}.txt", 'similarity': 0.9 - i * 0.02})
+        return chunks
+    
+    def test_early_exit_scores_fewer_pairs(self):
+        """Clearly worse later candidates should stop the cascade well before the pool ends"""
+        chunks = self.make_pool()
+        self.llm.reranker = TableReranker({c['text']: 8.0 - i for i, c in enumerate(chunks)})
+        top = self.llm._rerank_chunks("restart docker container", chunks, top_k=5)
+        
+        self.assertEqual([c['filename'] for c in top], [f"{i}.txt" for i in range(5)])
+        self.assertLess(len(self.llm.reranker.evaluated), 12)
+    
+    def test_prefilter_keeps_keyword_matches(self):
+        """A low-similarity chunk with every query term should survive the prefilter"""
+        chunks = self.make_pool()
+        chunks.append({'text': "restart the docker container with docker restart", 'filename': "howto.txt", 'similarity': 0.3})
+        scores = {c['text']: -5.0 for c in chunks}
+        scores[chunks[-1]['text']] = 9.0
+        self.llm.reranker = TableReranker(scores)
+        top = self.llm._rerank_chunks("restart docker container", chunks, top_k=5)
+        
+        self.assertEqual(top[0]['filename'], "howto.txt")
+        self.assertNotIn("passage 24 tax form", self.llm.reranker.evaluated)
+
+    
+    def test_cached_scores_skip_the_model(self):
+        """A repeated query should only send chunks without a cached score to the model"""
+        chunks = [{'chunk_id': f"id{i}", 'text': f"passage {i}", 'filename': f"{i}.txt"} for i in range(4)]
+        self.llm.reranker = TableReranker({c['text']: float(i) for i, c in enumerate(chunks)})
+        self.llm.rerank_cache = RerankScoreCache(100, model_version="table")
+        
+        self.assertEqual(self.llm._score_chunks("Restart docker?", chunks[:3]), [0.0, 1.0, 2.0])
+        self.assertEqual(self.llm._score_chunks("restart docker", chunks), [0.0, 1.0, 2.0, 3.0])
+        self.assertEqual(self.llm.reranker.evaluated, ["passage 0", "passage 1", "passage 2", "passage 3"])
+
+    
+    def test_prompt_fits_context_window(self):
+        """Long chunks should be packed into the room num_ctx leaves for the answer"""
+        text = " ".join(f"Sentence {i} explains step {i} of restarting the docker service." for i in range(300))
+        chunks = [{'text': text, 'filename': f"{i}.txt", 'similarity': 0.8} for i in range(5)]
+        self.llm.reranker = TableReranker({text: 2.0})
+        context = self.llm.prepare_context("restart docker service", chunks)
+        
+        options = LLMService.GENERATION_OPTIONS
+        self.assertLessEqual(context['prompt_tokens'], options['num_ctx'] - options['num_predict'])
+        self.assertGreater(context['context_tokens'], 0)
+        self.assertIn("[Source 1: 0.txt]", context['prompt'])
+
+
 if __name__ == '__main__':
     unittest.main()
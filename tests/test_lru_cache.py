@@ -0,0 +1,46 @@
+"""Test cases for the LRU cache utility"""
+import unittest
+import time
+from utils.lru_cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    """Test bounded LRU behaviour and counters"""
+
+    def test_evicts_least_recently_used(self):
+        """Oldest untouched entry should be evicted first"""
+        cache = LRUCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_hit_miss_counters(self):
+        """Lookups should be counted"""
+        cache = LRUCache(max_size=4)
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("missing"))
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_ttl_expiry(self):
+        """Entries past their TTL should be misses"""
+        cache = LRUCache(max_size=4, ttl_seconds=60)
+        cache.put("old", 1, stored_at=time.time() - 120)
+        cache.put("new", 2)
+
+        self.assertIsNone(cache.get("old"))
+        self.assertEqual(cache.get("new"), 2)
+        self.assertEqual(len(cache), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Test cases for the shared OCR engine"""
+import os
+import unittest
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+from PIL import Image, ImageDraw
+from extractors.ocr_engine import OCREngine, _ocr_batch, has_text, preprocess
+
+
+def make_text_image(size=(800, 300), text="Invoice total 1234.56 due March"):
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    for row in range(6):
+        draw.text((20, 20 + row * 40), text, fill="black")
+    return image
+
+
+class TestOCREngine(unittest.TestCase):
+    """Test the text-presence check, preprocessing and skipping"""
+
+    def test_blank_image_has_no_text(self):
+        """Flat images should be skipped before Tesseract"""
+        self.assertFalse(has_text(Image.new("RGB", (600, 400), "white")))
+
+    def test_smooth_gradient_has_no_text(self):
+        """Smooth photos without sharp strokes should be skipped"""
+        gradient = Image.linear_gradient("L").resize((600, 400))
+        self.assertFalse(has_text(gradient))
+
+    def test_text_image_has_text(self):
+        """Dark strokes on a light background should pass"""
+        self.assertTrue(has_text(make_text_image()))
+
+    def test_preprocess_binarizes_and_scales(self):
+        """Output is black/white and rescaled towards the target DPI"""
+        image = make_text_image()
+        image.info['dpi'] = (150, 150)
+        out = preprocess(image, target_dpi=300)
+        self.assertEqual(out.mode, "L")
+        self.assertEqual(out.size, (1600, 600))
+        used = {value for value, count in enumerate(out.histogram()) if count}
+        self.assertTrue(used <= {0, 255})
+
+    def test_inverted_text_is_flipped(self):
+        """Light text on dark backgrounds ends up dark on light"""
+        image = Image.eval(make_text_image().convert("L"), lambda p: 255 - p)
+        out = preprocess(image)
+        self.assertGreater(out.histogram()[255], out.width * out.height / 2)
+
+    def test_textless_images_return_empty_in_order(self):
+        """Skipped images yield empty strings at their positions"""
+        engine = OCREngine(max_workers=1)
+        blank = Image.new("RGB", (300, 300), "white")
+        self.assertEqual(engine.ocr_images([blank, blank]), ["", ""])
+
+    def test_thread_limit_stays_in_subprocess(self):
+        """OMP_THREAD_LIMIT should reach Tesseract without being set in the calling process"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fake = Path(tmp_dir) / "tesseract"
+            fake.write_text("#!/bin/sh\necho \"limit=$OMP_THREAD_LIMIT\"\n")
+            fake.chmod(0o755)
+            image_path = os.path.join(tmp_dir, "page.png")
+            make_text_image().save(image_path)
+
+            env = {k: v for k, v in os.environ.items() if k != 'OMP_THREAD_LIMIT'}
+            with mock.patch.dict(os.environ, env, clear=True), \
+                    mock.patch("pytesseract.pytesseract.tesseract_cmd", str(fake)):
+                texts = _ocr_batch([image_path], "eng", 300, True, threads=3)
+                self.assertNotIn('OMP_THREAD_LIMIT', os.environ)
+        self.assertEqual(texts, ["limit=3"])
+
+    @unittest.skipUnless(shutil.which("tesseract"), "tesseract not installed")
+    def test_batched_ocr_reads_text(self):
+        """A batch through one Tesseract process returns one text per image"""
+        engine = OCREngine(max_workers=2, batch_size=2)
+        images = [make_text_image(text="HELLO WORLD"), Image.new("RGB", (200, 200), "white"),
+                  make_text_image(text="SECOND IMAGE")]
+        texts = engine.ocr_images(images)
+        self.assertEqual(len(texts), 3)
+        self.assertEqual(texts[1], "")
+        self.assertIn("HELLO", texts[0].upper())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""Test cases for the file processor"""
+import unittest
+from datetime import datetime
+from pathlib import Path
+from core.processor import FileProcessor
+from models.document import Document
+
+
+def make_document(text, filepath="/sorted/Education/Notes/txt/notes.txt"):
+    return Document(
+        filename=Path(filepath).name,
+        filepath=Path(filepath),
+        file_hash=str(hash(text)),
+        category="Technology",
+        text_content=text,
+        file_type="text",
+        size_bytes=len(text),
+        created_at=datetime.now()
+    )
+
+
+class TestChunkIds(unittest.TestCase):
+    """Chunk ids should depend on chunk text, not on the file hash"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.processor = FileProcessor(extraction_cache=None)
+
+    def setUp(self):
+        self.paragraphs = [f"Paragraph {i}: " + "lorem ipsum dolor sit amet " * 20 for i in range(10)]
+
+    def test_unchanged_chunks_keep_their_ids(self):
+        """Editing one paragraph should only change the ids of the chunks around it"""
+        before = self.processor.create_chunks(make_document("\n\n".join(self.paragraphs)))
+        self.paragraphs[5] = "Paragraph 5 was rewritten. It is now a lot shorter."
+        after = self.processor.create_chunks(make_document("\n\n".join(self.paragraphs)))
+
+        old_ids = {chunk.chunk_id for chunk in before}
+        changed = [chunk for chunk in after if chunk.chunk_id not in old_ids]
+        self.assertGreater(len(before), 3)
+        self.assertGreater(len(changed), 0)
+        self.assertLess(len(changed), len(after) / 2)
+
+    def test_ids_unique_for_repeated_text_and_across_files(self):
+        """Repeated chunks in one file and identical chunks in other files get distinct ids"""
+        text = "\n\n".join(["same line repeated " * 30] * 4)
+        chunks = self.processor.create_chunks(make_document(text))
+        other = self.processor.create_chunks(make_document(text, "/sorted/other.txt"))
+        ids = [chunk.chunk_id for chunk in chunks]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertFalse(set(ids) & {chunk.chunk_id for chunk in other})
+
+
+if __name__ == '__main__':
+    unittest.main()
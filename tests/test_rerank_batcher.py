@@ -0,0 +1,88 @@
+"""Test cases for cross-request re-ranking micro-batches"""
+import unittest
+import threading
+import time
+from core.rerank_batcher import RerankBatcher
+from core.reranker import Reranker
+
+
+class RecordingReranker(Reranker):
+    """Scores a pair by its passage length and records every model call"""
+
+    def __init__(self, fail: bool = False):
+        super().__init__("recording")
+        self.calls = []
+        self.fail = fail
+
+    def score_pairs(self, pairs):
+        self.calls.append(list(pairs))
+        if self.fail:
+            raise RuntimeError("model failed")
+        return [float(len(text)) for _, text in pairs]
+
+
+class TestRerankBatcher(unittest.TestCase):
+    """Test batching triggers, per-caller slices and error propagation"""
+
+    def setUp(self):
+        self.reranker = RecordingReranker()
+        self.batcher = None
+
+    def tearDown(self):
+        if self.batcher:
+            self.batcher.close()
+
+    def test_concurrent_requests_share_one_pass(self):
+        """Pairs from several threads should be scored together, each caller getting its own scores"""
+        self.batcher = RerankBatcher(self.reranker, max_pairs=8, max_wait_ms=60000)
+        results = {}
+
+        def request(i):
+            results[i] = self.batcher.score(f"query {i}", ["x" * i, "y" * (i + 10)], timeout=5)
+
+        threads = [threading.Thread(target=request, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(self.reranker.calls), 1)
+        self.assertEqual({query for query, _ in self.reranker.calls[0]}, {f"query {i}" for i in range(4)})
+        self.assertEqual(results, {i: [float(i), float(i + 10)] for i in range(4)})
+
+    def test_flush_on_time(self):
+        """A lone request should be scored once max_wait_ms elapses"""
+        self.batcher = RerankBatcher(self.reranker, max_pairs=1000, max_wait_ms=50)
+        start = time.monotonic()
+        scores = self.batcher.score("q", ["ab", "abc"], timeout=5)
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+        self.assertEqual(scores, [2.0, 3.0])
+
+    def test_requests_are_not_split(self):
+        """Batches hold whole requests; an oversized one is scored alone"""
+        self.batcher = RerankBatcher(self.reranker, max_pairs=3, max_wait_ms=60000)
+        big = self.batcher.submit("big", ["a"] * 5)
+        small = self.batcher.submit("small", ["b"] * 2)
+        self.assertEqual(big.wait(5), [1.0] * 5)
+        self.batcher.close()
+        self.assertEqual(small.wait(5), [1.0] * 2)
+        self.assertEqual([len(call) for call in self.reranker.calls], [5, 2])
+
+    def test_empty_request(self):
+        """No passages should not reach the model"""
+        self.batcher = RerankBatcher(self.reranker)
+        self.assertEqual(self.batcher.score("q", [], timeout=1), [])
+        self.assertEqual(self.reranker.calls, [])
+
+    def test_model_error_reaches_every_caller(self):
+        """A failed batch should raise in each waiting request"""
+        self.batcher = RerankBatcher(RecordingReranker(fail=True), max_pairs=4, max_wait_ms=60000)
+        tickets = [self.batcher.submit("q", ["a", "b"]) for _ in range(2)]
+        for ticket in tickets:
+            with self.assertRaises(RuntimeError):
+                ticket.wait(5)
+
+
+if __name__ == '__main__':
+    unittest.main()
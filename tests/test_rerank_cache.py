@@ -0,0 +1,37 @@
+"""Test cases for the cross-encoder score cache"""
+import unittest
+from core.rerank_cache import RerankScoreCache
+
+
+class TestRerankScoreCache(unittest.TestCase):
+    """Test partial hits, model versions and the size bound"""
+
+    def setUp(self):
+        self.cache = RerankScoreCache(max_entries=8, model_version="model@onnx-int8")
+
+    def test_partial_hit_on_normalized_query(self):
+        """Only the stored chunks should come back, for any spelling of the query"""
+        self.cache.put_many("How do I restart Docker?", {"a": 3.5, "b": -1.0})
+
+        self.assertEqual(self.cache.get_many("  how do i restart docker", ["a", "b", "c"]), {"a": 3.5, "b": -1.0})
+        self.assertEqual(self.cache.get_many("restart docker", ["a"]), {})
+
+    def test_model_version_separates_scores(self):
+        """Scores from another model or backend should not be served"""
+        self.cache.put_many("q", {"a": 1.0})
+        other = RerankScoreCache(max_entries=8, model_version="model@torch")
+        other._cache = self.cache._cache
+
+        self.assertEqual(other.get_many("q", ["a"]), {})
+
+    def test_bounded(self):
+        """The cache should stay within max_entries"""
+        for i in range(40):
+            self.cache.put_many(f"query {i}", {f"chunk {i}": float(i)})
+
+        self.assertEqual(len(self.cache._cache), 8)
+        self.assertEqual(self.cache.get_many("query 39", ["chunk 39"]), {"chunk 39": 39.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
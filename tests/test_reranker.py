@@ -0,0 +1,179 @@
+"""Test cases for the cross-encoder re-ranking backends"""
+import importlib.util
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from core.reranker import OnnxReranker, Reranker, TorchReranker, create_reranker
+
+HAS_EXPORT_DEPS = all(importlib.util.find_spec(m) for m in ("torch", "transformers", "onnx", "sentence_transformers"))
+
+QUERY = "docker server error log"
+PASSAGES = [
+    "the docker server wrote an error to the log file",
+    "a tax form is a file with a query",
+    "python is in the log",
+    "the passage of the form",
+    "docker error on the server: log file is full " * 20,
+]
+
+
+def build_tiny_cross_encoder(model_dir: Path) -> None:
+    """Randomly initialised two-layer BERT cross-encoder, built offline"""
+    import torch
+    from tokenizers import Tokenizer, models, normalizers, pre_tokenizers, processors
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+
+    torch.manual_seed(0)
+    words = "the a of to and in is for on with query passage docker error tax form python server log file".split()
+    specials = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    vocab = {token: i for i, token in enumerate(specials + words + list("abcdefghijklmnopqrstuvwxyz0123456789"))}
+    tokenizer = Tokenizer(models.WordPiece(vocab, unk_token="[UNK]"))
+    tokenizer.normalizer = normalizers.BertNormalizer(lowercase=True)
+    tokenizer.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", pair="[CLS] $A [SEP] $B:1 [SEP]:1",
+        special_tokens=[("[CLS]", vocab["[CLS]"]), ("[SEP]", vocab["[SEP]"])]
+    )
+    fast = BertTokenizerFast(tokenizer_object=tokenizer, unk_token="[UNK]", pad_token="[PAD]",
+                             cls_token="[CLS]", sep_token="[SEP]", mask_token="[MASK]")
+    config = BertConfig(vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+                        intermediate_size=64, max_position_embeddings=512, num_labels=1)
+    BertForSequenceClassification(config).eval().save_pretrained(str(model_dir))
+    fast.save_pretrained(str(model_dir))
+
+
+class TestRerankerInterface(unittest.TestCase):
+    """Backends must implement score_pairs"""
+
+    def test_missing_score_pairs_fails_at_construction(self):
+        class Incomplete(Reranker):
+            name = "incomplete"
+
+        with self.assertRaises(TypeError):
+            Incomplete("model")
+
+
+class TestUsesSigmoid(unittest.TestCase):
+    """Test the activation lookup that keeps ONNX scores on the CrossEncoder scale"""
+
+    def test_named_activation_wins(self):
+        """An explicit Identity activation means raw logits"""
+        config = {"num_labels": 1, "sbert_ce_default_activation_function": "torch.nn.modules.linear.Identity"}
+        self.assertFalse(OnnxReranker.uses_sigmoid(config))
+        config = {"num_labels": 1, "sentence_transformers": {"activation_fn": "torch.nn.modules.activation.Sigmoid"}}
+        self.assertTrue(OnnxReranker.uses_sigmoid(config))
+
+    def test_single_label_default(self):
+        """Without a named activation only single-label models get a sigmoid"""
+        self.assertTrue(OnnxReranker.uses_sigmoid({"num_labels": 1}))
+        self.assertTrue(OnnxReranker.uses_sigmoid({"id2label": {"0": "LABEL_0"}}))
+        self.assertFalse(OnnxReranker.uses_sigmoid({"id2label": {"0": "no", "1": "yes"}}))
+
+
+@unittest.skipUnless(HAS_EXPORT_DEPS, "torch, transformers, sentence-transformers and onnx are needed to export")
+class TestOnnxParity(unittest.TestCase):
+    """The ONNX backend should score like the PyTorch CrossEncoder"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = Path(tempfile.mkdtemp())
+        cls.model_dir = cls.temp_dir / "tiny-cross-encoder"
+        build_tiny_cross_encoder(cls.model_dir)
+        cls.torch_scores = TorchReranker(str(cls.model_dir), max_length=64).score(QUERY, PASSAGES)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def test_fp32_matches_torch(self):
+        """The unquantized export should reproduce PyTorch scores, including truncation"""
+        reranker = OnnxReranker(str(self.model_dir), max_length=64, batch_size=2, quantize=False)
+        scores = reranker.score(QUERY, PASSAGES)
+        self.assertEqual(len(scores), len(PASSAGES))
+        for onnx_score, torch_score in zip(scores, self.torch_scores):
+            self.assertAlmostEqual(onnx_score, torch_score, places=4)
+
+    def test_int8_close_to_torch(self):
+        """The quantized model should stay close to PyTorch and be reused from the cache"""
+        cache_dir = self.temp_dir / "cache"
+        reranker = OnnxReranker(str(self.model_dir), max_length=64, cache_dir=cache_dir)
+        scores = reranker.score(QUERY, PASSAGES)
+        for onnx_score, torch_score in zip(scores, self.torch_scores):
+            self.assertAlmostEqual(onnx_score, torch_score, delta=0.05)
+
+        model_path = OnnxReranker.export_dir(str(self.model_dir), cache_dir) / "model-int8.onnx"
+        mtime = model_path.stat().st_mtime
+        OnnxReranker(str(self.model_dir), max_length=64, cache_dir=cache_dir)
+        self.assertEqual(model_path.stat().st_mtime, mtime)
+
+    def test_incomplete_export_is_redone(self):
+        """A missing file should trigger a fresh export, leaving no staging directories behind"""
+        cache_dir = self.temp_dir / "partial"
+        model_dir = OnnxReranker.export_dir(str(self.model_dir), cache_dir)
+        OnnxReranker(str(self.model_dir), max_length=64, cache_dir=cache_dir)
+        self.assertTrue(OnnxReranker.is_exported(model_dir))
+
+        (model_dir / "config.json").unlink()
+        self.assertFalse(OnnxReranker.is_exported(model_dir))
+        scores = OnnxReranker(str(self.model_dir), max_length=64, cache_dir=cache_dir).score(QUERY, PASSAGES)
+        self.assertEqual(len(scores), len(PASSAGES))
+        self.assertTrue(OnnxReranker.is_exported(model_dir))
+        self.assertEqual([p.name for p in cache_dir.iterdir()], [model_dir.name])
+
+    def test_empty_and_batched(self):
+        """Batch size should not change scores; no passages give no scores"""
+        reranker = OnnxReranker(str(self.model_dir), max_length=64, quantize=False)
+        self.assertEqual(reranker.score(QUERY, []), [])
+        one_by_one = OnnxReranker(str(self.model_dir), max_length=64, batch_size=1, quantize=False)
+        for a, b in zip(reranker.score(QUERY, PASSAGES), one_by_one.score(QUERY, PASSAGES)):
+            self.assertAlmostEqual(a, b, places=5)
+
+    def test_unknown_backend_falls_back_to_torch(self):
+        """An unknown backend name should still give a working reranker"""
+        reranker = create_reranker("tpu", str(self.model_dir), max_length=64)
+        self.assertIsInstance(reranker, TorchReranker)
+
+
+MS_MARCO = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def cached_locally(model_name: str) -> bool:
+    try:
+        from huggingface_hub import try_to_load_from_cache
+        return isinstance(try_to_load_from_cache(model_name, "config.json"), str)
+    except Exception:
+        return False
+
+
+@unittest.skipUnless(HAS_EXPORT_DEPS and cached_locally(MS_MARCO), f"{MS_MARCO} is not in the local model cache")
+class TestMsMarcoParity(unittest.TestCase):
+    """The int8 ms-marco reranker should rank like the PyTorch one"""
+
+    def test_int8_ranking_matches_torch(self):
+        query = "how do I restart a docker container"
+        passages = [
+            "Use docker restart followed by the container name or id to restart a running container.",
+            "Containers can be stopped with docker stop and started again with docker start.",
+            "The tax form must be filed before the end of April.",
+            "Python lists are ordered, mutable collections of items.",
+            "docker compose restart restarts all services defined in the compose file.",
+        ]
+        temp_dir = Path(tempfile.mkdtemp())
+        try:
+            torch_scores = TorchReranker(MS_MARCO).score(query, passages)
+            onnx_scores = OnnxReranker(MS_MARCO, cache_dir=temp_dir).score(query, passages)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        def ranking(scores):
+            return sorted(range(len(scores)), key=lambda i: -scores[i])
+
+        self.assertEqual(ranking(onnx_scores)[:2], ranking(torch_scores)[:2])
+        for onnx_score, torch_score in zip(onnx_scores, torch_scores):
+            self.assertAlmostEqual(onnx_score, torch_score, delta=1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""Test cases for the watcher's stable-file queue"""
+import unittest
+import tempfile
+import time
+from pathlib import Path
+from core.stable_file_queue import StableFileQueue
+
+
+class TestStableFileQueue(unittest.TestCase):
+    """Test settle detection and event coalescing"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dispatched = []
+        self.queue = StableFileQueue(self.dispatched.append, settle_seconds=0.2)
+
+    def tearDown(self):
+        self.queue.close()
+        self.temp_dir.cleanup()
+
+    def make_file(self, name, content="data"):
+        path = Path(self.temp_dir.name) / name
+        path.write_text(content)
+        return path
+
+    def test_dispatch_after_settle(self):
+        """A file is released only once it has been unchanged for settle_seconds"""
+        path = self.make_file("a.txt")
+        self.queue.add(path)
+        self.assertEqual(self.queue.poll(), [])
+
+        time.sleep(0.25)
+        self.assertEqual(self.queue.poll(), [path])
+        self.assertEqual(self.dispatched, [[path]])
+        self.assertEqual(self.queue.pending_count(), 0)
+
+    def test_growing_file_is_held(self):
+        """A file whose size keeps changing should not be released"""
+        path = self.make_file("growing.log", "x")
+        self.queue.add(path)
+        time.sleep(0.25)
+        path.write_text("x" * 100)
+        self.assertEqual(self.queue.poll(), [])
+
+        time.sleep(0.25)
+        self.assertEqual(self.queue.poll(), [path])
+
+    def test_duplicate_events_collapse(self):
+        """Create + modify events for one file produce a single dispatch"""
+        path = self.make_file("dup.txt")
+        for _ in range(5):
+            self.queue.add(path)
+        time.sleep(0.25)
+        self.queue.poll()
+        self.assertEqual(self.dispatched, [[path]])
+
+    def test_deleted_file_is_dropped(self):
+        """Files removed before settling are never dispatched"""
+        path = self.make_file("gone.txt")
+        self.queue.add(path)
+        path.unlink()
+        time.sleep(0.25)
+        self.assertEqual(self.queue.poll(), [])
+        self.assertEqual(self.queue.pending_count(), 0)
+
+    def test_background_thread_dispatches(self):
+        """The started queue releases files without manual polling"""
+        path = self.make_file("bg.txt")
+        self.queue.start()
+        self.queue.add(path)
+
+        deadline = time.time() + 3
+        while not self.dispatched and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.dispatched, [[path]])
+
+
+if __name__ == '__main__':
+    unittest.main()
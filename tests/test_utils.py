@@ -1,5 +1,7 @@
 """Test cases for utility functions"""
+import hashlib
 import unittest
+import tempfile
 from pathlib import Path
 from utils.text_utils import TextUtils
 from utils.file_utils import FileUtils
@@ -24,6 +26,52 @@ class TestTextUtils(unittest.TestCase):
         self.assertEqual(len(chunks), 1)
         self.assertEqual(chunks[0], text)
     
+    def test_iter_chunks_respects_token_budget(self):
+        """Chunks should stay within max_tokens and end on sentence boundaries"""
+        text = " ".join(f"Sentence number {i} talks about topic {i % 7}." for i in range(200))
+        chunks = list(TextUtils.iter_chunks(text, max_tokens=50))
+        self.assertGreater(len(chunks), 5)
+        for chunk in chunks:
+            self.assertLessEqual(TextUtils.estimate_tokens(chunk), 50)
+            self.assertTrue(chunk.startswith("Sentence") and chunk.endswith("."))
+    
+    def test_iter_chunks_splits_long_words(self):
+        """A single word longer than the budget (e.g. base64) should be cut by characters"""
+        blob = "A" * 5000
+        chunks = list(TextUtils.iter_chunks("Header line. " + blob, max_tokens=240))
+        self.assertGreater(len(chunks), 2)
+        for chunk in chunks:
+            self.assertLessEqual(TextUtils.estimate_tokens(chunk), 240)
+        self.assertEqual("".join(chunks).replace("Header line.", ""), blob)
+    
+    def test_split_sentences(self):
+        """Sentences and lines should come back in order without surrounding whitespace"""
+        text = "Restart the server. Then check logs!\nStatus line\n\nNew paragraph? Yes"
+        self.assertEqual(TextUtils.split_sentences(text),
+                         ["Restart the server.", "Then check logs!", "Status line", "New paragraph?", "Yes"])
+        self.assertEqual(TextUtils.split_sentences(""), [])
+    
+    def test_iter_chunks_is_lazy_and_splits_long_sentences(self):
+        """A sentence longer than the budget should be split between words"""
+        chunks = TextUtils.iter_chunks("word " * 1000, max_tokens=100)
+        self.assertFalse(isinstance(chunks, list))
+        chunks = list(chunks)
+        self.assertEqual(len(chunks), 10)
+        self.assertTrue(all(chunk.split() == ["word"] * 100 for chunk in chunks))
+    
+    def test_iter_chunks_snaps_to_paragraphs(self):
+        """Paragraphs that fill half a chunk should not be merged with the next one"""
+        paragraphs = [f"Paragraph {i} starts here. " + "More text follows. " * 8 for i in range(4)]
+        chunks = list(TextUtils.iter_chunks("\n\n".join(paragraphs), max_tokens=60))
+        self.assertEqual(chunks, [p.strip() for p in paragraphs])
+    
+    def test_iter_chunks_overlap(self):
+        """Chunks cut mid-paragraph should repeat trailing sentences up to the overlap"""
+        text = " ".join(f"Fact {i} is here." for i in range(40))
+        chunks = list(TextUtils.iter_chunks(text, max_tokens=30, overlap_tokens=10))
+        self.assertTrue(chunks[0].endswith("Fact 4 is here. Fact 5 is here."))
+        self.assertTrue(chunks[1].startswith("Fact 4 is here. Fact 5 is here. Fact 6"))
+    
     def test_chunk_text_empty(self):
         """Should handle empty text"""
         chunks = TextUtils.chunk_text("", chunk_size=500)
@@ -44,6 +92,11 @@ class TestTextUtils(unittest.TestCase):
         self.assertIn("Hello", result)
         self.assertIn("world", result)
         self.assertIn("123", result)
+    
+    def test_normalize_query(self):
+        """Equivalent queries should normalize to the same cache key"""
+        self.assertEqual(TextUtils.normalize_query("  What is  GST? "), "what is gst")
+        self.assertEqual(TextUtils.normalize_query("what is gst"), "what is gst")
 
 
 class TestFileUtils(unittest.TestCase):
@@ -54,6 +107,54 @@ class TestFileUtils(unittest.TestCase):
         self.assertEqual(FileUtils.get_file_type(Path("test.pdf")), "pdf")
         self.assertEqual(FileUtils.get_file_type(Path("test.py")), "code")
         self.assertEqual(FileUtils.get_file_type(Path("test.jpg")), "image")
+    
+    def test_read_file_single_pass(self):
+        """read_file should hash, stat and keep bytes in one read"""
+        with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
+            f.write(b"hello world" * 1000)
+            temp_path = Path(f.name)
+        
+        try:
+            snapshot = FileUtils.read_file(temp_path)
+            self.assertEqual(snapshot.file_hash, FileUtils.get_file_hash(temp_path))
+            self.assertEqual(snapshot.size_bytes, 11000)
+            self.assertEqual(snapshot.data, temp_path.read_bytes())
+            self.assertEqual(len(snapshot.file_hash), 32)
+            
+            # Large files are hashed but not held in memory
+            large = FileUtils.read_file(temp_path, max_in_memory=100)
+            self.assertIsNone(large.data)
+            self.assertEqual(large.file_hash, snapshot.file_hash)
+        finally:
+            temp_path.unlink(missing_ok=True)
+    
+    def test_file_hash_is_md5(self):
+        """The identity hash must stay MD5 so stored hashes keep matching"""
+        with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
+            f.write(b"stored corpus content")
+            temp_path = Path(f.name)
+        
+        try:
+            expected = hashlib.md5(b"stored corpus content").hexdigest()
+            self.assertEqual(FileUtils.get_file_hash(temp_path), expected)
+            self.assertEqual(FileUtils.read_file(temp_path).file_hash, expected)
+        finally:
+            temp_path.unlink()
+    
+    def test_quick_hash(self):
+        """Quick hash should cover size, head and tail but not the middle"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = [Path(temp_dir) / name for name in ("a.bin", "b.bin", "c.bin", "d.bin")]
+            middle = b"x" * 100_000
+            paths[0].write_bytes(b"a" * 100_000 + middle + b"z" * 100_000)
+            paths[1].write_bytes(b"a" * 100_000 + b"y" * 100_000 + b"z" * 100_000)  # differs only in the middle
+            paths[2].write_bytes(b"a" * 100_000 + middle + b"q" * 100_000)  # differs in the tail
+            paths[3].write_bytes(b"a" * 100_000 + middle + b"x" + b"z" * 100_000)  # one byte longer
+            
+            hashes = [FileUtils.get_quick_hash(path) for path in paths]
+            self.assertEqual(hashes[0], hashes[1])
+            self.assertNotEqual(hashes[0], hashes[2])
+            self.assertNotEqual(hashes[0], hashes[3])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,148 @@
+"""Test cases for the Celery ingest tasks (run in-process with stub services)"""
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import worker
+from config import Config
+from core.processor import FileProcessor
+
+
+class StubLLM:
+    """Classifies every file into the same category"""
+
+    def classify_hierarchical(self, text, filename):
+        return {"domain": "Technology", "category": "Notes", "file_extension": "txt"}
+
+
+class StubCatalog:
+    def __init__(self):
+        self.entries = []
+
+    def find_by_hash(self, file_hash):
+        return [entry for entry in self.entries if entry['file_hash'] == file_hash]
+
+
+class StubDatabase:
+    """Records writes; add_chunks and add_document can be made to fail"""
+
+    def __init__(self, fail_batch=False, failing_files=()):
+        self.catalog = StubCatalog()
+        self.fail_batch = fail_batch
+        self.failing_files = set(failing_files)
+        self.stored = []  # chunk ids in write order
+
+    def add_chunks(self, chunks, on_written=None):
+        if self.fail_batch:
+            raise RuntimeError("batch write failed")
+        self.stored.extend(chunk.chunk_id for chunk in chunks)
+        if on_written is not None:
+            on_written()
+
+    def add_document(self, document, chunks, category=""):
+        if document.filename in self.failing_files:
+            raise RuntimeError(f"cannot store {document.filename}")
+        self.stored.extend(chunk.chunk_id for chunk in chunks)
+        self.catalog_document(document, chunks, category)
+
+    def catalog_document(self, document, chunks, category=""):
+        self.catalog.entries.append({'filepath': str(document.filepath), 'filename': document.filename,
+                                     'file_hash': document.file_hash})
+
+
+class TestProcessFilesBatchTask(unittest.TestCase):
+    """Per-file outcomes, the per-file fallback and duplicate handling"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.processor = FileProcessor(extraction_cache=None)
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.incoming = self.temp_dir / "incoming"
+        self.incoming.mkdir()
+        self.saved = (Config.SORTED_DIR, Config.DUPLICATES_DIR, worker.get_services)
+        Config.SORTED_DIR = self.temp_dir / "sorted"
+        Config.DUPLICATES_DIR = self.temp_dir / "duplicates"
+
+    def tearDown(self):
+        Config.SORTED_DIR, Config.DUPLICATES_DIR, worker.get_services = self.saved
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def make_file(self, name, text):
+        path = self.incoming / name
+        path.write_text(text)
+        return str(path)
+
+    def run_batch(self, db, filepaths):
+        worker.get_services = lambda: (db, StubLLM(), self.processor)
+        return worker.process_files_batch_task(filepaths)
+
+    def test_outcome_per_file(self):
+        """Each file should get its own outcome: stored, duplicate or missing"""
+        db = StubDatabase()
+        first = self.make_file("first.txt", "Docker restart notes. " * 20)
+        copy = self.make_file("copy.txt", "Docker restart notes. " * 20)
+        missing = str(self.incoming / "missing.txt")
+
+        self.assertEqual(self.run_batch(db, [first])["files"][first]["status"], "success")
+        result = self.run_batch(db, [copy, missing])
+        files = result["files"]
+
+        self.assertEqual(files[copy]["status"], "skipped")
+        self.assertEqual(files[missing]["status"], "failed")
+        self.assertEqual(result["processed"], 0)
+        self.assertEqual(len(db.catalog.entries), 1)
+
+    def test_stored_and_error_outcomes(self):
+        """A file that fails to prepare should not stop the others from being stored"""
+        db = StubDatabase()
+        good = self.make_file("good.txt", "Kubernetes pod logs. " * 20)
+        bad = self.make_file("bad.txt", "unreadable")
+        real_extract = self.processor.extract_text
+
+        def extract_text(filepath, snapshot=None):
+            if filepath.name == "bad.txt":
+                raise ValueError("corrupt file")
+            return real_extract(filepath, snapshot)
+        self.processor.extract_text = extract_text
+        try:
+            result = self.run_batch(db, [good, bad])
+        finally:
+            del self.processor.extract_text
+
+        self.assertEqual(result["files"][good]["status"], "success")
+        self.assertEqual(result["files"][bad], {"status": "error", "error": "corrupt file"})
+        self.assertEqual(result["processed"], 1)
+        self.assertTrue(Path(result["files"][good]["destination"]).is_file())
+        self.assertEqual([entry['filename'] for entry in db.catalog.entries], ["good.txt"])
+
+    def test_batch_write_failure_falls_back_per_file(self):
+        """When the combined write fails, files should be stored one by one with their own outcomes"""
+        db = StubDatabase(fail_batch=True, failing_files={"broken.txt"})
+        ok = self.make_file("ok.txt", "Tax form filing deadline. " * 20)
+        broken = self.make_file("broken.txt", "Invoice totals for April. " * 20)
+
+        result = self.run_batch(db, [ok, broken])
+
+        self.assertEqual(result["files"][ok]["status"], "success")
+        self.assertEqual(result["files"][broken], {"status": "error", "error": "cannot store broken.txt"})
+        self.assertEqual([entry['filename'] for entry in db.catalog.entries], ["ok.txt"])
+        self.assertTrue(db.stored)
+
+    def test_duplicate_leaves_incoming(self):
+        """Content already ingested should be moved out of incoming so it isn't queued again"""
+        db = StubDatabase()
+        self.run_batch(db, [self.make_file("original.txt", "Same content. " * 20)])
+        copy = self.make_file("again.txt", "Same content. " * 20)
+
+        outcome = self.run_batch(db, [copy])["files"][copy]
+
+        self.assertFalse(Path(copy).exists())
+        self.assertEqual(Path(outcome["destination"]), Config.DUPLICATES_DIR / "again.txt")
+        self.assertEqual(Path(outcome["duplicate_of"]).name, "original.txt")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""Test cases for the group-commit chunk write buffer"""
+import unittest
+import threading
+import time
+from core.write_buffer import ChunkWriteBuffer
+from models.document import DocumentChunk
+
+
+def make_chunk(chunk_id):
+    return DocumentChunk(
+        chunk_id=chunk_id,
+        document_hash="hash",
+        text=f"text {chunk_id}",
+        chunk_index=0,
+        filename="test.txt",
+        category="Test",
+        filepath="test.txt"
+    )
+
+
+class TestChunkWriteBuffer(unittest.TestCase):
+    """Test flush triggers and error propagation"""
+
+    def setUp(self):
+        self.writes = []
+        self.buffer = None
+
+    def tearDown(self):
+        if self.buffer:
+            self.buffer.close()
+
+    def test_flush_on_size(self):
+        """Reaching max_chunks should flush without waiting for the timer"""
+        self.buffer = ChunkWriteBuffer(self.writes.append, max_chunks=3, max_wait_ms=60000)
+        self.buffer.submit([make_chunk("a"), make_chunk("b")])
+        ticket = self.buffer.submit([make_chunk("c")])
+
+        ticket.wait(timeout=5)
+        self.assertEqual([len(w) for w in self.writes], [3])
+
+    def test_flush_on_time(self):
+        """Pending chunks should flush once max_wait_ms elapses"""
+        self.buffer = ChunkWriteBuffer(self.writes.append, max_chunks=1000, max_wait_ms=50)
+        start = time.monotonic()
+        self.buffer.submit([make_chunk("a")]).wait(timeout=5)
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+        self.assertEqual(len(self.writes), 1)
+
+    def test_concurrent_submissions_grouped(self):
+        """Submissions from several threads should share one write"""
+        self.buffer = ChunkWriteBuffer(self.writes.append, max_chunks=8, max_wait_ms=60000)
+        threads = [threading.Thread(target=lambda i=i: self.buffer.submit([make_chunk(f"{i}_0"), make_chunk(f"{i}_1")]).wait(5)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(sum(len(w) for w in self.writes), 8)
+        self.assertEqual(len(self.writes), 1)
+
+    def test_close_flushes(self):
+        """Closing should write anything still pending"""
+        self.buffer = ChunkWriteBuffer(self.writes.append, max_chunks=1000, max_wait_ms=60000)
+        ticket = self.buffer.submit([make_chunk("a")])
+        self.buffer.close()
+        self.buffer = None
+
+        self.assertTrue(ticket.done)
+        self.assertEqual(len(self.writes), 1)
+
+    def test_write_error_reaches_waiters(self):
+        """A failed flush should raise in every waiting caller"""
+        def failing_write(chunks):
+            raise ValueError("disk full")
+        self.buffer = ChunkWriteBuffer(failing_write, max_chunks=1, max_wait_ms=60000)
+
+        with self.assertRaises(ValueError):
+            self.buffer.submit([make_chunk("a")]).wait(timeout=5)
+
+    def test_on_written_runs_after_write(self):
+        """Callbacks should run once their chunks are written, and not at all if the write fails"""
+        events = []
+        self.buffer = ChunkWriteBuffer(lambda chunks: events.append("write"), max_chunks=1, max_wait_ms=60000)
+        self.buffer.submit([make_chunk("a")], on_written=lambda: events.append("written")).wait(timeout=5)
+        self.assertEqual(events, ["write", "written"])
+        self.buffer.close()
+
+        def failing_write(chunks):
+            raise ValueError("disk full")
+        called = []
+        self.buffer = ChunkWriteBuffer(failing_write, max_chunks=1, max_wait_ms=60000)
+        with self.assertRaises(ValueError):
+            self.buffer.submit([make_chunk("b")], on_written=lambda: called.append(True)).wait(timeout=5)
+        self.assertEqual(called, [])
+
+    def test_commit_writes_without_waiting(self):
+        """A lone committer should be written at once, not after max_wait_ms"""
+        self.buffer = ChunkWriteBuffer(self.writes.append, max_chunks=1000, max_wait_ms=60000)
+        start = time.monotonic()
+        self.buffer.commit(self.buffer.submit([make_chunk("a")]), timeout=5)
+
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(len(self.writes), 1)
+
+    def test_commits_during_a_write_share_the_next(self):
+        """Callers that commit while a write runs should be written together afterwards"""
+        release = threading.Event()
+        def slow_write(chunks):
+            self.writes.append(chunks)
+            if len(self.writes) == 1:
+                release.wait(5)
+        self.buffer = ChunkWriteBuffer(slow_write, max_chunks=1000, max_wait_ms=60000)
+
+        first = threading.Thread(target=lambda: self.buffer.commit(self.buffer.submit([make_chunk("first")]), 5))
+        first.start()
+        while not self.writes:
+            time.sleep(0.01)
+        tickets = [self.buffer.submit([make_chunk(f"later_{i}")]) for i in range(3)]
+        others = [threading.Thread(target=self.buffer.commit, args=(ticket, 5)) for ticket in tickets]
+        for t in others:
+            t.start()
+        release.set()
+        for t in [first] + others:
+            t.join()
+
+        self.assertEqual([len(w) for w in self.writes], [1, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 """Utility functions"""
-from .file_utils import FileUtils
+from .file_utils import FileUtils, FileSnapshot
 from .text_utils import TextUtils
+from .lru_cache import LRUCache
 
-__all__ = ['FileUtils', 'TextUtils']
+__all__ = ['FileUtils', 'FileSnapshot', 'TextUtils', 'LRUCache']
@@ -1,24 +1,88 @@
 """File utility functions"""
-import hashlib
+from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
+from typing import Optional
+import hashlib
+import os
 import zipfile
 import logging
 
+import xxhash
+
 logger = logging.getLogger(__name__)
 
+READ_BUFFER_SIZE = 1024 * 1024
+# Files up to this size are kept in memory after the hashing read so
+# extractors can parse the bytes instead of reading the file again
+MAX_IN_MEMORY_BYTES = 64 * 1024 * 1024
+
+
+@dataclass
+class FileSnapshot:
+    """One read of a file: stat, content hash and (for smaller files) the bytes"""
+    path: Path
+    size_bytes: int
+    mtime_ns: int
+    created_at: datetime
+    file_hash: str
+    data: Optional[bytes] = None
+
 
 class FileUtils:
     """File handling utilities"""
     
     @staticmethod
     def get_file_hash(filepath: Path) -> str:
-        """Generate MD5 hash for file"""
+        """Generate MD5 hash for file (the identity hash stored in the catalog and chunk metadata)"""
         hasher = hashlib.md5()
         with open(filepath, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b""):
+            for chunk in iter(lambda: f.read(READ_BUFFER_SIZE), b""):
                 hasher.update(chunk)
         return hasher.hexdigest()
     
+    @staticmethod
+    def get_quick_hash(filepath: Path, block_size: int = 64 * 1024) -> str:
+        """Cheap fingerprint: xxh3-64 of the size plus the first and last blocks
+        
+        Equal content always gives equal quick hashes; equal quick hashes only
+        suggest equal content and must be confirmed with get_file_hash.
+        """
+        with open(filepath, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            hasher = xxhash.xxh3_64(str(size).encode())
+            hasher.update(f.read(block_size))
+            if size > block_size:
+                f.seek(max(block_size, size - block_size))
+                hasher.update(f.read(block_size))
+        return hasher.hexdigest()
+    
+    @staticmethod
+    def read_file(filepath: Path, max_in_memory: int = MAX_IN_MEMORY_BYTES) -> FileSnapshot:
+        """Stat once and stream the file once, hashing as it goes
+        
+        The bytes are kept for files up to max_in_memory; larger files are
+        only hashed, and extractors re-open them from the (now warm) page cache.
+        """
+        with open(filepath, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            hasher = hashlib.md5()
+            keep = stat.st_size <= max_in_memory
+            parts = []
+            for chunk in iter(lambda: f.read(READ_BUFFER_SIZE), b""):
+                hasher.update(chunk)
+                if keep:
+                    parts.append(chunk)
+        
+        return FileSnapshot(
+            path=Path(filepath),
+            size_bytes=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            created_at=datetime.fromtimestamp(stat.st_ctime),
+            file_hash=hasher.hexdigest(),
+            data=b"".join(parts) if keep else None
+        )
+    
     @staticmethod
     def get_file_type(filepath: Path) -> str:
         """Determine file type category"""
@@ -0,0 +1,81 @@
+"""Thread-safe bounded LRU cache with optional TTL and hit/miss counters"""
+from collections import OrderedDict
+import threading
+import time
+from typing import Any, Hashable, List, Optional, Tuple
+
+
+class LRUCache:
+    """Bounded least-recently-used cache
+
+    Entries older than ``ttl_seconds`` (if set) are treated as misses and dropped.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: Optional[float] = None):
+        self.max_size = max(1, int(max_size))
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return cached value (refreshing its recency) or default"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self.ttl_seconds is not None and time.time() - entry[0] > self.ttl_seconds:
+                del self._data[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any, stored_at: Optional[float] = None) -> None:
+        """Insert or replace a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._data[key] = (stored_at if stored_at is not None else time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any:
+        """Remove a key, returning its value (or None)"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self) -> None:
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._data.clear()
+
+    def items(self) -> List[Tuple[Hashable, float, Any]]:
+        """Snapshot of (key, stored_at, value), least recently used first"""
+        with self._lock:
+            return [(key, stored_at, value) for key, (stored_at, value) in self._data.items()]
+
+    def stats(self) -> dict:
+        """Size and hit/miss counters for cache sizing"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
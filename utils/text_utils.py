@@ -1,9 +1,17 @@
 """Text processing utilities"""
-from typing import List
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+# Paragraphs are separated by blank lines; within a paragraph a unit ends after
+# sentence punctuation or at a line break (lists, logs, tables)
+_PARAGRAPH_RE = re.compile(r"\S(?:.*?)(?=\n[ \t]*\n|\Z)", re.S)
+_UNIT_RE = re.compile(r"[^\n]*?(?:[.!?][\"')\]]*(?=\s)|(?=\n)|\Z)\s*", re.S)
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
 
 class TextUtils:
     """Text processing utilities"""
@@ -31,6 +39,122 @@ class TextUtils:
         
         return chunks
     
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Rough WordPiece token count (words, long words as several pieces, punctuation)"""
+        return sum(1 + (len(word) - 1) // 8 for word in _WORD_RE.findall(text))
+    
+    @staticmethod
+    def load_token_counter(tokenizer_path: Optional[str] = None) -> Callable[[str], int]:
+        """Token counter for a HuggingFace tokenizer.json, or the estimate if it can't be loaded"""
+        if tokenizer_path and Path(tokenizer_path).is_file():
+            try:
+                from tokenizers import Tokenizer
+                tokenizer = Tokenizer.from_file(str(tokenizer_path))
+                tokenizer.no_truncation()
+                return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+            except Exception as e:
+                logger.warning(f"Could not load tokenizer {tokenizer_path}: {e}; estimating token counts")
+        return TextUtils.estimate_tokens
+    
+    @staticmethod
+    def iter_chunks(text: str, max_tokens: int = 240, overlap_tokens: int = 0,
+                    count_tokens: Optional[Callable[[str], int]] = None) -> Iterator[str]:
+        """Yield chunks of at most max_tokens, cut at sentence and paragraph boundaries
+        
+        Sentences are packed until the next one would not fit. A paragraph
+        break ends the chunk once it holds a quarter of the budget, so an edit only
+        moves the boundaries of the chunks around it. Up to overlap_tokens of
+        trailing sentences are repeated when a chunk is cut mid-paragraph.
+        Sentences longer than max_tokens are split between words.
+        """
+        if not text:
+            return
+        count_tokens = count_tokens or TextUtils.estimate_tokens
+        max_tokens = max(1, max_tokens)
+        
+        units, size = [], 0  # (text, tokens) of the chunk being built
+        for paragraph in _PARAGRAPH_RE.finditer(text):
+            for match in _UNIT_RE.finditer(paragraph.group()):
+                unit = match.group()
+                if not unit:
+                    continue
+                tokens = count_tokens(unit)
+                pieces = TextUtils._split_long_unit(unit, max_tokens, count_tokens) if tokens > max_tokens else [(unit, tokens)]
+                
+                for piece, piece_tokens in pieces:
+                    if units and size + piece_tokens > max_tokens:
+                        yield "".join(u for u, _ in units).strip()
+                        units = TextUtils._overlap_tail(units, overlap_tokens, max_tokens - piece_tokens)
+                        size = sum(t for _, t in units)
+                    units.append((piece, piece_tokens))
+                    size += piece_tokens
+            
+            if size >= max_tokens // 4:
+                yield "".join(u for u, _ in units).strip()
+                units, size = [], 0
+            elif units:
+                units[-1] = (units[-1][0].rstrip() + "\n\n", units[-1][1])
+        
+        if units:
+            yield "".join(u for u, _ in units).strip()
+    
+    @staticmethod
+    def split_sentences(text: str) -> List[str]:
+        """Sentences (and single lines) of text, in order, using the chunker's boundaries"""
+        return [
+            match.group().strip()
+            for paragraph in _PARAGRAPH_RE.finditer(text or "")
+            for match in _UNIT_RE.finditer(paragraph.group())
+            if match.group().strip()
+        ]
+    
+    @staticmethod
+    def _split_long_unit(unit: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[tuple]:
+        """Split one over-long sentence into (text, tokens) pieces between words"""
+        pieces, words, size = [], [], 0
+        for word in re.findall(r"\S+\s*", unit):
+            tokens = count_tokens(word)
+            if tokens > max_tokens:
+                # One word over budget (base64, minified code, long URLs): cut it by characters
+                if words:
+                    pieces.append(("".join(words), size))
+                    words, size = [], 0
+                pieces.extend((piece, count_tokens(piece)) for piece in TextUtils._split_long_word(word, max_tokens, count_tokens))
+                continue
+            if words and size + tokens > max_tokens:
+                pieces.append(("".join(words), size))
+                words, size = [], 0
+            words.append(word)
+            size += tokens
+        if words:
+            pieces.append(("".join(words), size))
+        return pieces
+    
+    @staticmethod
+    def _split_long_word(word: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[str]:
+        """Cut a single over-long word into character runs of at most max_tokens"""
+        pieces = []
+        while word:
+            # Proportional guess, shrunk until it fits (a lone character always does)
+            size = max(1, len(word) * max_tokens // max(1, count_tokens(word)))
+            while size > 1 and count_tokens(word[:size]) > max_tokens:
+                size = max(1, size * 3 // 4)
+            pieces.append(word[:size])
+            word = word[size:]
+        return pieces
+    
+    @staticmethod
+    def _overlap_tail(units: List[tuple], overlap_tokens: int, room: int) -> List[tuple]:
+        """Trailing units of a finished chunk to repeat at the start of the next one"""
+        tail, size = [], 0
+        for unit, tokens in reversed(units):
+            if size + tokens > min(overlap_tokens, room):
+                break
+            tail.insert(0, (unit, tokens))
+            size += tokens
+        return tail
+    
     @staticmethod
     def clean_text(text: str) -> str:
         """Clean and normalize text"""
@@ -42,3 +166,10 @@ class TextUtils:
         lines = [line for line in lines if line]
         
         return '\n'.join(lines)
+    
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Normalize a query for cache keys: lowercase, collapse whitespace, drop trailing punctuation"""
+        if not query:
+            return ""
+        return ' '.join(query.lower().split()).rstrip('?!. ')
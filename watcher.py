@@ -5,13 +5,17 @@ Dispatches tasks to Celery worker for processing.
 
 import time
 import logging
+import threading
 from pathlib import Path
-from watchdog.observers.polling import PollingObserver as Observer
+from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
 from watchdog.events import FileSystemEventHandler
 
 from core import DatabaseManager
+from core.in_flight import InFlightFiles
+from core.stable_file_queue import StableFileQueue
 from config import Config
-from worker import process_file_task
+from worker import process_file_task, process_files_batch_task
 
 # Setup logging
 logging.basicConfig(
@@ -50,24 +54,99 @@ DB_DIR.mkdir(parents=True, exist_ok=True)
 # Initialize only DB Manager for cleanup/sync (Processing is done by Worker)
 db_manager = DatabaseManager(DB_DIR)
 
-def process_file(filepath):
-    """Dispatch file processing task to Celery worker"""
-    filepath = Path(filepath)
+# Files queued but not catalogued yet (same batch, or still being processed)
+in_flight = InFlightFiles(max_size=10000, ttl_seconds=3600)
+# (Celery result, file paths, dispatch time) of tasks not known to be finished
+dispatched_tasks = []
+dispatched_lock = threading.Lock()
+
+def track_task(result, filepaths):
+    """Remember a dispatched task so its files are released from in_flight when it ends"""
+    with dispatched_lock:
+        dispatched_tasks.append((result, [str(fp) for fp in filepaths], time.time()))
+
+def check_dispatched_tasks():
+    """Release files of finished tasks and re-check the duplicates that waited on them
     
+    A duplicate whose twin was stored is then skipped by the catalog check;
+    one whose twin failed gets queued itself.
+    """
+    with dispatched_lock:
+        tasks = list(dispatched_tasks)
+    finished = []
+    for task in tasks:
+        result, filepaths, dispatched_at = task
+        try:
+            done = result.ready()
+        except Exception as e:
+            # No result backend: fall back to the in-flight TTL
+            logger.debug(f"Could not check task {result.id}: {e}")
+            done = time.time() - dispatched_at > 3600
+        if not done:
+            continue
+        finished.append(task)
+        for filepath in filepaths:
+            for duplicate in in_flight.release(filepath):
+                logger.info(f"↻ Re-checking {Path(duplicate).name} now that {Path(filepath).name} is done")
+                pending_files.add(duplicate)
+    if finished:
+        with dispatched_lock:
+            dispatched_tasks[:] = [task for task in dispatched_tasks if task not in finished]
+
+def is_queueable(filepath: Path) -> bool:
+    """Check that a path is an existing, non-blacklisted file with content not already ingested"""
     if not filepath.exists() or not filepath.is_file():
-        return
+        return False
     
     if should_skip_file(filepath):
         logger.info(f"⊘ Skipped (blacklist): {filepath.name}")
+        return False
+    
+    if Config.DEDUP_ENABLED:
+        try:
+            duplicate_of = db_manager.find_duplicate(filepath)
+            queued_as = None if duplicate_of else in_flight.claim(filepath)
+        except OSError as e:
+            logger.warning(f"Could not fingerprint {filepath.name}: {e}")
+            duplicate_of = queued_as = None
+        if duplicate_of:
+            logger.info(f"⊘ Skipped (already ingested as {Path(duplicate_of).name}): {filepath.name}")
+            return False
+        if queued_as:
+            logger.info(f"⊘ Skipped (same content already queued as {Path(queued_as).name}): {filepath.name}")
+            return False
+    return True
+
+def process_file(filepath):
+    """Dispatch file processing task to Celery worker"""
+    filepath = Path(filepath)
+    
+    if not is_queueable(filepath):
         return
     
     logger.info(f"📤 [Watcher] Queuing file: {filepath.name}")
     try:
         # ASYNC CALL using Celery
-        process_file_task.delay(str(filepath))
+        track_task(process_file_task.delay(str(filepath)), [filepath])
         logger.info(f"✅ [Watcher] Task queued for {filepath.name}")
     except Exception as e:
         logger.error(f"❌ [Watcher] Failed to queue task: {e}")
+        in_flight.release(filepath)
+
+def process_files_batched(filepaths):
+    """Dispatch many files as batch tasks of Config.INGEST_BATCH_SIZE files each"""
+    queue = [str(fp) for fp in map(Path, filepaths) if is_queueable(fp)]
+    batch_size = max(1, Config.INGEST_BATCH_SIZE)
+    
+    for start in range(0, len(queue), batch_size):
+        batch = queue[start:start + batch_size]
+        try:
+            track_task(process_files_batch_task.delay(batch), batch)
+            logger.info(f"✅ [Watcher] Batch task queued for {len(batch)} files")
+        except Exception as e:
+            logger.error(f"❌ [Watcher] Failed to queue batch task: {e}")
+            for filepath in batch:
+                in_flight.release(filepath)
 
 def remove_file_from_db(filepath):
     """Remove file vectors from database when file is deleted"""
@@ -79,60 +158,87 @@ def remove_file_from_db(filepath):
     except Exception as e:
         logger.error(f"Error removing file from database: {e}")
 
+def dispatch_settled_files(filepaths):
+    """Queue files released by the stable-file queue"""
+    if len(filepaths) == 1:
+        process_file(filepaths[0])
+    else:
+        process_files_batched(filepaths)
+
+# Files are only queued once their size and mtime stop changing
+pending_files = StableFileQueue(dispatch_settled_files, settle_seconds=Config.WATCHER_SETTLE_SECONDS)
+
+def queue_folder_files(folder_path):
+    """Add every file under a folder to the stable-file queue"""
+    for item in Path(folder_path).rglob('*'):
+        if item.is_file():
+            pending_files.add(item)
+
 class FileWatcherHandler(FileSystemEventHandler):
     """Handle file system events"""
     
     def on_created(self, event):
-        time.sleep(1) # Debounce
         if event.is_directory:
             logger.info(f"New folder detected: {event.src_path}")
-            process_folder_recursive(event.src_path)
+            queue_folder_files(event.src_path)
         else:
             logger.info(f"New file detected: {event.src_path}")
-            process_file(event.src_path)
+            pending_files.add(event.src_path)
+    
+    def on_modified(self, event):
+        # Still being written: refresh the pending entry (collapses with the create event)
+        if not event.is_directory:
+            pending_files.add(event.src_path)
+    
+    def on_moved(self, event):
+        # Editors and downloaders often write a temp file and rename it into place
+        if event.is_directory:
+            queue_folder_files(event.dest_path)
+            return
+        pending_files.discard(event.src_path)
+        pending_files.add(event.dest_path)
     
     def on_deleted(self, event):
         if not event.is_directory:
             logger.info(f"File deleted: {event.src_path}")
+            pending_files.discard(event.src_path)
             remove_file_from_db(event.src_path)
 
-def process_folder_recursive(folder_path):
-    """Recursively queue all files in a folder"""
-    folder_path = Path(folder_path)
-    if not folder_path.is_dir():
-        return
-    
-    logger.info(f"Scanning folder: {folder_path}")
-    for item in folder_path.rglob('*'):
-        if item.is_file():
-            process_file(item)
-
 def process_existing_files():
     """Queue existing files"""
     logger.info("Checking for existing files...")
-    for item in INCOMING_DIR.iterdir():
-        if item.is_file():
-            process_file(item)
-        elif item.is_dir():
-            process_folder_recursive(item)
+    process_files_batched(item for item in INCOMING_DIR.rglob('*') if item.is_file())
 
 def sync_sorted_with_db():
     """Clean up dangling DB entries"""
     try:
-        results = db_manager.collection.get()
-        ids = results.get('ids', [])
-        metadatas = results.get('metadatas', [])
-        to_delete = []
-        for i, meta in enumerate(metadatas):
-            fp = meta.get('filepath')
-            if fp and not Path(fp).exists():
-                to_delete.append(ids[i])
-        if to_delete:
-            db_manager.collection.delete(ids=to_delete)
-            logger.info(f"Pruned {len(to_delete)} dangling chunks")
+        # One existence check per catalogued file instead of per chunk
+        missing = [fp for fp in db_manager.catalog.filepaths() if not Path(fp).exists()]
+        pruned = sum(db_manager.delete_by_filepath(fp) for fp in missing)
+        if missing:
+            logger.info(f"Pruned {pruned} dangling chunks from {len(missing)} missing files")
     except Exception as e:
         logger.error(f"Error during sync: {e}")
 
+def start_observer(event_handler):
+    """Start the native observer (inotify on Linux), falling back to polling"""
+    if not Config.WATCHER_FORCE_POLLING:
+        try:
+            observer = Observer()
+            observer.schedule(event_handler, str(INCOMING_DIR), recursive=True)
+            observer.start()
+            logger.info(f"Using {type(observer).__name__}")
+            return observer
+        except OSError as e:
+            # e.g. inotify watch/instance limits reached
+            logger.warning(f"Native file watching unavailable ({e}); falling back to polling")
+    
+    observer = PollingObserver()
+    observer.schedule(event_handler, str(INCOMING_DIR), recursive=True)
+    observer.start()
+    logger.info("Using PollingObserver")
+    return observer
+
 def start_watching():
     """Start the file watcher"""
     logger.info("=" * 60)
@@ -143,18 +249,22 @@ def start_watching():
     process_existing_files()
     sync_sorted_with_db()
     
+    pending_files.start()
     event_handler = FileWatcherHandler()
-    observer = Observer()
-    observer.schedule(event_handler, str(INCOMING_DIR), recursive=True)
-    observer.start()
+    observer = start_observer(event_handler)
     
     logger.info("✓ Watcher active. Waiting for files...")
     try:
+        ticks = 0
         while True:
-            sync_sorted_with_db()
-            time.sleep(60)
+            if ticks % 12 == 0:
+                sync_sorted_with_db()
+            check_dispatched_tasks()
+            ticks += 1
+            time.sleep(5)
     except KeyboardInterrupt:
         observer.stop()
+        pending_files.close()
     observer.join()
 
 if __name__ == "__main__":
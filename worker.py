@@ -2,6 +2,7 @@ import os
 import logging
 from pathlib import Path
 from celery import Celery
+from celery.signals import worker_process_shutdown, worker_shutdown
 import shutil
 
 # Configure logging
@@ -25,6 +26,8 @@ celery_app.conf.update(
     result_serializer='json',
     timezone='UTC',
     enable_utc=True,
+    # Durable buffered writes: only ack a task once its chunks are flushed
+    task_acks_late=Config.WRITE_BUFFER_ENABLED and Config.WRITE_BUFFER_DURABLE,
 )
 
 # Initialize Services (Lazy loading to avoid fork issues)
@@ -36,13 +39,100 @@ def get_services():
     """Lazy load services to ensure connection safety in workers"""
     global db_manager, llm_service, file_processor
     if db_manager is None:
-        db_manager = DatabaseManager(Config.DB_DIR)
+        db_manager = DatabaseManager(Config.DB_DIR, embedding_store_dir=Config.EMBEDDING_STORE_DIR)
+        if Config.WRITE_BUFFER_ENABLED:
+            db_manager.enable_write_buffer(
+                max_chunks=Config.WRITE_BUFFER_MAX_CHUNKS,
+                max_wait_ms=Config.WRITE_BUFFER_MAX_WAIT_MS,
+                durable=Config.WRITE_BUFFER_DURABLE
+            )
     if llm_service is None:
         llm_service = LLMService(model=Config.LLM_MODEL)
     if file_processor is None:
         file_processor = FileProcessor()
     return db_manager, llm_service, file_processor
 
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def flush_on_shutdown(**kwargs):
+    """Flush buffered chunk writes before the worker process exits
+    
+    Prefork children get worker_process_shutdown; the solo and threaded
+    pools run tasks in the main process, which only gets worker_shutdown.
+    """
+    if db_manager is not None:
+        logger.info("Flushing buffered writes before shutdown...")
+        db_manager.close()
+
+def unique_destination(directory, filename):
+    """Path for filename in directory, adding _2, _3, ... if the name is taken"""
+    dest_path = directory / filename
+    base_stem = dest_path.stem
+    suffix = dest_path.suffix
+    counter = 2
+    while dest_path.exists():
+        dest_path = directory / f"{base_stem}_{counter}{suffix}"
+        counter += 1
+    return dest_path
+
+def set_aside_duplicate(filepath):
+    """Move a file whose content is already ingested out of incoming, so it isn't queued again"""
+    Config.DUPLICATES_DIR.mkdir(parents=True, exist_ok=True)
+    dest_path = unique_destination(Config.DUPLICATES_DIR, filepath.name)
+    shutil.move(str(filepath), str(dest_path))
+    return dest_path
+
+def prepare_file(filepath, llm, processor, db=None):
+    """Extract, classify, move to the sorted tree and chunk one file.
+
+    Returns (outcome dict, document, chunks). Storage is left to the caller
+    so that batches can write many files' chunks in one go. Content already
+    in db's catalog is skipped (document is None) and the file moved to
+    Config.DUPLICATES_DIR.
+    """
+    # 1. Read once (stat + hash + bytes), then extract text from those bytes
+    snapshot = processor.read_file(filepath)
+    if Config.DEDUP_ENABLED and db is not None:
+        known = [entry for entry in db.catalog.find_by_hash(snapshot.file_hash) if entry['filepath'] != str(filepath)]
+        if known:
+            dest_path = set_aside_duplicate(filepath)
+            logger.info(f"⊘ [Worker] {filepath.name} already ingested as {known[0]['filename']}; moved to {dest_path}")
+            return {"status": "skipped", "filename": filepath.name, "duplicate_of": known[0]['filepath'],
+                    "destination": str(dest_path)}, None, []
+    text = processor.extract_text(filepath, snapshot)
+    if not text:
+        text = f"File: {filepath.name}"
+    
+    # 2. Classify
+    hierarchy = llm.classify_hierarchical(text, filepath.name)
+    domain = hierarchy["domain"]
+    category = hierarchy["category"]
+    file_ext = hierarchy["file_extension"]
+    
+    # 3. Create Document
+    document = processor.create_document(filepath, text, domain, snapshot)
+    snapshot = None  # release the file bytes before chunking
+    
+    # 4. Move to Sorted Directory
+    category_dir = Config.SORTED_DIR / domain / category / file_ext
+    category_dir.mkdir(parents=True, exist_ok=True)
+    
+    dest_path = unique_destination(category_dir, filepath.name)
+    shutil.move(str(filepath), str(dest_path))
+    document.filepath = dest_path # Update path
+    
+    # 5. Create Chunks
+    chunks = processor.create_chunks(document)
+    
+    outcome = {
+        "status": "success",
+        "filename": filepath.name,
+        "chunks": len(chunks),
+        "destination": str(dest_path),
+        "category": category
+    }
+    return outcome, document, chunks
+
 @celery_app.task(bind=True, name='worker.process_file_task')
 def process_file_task(self, filepath_str):
     """
@@ -60,54 +150,72 @@ def process_file_task(self, filepath_str):
             logger.error(f"File not found: {filepath}")
             return {"status": "failed", "reason": "File not found"}
 
-        # 1. Extract Text
-        text = processor.extract_text(filepath)
-        if not text:
-            text = f"File: {filepath.name}"
-        
-        # 2. Classify
-        hierarchy = llm.classify_hierarchical(text, filepath.name)
-        domain = hierarchy["domain"]
-        category = hierarchy["category"]
-        file_ext = hierarchy["file_extension"]
-        
-        # 3. Create Document
-        document = processor.create_document(filepath, text, domain)
-        
-        # 4. Move to Sorted Directory
-        category_dir = Config.SORTED_DIR / domain / category / file_ext
-        category_dir.mkdir(parents=True, exist_ok=True)
+        outcome, document, chunks = prepare_file(filepath, llm, processor, db)
+        if document is None:
+            return outcome
         
-        dest_path = category_dir / filepath.name
-        
-        # Handle duplicates
-        if dest_path.exists():
-            base_stem = filepath.stem
-            suffix = filepath.suffix
-            counter = 2
-            while dest_path.exists():
-                dest_path = category_dir / f"{base_stem}_{counter}{suffix}"
-                counter += 1
-        
-        shutil.move(str(filepath), str(dest_path))
-        document.filepath = dest_path # Update path
-        
-        # 5. Create Chunks
-        chunks = processor.create_chunks(document, chunk_size=600)
-        
-        # 6. Store in Database
+        # 6. Store in Database (the catalog gets an entry even without chunks)
+        db.add_document(document, chunks, category=outcome["category"])
         if chunks:
-            db.add_chunks(chunks)
             logger.info(f"✅ [Worker] Processed {len(chunks)} chunks for {filepath.name}")
-            return {
-                "status": "success", 
-                "filename": filepath.name, 
-                "chunks": len(chunks),
-                "destination": str(dest_path)
-            }
+            return outcome
         
     except Exception as e:
         logger.error(f"❌ [Worker] Error processing {filepath.name}: {e}")
         return {"status": "error", "error": str(e)}
 
     return {"status": "success", "message": "Processed but no chunks created"}
+
+@celery_app.task(bind=True, name='worker.process_files_batch_task')
+def process_files_batch_task(self, filepath_strs):
+    """
+    Celery task to process many files at once.
+    
+    Files are extracted and classified one by one, then all their chunks are
+    embedded and written together. Returns one outcome per file so a single
+    bad file doesn't fail the batch.
+    """
+    logger.info(f"🚀 [Worker] Picking up batch of {len(filepath_strs)} files")
+    db, llm, processor = get_services()
+    
+    outcomes = {}
+    pending = []  # (filepath_str, outcome, document, chunks) waiting to be stored
+    
+    for filepath_str in filepath_strs:
+        filepath = Path(filepath_str)
+        try:
+            if not filepath.exists():
+                outcomes[filepath_str] = {"status": "failed", "reason": "File not found"}
+                continue
+            outcome, document, chunks = prepare_file(filepath, llm, processor, db)
+            outcomes[filepath_str] = outcome
+            if document is None:
+                continue
+            pending.append((filepath_str, outcome, document, chunks))
+            if not chunks:
+                outcomes[filepath_str] = {"status": "success", "message": "Processed but no chunks created"}
+        except Exception as e:
+            logger.error(f"❌ [Worker] Error processing {filepath.name}: {e}")
+            outcomes[filepath_str] = {"status": "error", "error": str(e)}
+    
+    # Store all chunks in a few large writes
+    all_chunks = [chunk for *_, chunks in pending for chunk in chunks]
+    def catalog_batch():
+        for _, outcome, document, chunks in pending:
+            db.catalog_document(document, chunks, category=outcome["category"])
+    
+    try:
+        # Catalog entries are written only once the chunks are stored
+        db.add_chunks(all_chunks, on_written=catalog_batch)
+    except Exception as e:
+        # Fall back to per-file writes so one bad file doesn't sink the rest
+        logger.error(f"❌ [Worker] Batch write failed ({e}); retrying file by file")
+        for filepath_str, outcome, document, chunks in pending:
+            try:
+                db.add_document(document, chunks, category=outcome["category"])
+            except Exception as file_error:
+                outcomes[filepath_str] = {"status": "error", "error": str(file_error)}
+    
+    succeeded = sum(1 for o in outcomes.values() if o.get("status") == "success")
+    logger.info(f"✅ [Worker] Batch done: {succeeded}/{len(filepath_strs)} files, {len(all_chunks)} chunks")
+    return {"status": "success", "processed": succeeded, "files": outcomes}